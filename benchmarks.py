@@ -0,0 +1,162 @@
+"""
+Benchmarks for the pandapower MCP server internals.
+
+Usage:
+    python benchmarks.py                  # run every benchmark
+    python benchmarks.py network_format   # run selected benchmarks
+"""
+import copy
+import multiprocessing
+import os
+import pickle
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict
+
+import numpy as np
+import pandas as pd
+import pandapower as pp
+from pandapower.control import ConstControl
+from pandapower.networks.power_system_test_cases import case300, case1888rte, case2848rte
+from pandapower.timeseries import run_timeseries
+from pandapower.timeseries.data_sources.frame_data import DFData
+
+from panda_format import save_bundle, load_bundle
+from panda_shared import SharedNetwork, attach_network
+
+# Network held by each worker process of the fan-out benchmark
+_worker_net = None
+
+
+def _best_of(func: Callable[[], object], repeat: int = 3) -> float:
+    """Best wall time of `repeat` calls, in seconds."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def bench_network_format() -> None:
+    """Load time of pandapower JSON against network bundles, eager and lazy."""
+    print("=== Network load time: from_json vs .ppnet bundle ===")
+    with tempfile.TemporaryDirectory() as tmp:
+        for case in (case300, case2848rte):
+            net = case()
+            json_path = os.path.join(tmp, f"{case.__name__}.json")
+            bundle_path = os.path.join(tmp, f"{case.__name__}.ppnet")
+            pp.to_json(net, json_path)
+            save_bundle(net, bundle_path)
+
+            json_time = _best_of(lambda: pp.from_json(json_path))
+            eager_time = _best_of(lambda: load_bundle(bundle_path, lazy=False))
+
+            def lazy_bus_line():
+                bundle = load_bundle(bundle_path)
+                return bundle.bus.vn_kv.sum() + bundle.line.length_km.sum()
+            lazy_time = _best_of(lazy_bus_line)
+            print(f"{case.__name__:>12}: from_json {json_time * 1000:8.1f} ms | "
+                  f"bundle eager {eager_time * 1000:7.1f} ms ({json_time / eager_time:5.1f}x) | "
+                  f"bundle bus+line {lazy_time * 1000:6.1f} ms ({json_time / lazy_time:5.1f}x)")
+
+
+def bench_recycle(n_steps: int = 20) -> None:
+    """Per-step solve time on case1888rte with and without recycled solver structures."""
+    print(f"=== Power flow per step on case1888rte ({n_steps} steps): recycle off vs on ===")
+    base = case1888rte()
+    pp.runpp(base)
+    scales = 1 + 0.005 * np.sin(np.linspace(0, 2 * np.pi, n_steps))
+
+    # Repeated run_power_flow calls with scaled loads, as in a load scaling study
+    times = {}
+    for recycle in (False, True):
+        net = copy.deepcopy(base)
+        kwargs = {"recycle": dict(trafo=False, gen=True, bus_pq=True)} if recycle else {}
+        pp.runpp(net, **kwargs)
+        start = time.perf_counter()
+        for scale in scales:
+            net.load["p_mw"] = base.load.p_mw * scale
+            pp.runpp(net, **kwargs)
+        times[recycle] = (time.perf_counter() - start) / n_steps
+    print(f"{'runpp':>12}: off {times[False] * 1000:7.1f} ms/step | on {times[True] * 1000:7.1f} ms/step "
+          f"({times[False] / times[True]:4.1f}x)")
+
+    # The timeseries tool: ConstControl profiles on every load
+    for recycle in (False, True):
+        net = copy.deepcopy(base)
+        profiles = pd.DataFrame(np.outer(scales, net.load.p_mw.values), columns=net.load.index)
+        ConstControl(net, element='load', element_index=net.load.index, variable='p_mw',
+                     data_source=DFData(profiles), profile_name=net.load.index)
+        start = time.perf_counter()
+        run_timeseries(net, time_steps=range(n_steps), verbose=False,
+                       **({} if recycle else {"recycle": False}))
+        times[recycle] = (time.perf_counter() - start) / n_steps
+    print(f"{'timeseries':>12}: off {times[False] * 1000:7.1f} ms/step | on {times[True] * 1000:7.1f} ms/step "
+          f"({times[False] / times[True]:4.1f}x)")
+
+
+def _hold_network(net: pp.pandapowerNet) -> None:
+    global _worker_net
+    _worker_net = net
+
+
+def _attach_network(spec) -> None:
+    global _worker_net
+    _worker_net = attach_network(spec)
+
+
+def _worker_buses(_: int) -> int:
+    return len(_worker_net.bus)
+
+
+def bench_shared_memory(n_workers: int = 4) -> None:
+    """Getting a solved case2848rte into worker processes: pickle fan-out against shared memory."""
+    print("=== Network fan-out to workers on case2848rte: pickle vs shared memory ===")
+    net = case2848rte()
+    pp.runpp(net)
+
+    payload = pickle.dumps(net, protocol=pickle.HIGHEST_PROTOCOL)
+    dump_time = _best_of(lambda: pickle.dumps(net, protocol=pickle.HIGHEST_PROTOCOL))
+    load_time = _best_of(lambda: pickle.loads(payload))
+    publish_time = _best_of(lambda: SharedNetwork(net).close())
+    with SharedNetwork(net) as shared:
+        spec_bytes = len(pickle.dumps(shared.spec, protocol=pickle.HIGHEST_PROTOCOL))
+        attach_time = _best_of(lambda: attach_network(shared.spec))
+        print(f"{'per worker':>14}: pickle {len(payload) / 2 ** 20:5.2f} MiB sent, dump+load "
+              f"{(dump_time + load_time) * 1000:6.1f} ms | shared {spec_bytes / 2 ** 20:5.2f} MiB sent, "
+              f"attach {attach_time * 1000:5.1f} ms, {shared.nbytes / 2 ** 20:4.1f} MiB of arrays "
+              f"published once in {publish_time * 1000:5.1f} ms")
+
+    # Time until every worker of a fresh pool holds the network. Forked workers
+    # inherit the initializer arguments, other start methods pickle them per worker
+    def fan_out(method: str, initializer, argument) -> float:
+        start = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=n_workers, mp_context=multiprocessing.get_context(method),
+                                 initializer=initializer, initargs=(argument,)) as pool:
+            assert set(pool.map(_worker_buses, range(n_workers))) == {len(net.bus)}
+        return time.perf_counter() - start
+
+    def shared_fan_out(method: str) -> float:
+        with SharedNetwork(net) as shared:
+            return fan_out(method, _attach_network, shared.spec)
+
+    for method in ("fork", "forkserver"):
+        pickle_pool = _best_of(lambda: fan_out(method, _hold_network, net))
+        shared_pool = _best_of(lambda: shared_fan_out(method))
+        print(f"{f'{n_workers} x {method}':>14}: pickle {pickle_pool * 1000:7.1f} ms | "
+              f"shared {shared_pool * 1000:7.1f} ms ({pickle_pool / shared_pool:4.1f}x)")
+
+
+BENCHMARKS: Dict[str, Callable[[], None]] = {
+    "network_format": bench_network_format,
+    "recycle": bench_recycle,
+    "shared_memory": bench_shared_memory,
+}
+
+
+if __name__ == "__main__":
+    for name in sys.argv[1:] or list(BENCHMARKS):
+        BENCHMARKS[name]()
@@ -0,0 +1,117 @@
+from typing import Any, Dict, List, Set, Tuple
+import copy
+import logging
+import pandas as pd
+import pandapower as pp
+
+from panda_scenarios import Overlay
+
+logger = logging.getLogger(__name__)
+
+# Internal entries of an unsolved network, given to every materialized branch
+_INTERNAL_DEFAULTS = {key: value for key, value in pp.create_empty_network().items()
+                      if key.startswith('_') and not isinstance(value, pd.DataFrame)}
+
+# Tables runpp changes in place, e.g. the generators it adds for DC lines,
+# copied into every materialized branch so that solving it leaves the parent intact
+SOLVER_TABLES = ('gen', 'ext_grid', 'controller')
+
+
+class NetworkBranch:
+    """Scenario forked from a network and stored as the cells it changes.
+
+    A branch holds no tables of its own. Its changes are kept per table column
+    as a Series of the new values of the changed rows, so hundreds of branches
+    of one network cost little more than the cells they change. A full network
+    is only built by `materialize`, for a solve, and shares the unchanged
+    tables with the parent network instead of copying them.
+
+    Branches see the current state of their parent: edits made to the parent
+    after the fork show through wherever the branch did not change the cell.
+
+    Args:
+        network: Handle of the parent network
+        fingerprint: Content fingerprint of the parent when forked
+    """
+
+    def __init__(self, network: str, fingerprint: str):
+        self.network = network
+        self.fingerprint = fingerprint
+        self.diff: Dict[Tuple[str, str], pd.Series] = {}
+
+    def fork(self) -> "NetworkBranch":
+        """Branch of this branch, starting with the same changes."""
+        branch = NetworkBranch(self.network, self.fingerprint)
+        branch.diff = dict(self.diff)
+        return branch
+
+    def update(self, overlay: Overlay) -> int:
+        """Record changes, replacing earlier changes of the same cells.
+
+        Returns:
+            Number of cells changed
+        """
+        cells = 0
+        for table, column, indices, values in overlay:
+            change = pd.Series(values, index=pd.Index(indices))
+            previous = self.diff.get((table, column))
+            if previous is not None:
+                change = pd.concat([previous[~previous.index.isin(change.index)], change])
+            # Series are replaced rather than changed in place, they may be shared with forks
+            self.diff[(table, column)] = change
+            cells += len(indices)
+        return cells
+
+    def tables(self) -> Set[str]:
+        """Tables with changed cells."""
+        return {table for table, _ in self.diff}
+
+    def cells(self) -> int:
+        """Number of changed cells."""
+        return sum(len(change) for change in self.diff.values())
+
+    def nbytes(self) -> int:
+        """Memory held by the changes."""
+        return sum(int(change.memory_usage(index=True, deep=True)) for change in self.diff.values())
+
+    def changes(self) -> List[Dict[str, Any]]:
+        """Changed cells as {"element", "index", "column", "value"} rows."""
+        return [{"element": table, "index": int(index), "column": column,
+                 "value": value.item() if hasattr(value, "item") else value}
+                for (table, column), change in sorted(self.diff.items()) for index, value in change.items()]
+
+    def materialize(self, net: pp.pandapowerNet) -> pp.pandapowerNet:
+        """Network of the branch, built on top of the current parent network.
+
+        Only the changed tables and the SOLVER_TABLES are copied. Results and
+        solver internals start empty, so solving the branch leaves the parent untouched.
+
+        Args:
+            net: Parent network
+
+        Returns:
+            Network to solve; treat the tables it shares with the parent as read-only
+        """
+        branch_net = copy.copy(net)
+        for key, value in dict.items(net):
+            if key.startswith('res_') and isinstance(value, pd.DataFrame):
+                branch_net[key] = value.iloc[:0].copy()
+            elif key.startswith('_') and not isinstance(value, pd.DataFrame):
+                if key in _INTERNAL_DEFAULTS:
+                    branch_net[key] = copy.deepcopy(_INTERNAL_DEFAULTS[key])
+                else:
+                    del branch_net[key]
+        branch_net.converged = False
+
+        for table in self.tables():
+            if table not in net:
+                raise ValueError(f"Table '{table}' changed by the branch is missing from '{self.network}'.")
+        for table in self.tables() | {table for table in SOLVER_TABLES if table in net}:
+            branch_net[table] = net[table].copy()
+        for (table, column), change in self.diff.items():
+            missing = change.index.difference(branch_net[table].index)
+            if len(missing):
+                raise ValueError(f"{table} {list(missing[:10])} changed by the branch no longer "
+                                 f"exist in '{self.network}'.")
+            branch_net[table].loc[change.index, column] = change.to_numpy()
+        return branch_net
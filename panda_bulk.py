@@ -0,0 +1,263 @@
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+from dataclasses import dataclass
+import inspect
+import logging
+import numpy as np
+import pandas as pd
+import pandapower as pp
+
+logger = logging.getLogger(__name__)
+
+# Rows as a list of records or as a table of columns
+Rows = Union[List[Dict[str, Any]], Dict[str, List[Any]]]
+
+
+@dataclass(frozen=True)
+class BulkElement:
+    """Parameters accepted when creating many elements of one type in a single call.
+
+    Attributes:
+        create: Vectorized pandapower create function
+        required: Columns every row must set
+        numeric: Numeric columns
+        flags: Boolean columns
+        text: String columns
+        buses: Columns referring to a bus, by index or by unique name
+        positive: Numeric columns that must be > 0
+        arguments: Create function argument of columns whose name differs
+        choices: Allowed values of text columns
+    """
+    create: Callable[..., Any]
+    required: Tuple[str, ...]
+    numeric: Tuple[str, ...] = ()
+    flags: Tuple[str, ...] = ('in_service',)
+    text: Tuple[str, ...] = ('name',)
+    buses: Tuple[str, ...] = ()
+    positive: Tuple[str, ...] = ()
+    arguments: Tuple[Tuple[str, str], ...] = ()
+    choices: Tuple[Tuple[str, Tuple[str, ...]], ...] = ()
+
+    @property
+    def columns(self) -> Tuple[str, ...]:
+        return ('index',) + self.buses + self.numeric + self.flags + self.text
+
+
+BULK_ELEMENTS: Dict[str, BulkElement] = {
+    'bus': BulkElement(
+        create=pp.create_buses,
+        required=('vn_kv',),
+        numeric=('vn_kv', 'max_vm_pu', 'min_vm_pu'),
+        text=('name', 'type', 'zone'),
+        positive=('vn_kv',),
+        choices=(('type', ('b', 'n', 'm')),)),
+    'line': BulkElement(
+        create=pp.create_lines,
+        required=('from_bus', 'to_bus', 'length_km', 'std_type'),
+        numeric=('length_km', 'df', 'parallel', 'max_loading_percent'),
+        text=('name', 'std_type'),
+        buses=('from_bus', 'to_bus'),
+        positive=('length_km', 'df', 'parallel'),
+        arguments=(('from_bus', 'from_buses'), ('to_bus', 'to_buses'))),
+    'load': BulkElement(
+        create=pp.create_loads,
+        required=('bus', 'p_mw'),
+        numeric=('p_mw', 'q_mvar', 'const_z_percent', 'const_i_percent', 'sn_mva', 'scaling',
+                 'max_p_mw', 'min_p_mw', 'max_q_mvar', 'min_q_mvar'),
+        flags=('in_service', 'controllable'),
+        text=('name', 'type'),
+        buses=('bus',),
+        arguments=(('bus', 'buses'),),
+        choices=(('type', ('wye', 'delta')),)),
+    'sgen': BulkElement(
+        create=pp.create_sgens,
+        required=('bus', 'p_mw'),
+        numeric=('p_mw', 'q_mvar', 'sn_mva', 'scaling', 'max_p_mw', 'min_p_mw', 'max_q_mvar', 'min_q_mvar'),
+        flags=('in_service', 'controllable'),
+        text=('name', 'type'),
+        buses=('bus',),
+        arguments=(('bus', 'buses'),)),
+    'gen': BulkElement(
+        create=pp.create_gens,
+        required=('bus', 'p_mw'),
+        numeric=('p_mw', 'vm_pu', 'sn_mva', 'scaling', 'max_p_mw', 'min_p_mw', 'max_q_mvar', 'min_q_mvar',
+                 'max_vm_pu', 'min_vm_pu', 'slack_weight'),
+        flags=('in_service', 'controllable', 'slack'),
+        buses=('bus',),
+        arguments=(('bus', 'buses'),)),
+}
+
+
+def _rows_frame(rows: Rows) -> pd.DataFrame:
+    """Turn a list of records or a dict of equally long columns into a DataFrame."""
+    if isinstance(rows, dict):
+        lengths = {len(values) if isinstance(values, (list, tuple)) else 1 for values in rows.values()}
+        if len(lengths) > 1:
+            raise ValueError("All columns must have the same number of values.")
+        return pd.DataFrame({column: list(values) if isinstance(values, (list, tuple)) else [values]
+                             for column, values in rows.items()})
+    if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+        raise ValueError("Rows must be a list of objects or an object of columns.")
+    return pd.DataFrame.from_records(rows)
+
+
+def _bus_lookup(net: pp.pandapowerNet) -> Dict[str, Optional[int]]:
+    """Bus index by name, None for names shared by several buses."""
+    lookup: Dict[str, Optional[int]] = {}
+    for index, name in zip(net.bus.index, net.bus.name):
+        if isinstance(name, str):
+            lookup[name] = None if name in lookup else int(index)
+    return lookup
+
+
+def validate_rows(net: pp.pandapowerNet, element: str, rows: Rows) -> Tuple[pd.DataFrame, List[Dict[str, Any]]]:
+    """Check the parameters of elements to create without changing the network.
+
+    Args:
+        net: Network the elements are added to
+        element: Element type, one of BULK_ELEMENTS
+        rows: One record per element, or one list per column
+
+    Returns:
+        The parameters with bus names resolved to indices and values converted,
+        and the errors as [{"row", "errors"}], empty when every row is valid
+    """
+    spec = BULK_ELEMENTS[element]
+    frame = _rows_frame(rows)
+    if frame.empty:
+        raise ValueError(f"No {element} rows given.")
+    unknown = [column for column in frame.columns if column not in spec.columns]
+    if unknown:
+        raise ValueError(f"Unknown {element} columns {unknown}. Available: {', '.join(spec.columns)}")
+
+    errors = [[] for _ in range(len(frame))]
+    frame = frame.reset_index(drop=True)
+
+    for column in spec.required:
+        missing = pd.isnull(frame[column]) if column in frame else np.ones(len(frame), dtype=bool)
+        for row in np.flatnonzero(missing):
+            errors[row].append(f"'{column}' is required")
+
+    for column in spec.numeric:
+        if column not in frame:
+            continue
+        values = pd.to_numeric(frame[column], errors='coerce')
+        for row in np.flatnonzero(values.isnull() & frame[column].notnull()):
+            errors[row].append(f"'{column}' must be a number, got {frame[column].iloc[row]!r}")
+        if column in spec.positive:
+            for row in np.flatnonzero(values <= 0):
+                errors[row].append(f"'{column}' must be positive, got {values.iloc[row]}")
+        frame[column] = values.astype(float)
+
+    for column in spec.flags:
+        if column not in frame:
+            continue
+        for row in np.flatnonzero(frame[column].map(lambda value: not isinstance(value, (bool, np.bool_))
+                                                     and not pd.isnull(value))):
+            errors[row].append(f"'{column}' must be true or false, got {frame[column].iloc[row]!r}")
+
+    for column, allowed in spec.choices:
+        if column not in frame:
+            continue
+        for row in np.flatnonzero(frame[column].notnull() & ~frame[column].isin(allowed)):
+            errors[row].append(f"'{column}' must be one of {', '.join(allowed)}, got {frame[column].iloc[row]!r}")
+
+    if 'std_type' in spec.required and 'std_type' in frame:
+        available = set(pp.available_std_types(net, element).index)
+        for row in np.flatnonzero(frame['std_type'].notnull() & ~frame['std_type'].isin(available)):
+            errors[row].append(f"Unknown {element} std_type {frame['std_type'].iloc[row]!r}")
+
+    if spec.buses:
+        names = _bus_lookup(net)
+        for column in spec.buses:
+            if column not in frame:
+                continue
+            resolved = np.full(len(frame), -1, dtype=np.int64)
+            for row, value in enumerate(frame[column]):
+                if pd.isnull(value):
+                    continue
+                if isinstance(value, str):
+                    if value not in names:
+                        errors[row].append(f"'{column}' names unknown bus {value!r}")
+                    elif names[value] is None:
+                        errors[row].append(f"'{column}' names bus {value!r} that is not unique, use its index")
+                    else:
+                        resolved[row] = names[value]
+                elif isinstance(value, (int, np.integer, float)) and not isinstance(value, bool) \
+                        and float(value).is_integer():
+                    resolved[row] = int(value)
+                    if resolved[row] not in net.bus.index:
+                        errors[row].append(f"'{column}' refers to unknown bus {value!r}")
+                else:
+                    errors[row].append(f"'{column}' must be a bus index or name, got {value!r}")
+            frame[column] = resolved
+        if 'from_bus' in frame and 'to_bus' in frame:
+            for row in np.flatnonzero((frame['from_bus'] == frame['to_bus']) & (frame['from_bus'] >= 0)):
+                errors[row].append("'from_bus' and 'to_bus' must differ")
+
+    if 'index' in frame:
+        index = pd.to_numeric(frame['index'], errors='coerce')
+        invalid = index.isnull() | (index % 1 != 0)
+        for row in np.flatnonzero(frame['index'].notnull() & invalid):
+            errors[row].append(f"'index' must be an integer, got {frame['index'].iloc[row]!r}")
+        for row in np.flatnonzero(index.isin(net[element].index)):
+            errors[row].append(f"{element} index {int(index.iloc[row])} already exists")
+        for row in np.flatnonzero(index.notnull() & index.duplicated(keep=False)):
+            errors[row].append(f"{element} index {int(index.iloc[row])} is given more than once")
+        if frame['index'].isnull().any() and frame['index'].notnull().any():
+            for row in np.flatnonzero(frame['index'].isnull()):
+                errors[row].append("'index' must be given for every row or for none")
+
+    return frame, [{"row": row, "errors": row_errors} for row, row_errors in enumerate(errors) if row_errors]
+
+
+def create_elements(net: pp.pandapowerNet, element: str, frame: pd.DataFrame) -> List[int]:
+    """Create elements from parameters checked by `validate_rows` in one vectorized call.
+
+    Missing values take the defaults of the pandapower create function.
+
+    Args:
+        net: Network to add the elements to
+        element: Element type, one of BULK_ELEMENTS
+        frame: Parameters returned by `validate_rows`
+
+    Returns:
+        Indices of the new elements
+    """
+    spec = BULK_ELEMENTS[element]
+    parameters = inspect.signature(spec.create).parameters
+    arguments = dict(spec.arguments)
+    kwargs = {}
+    for column in frame.columns:
+        argument = arguments.get(column, column)
+        default = parameters[argument].default if argument in parameters else None
+        values = frame[column]
+        if default is not inspect.Parameter.empty and values.isnull().any():
+            values = values.astype(object).where(values.notnull(), default)
+        if column == 'index':
+            values = values.astype(np.int64)
+        elif column in spec.flags and default is not None and not pd.isnull(default):
+            values = values.astype(bool)
+        kwargs[argument] = values.to_numpy()
+    if element == 'bus':
+        kwargs['nr_buses'] = len(frame)
+
+    indices = spec.create(net, **kwargs)
+    logger.info(f"Created {len(frame)} {element} elements")
+    return [int(index) for index in np.atleast_1d(indices)]
+
+
+def add_elements(net: pp.pandapowerNet, element: str, rows: Rows) -> Tuple[List[int], List[Dict[str, Any]]]:
+    """Validate and create elements; nothing is created if any row is invalid.
+
+    Args:
+        net: Network to add the elements to
+        element: Element type, one of BULK_ELEMENTS
+        rows: One record per element, or one list per column
+
+    Returns:
+        Indices of the new elements and the per-row errors, one of them empty
+    """
+    frame, errors = validate_rows(net, element, rows)
+    if errors:
+        return [], errors
+    return create_elements(net, element, frame), []
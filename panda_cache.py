@@ -0,0 +1,202 @@
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+from collections import OrderedDict
+import hashlib
+import logging
+import os
+import pickle
+import tempfile
+import threading
+import pandapower as pp
+
+logger = logging.getLogger(__name__)
+
+
+def cache_root() -> str:
+    """Root of the on-disk caches: POWER_MCP_CACHE_DIR, or power_mcp under the user's cache directory.
+
+    The user's cache directory is XDG_CACHE_HOME, or ~/.cache when it is not set.
+    """
+    cache_dir = os.environ.get("POWER_MCP_CACHE_DIR")
+    if cache_dir:
+        return cache_dir
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "power_mcp")
+
+
+def private_dir(path: str) -> str:
+    """Create a directory only the current user can access, or check an existing one.
+
+    Cached files are unpickled, so they must come from a directory nobody else
+    can write to: it must be owned by the current user and closed to group
+    and others (mode 0700).
+
+    Args:
+        path: Directory to create or check
+
+    Returns:
+        The directory
+
+    Raises:
+        RuntimeError: If the directory belongs to another user or others can access it
+    """
+    parent = os.path.dirname(os.path.abspath(path))
+    if not os.path.isdir(parent):
+        # Missing parents are created private as well, e.g. the cache root of a private subdirectory
+        private_dir(parent)
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    stat = os.stat(path)
+    if hasattr(os, "getuid") and stat.st_uid != os.getuid():
+        raise RuntimeError(f"Cache directory {path} belongs to another user. Remove it or choose another one.")
+    if os.name == "posix" and stat.st_mode & 0o077:
+        raise RuntimeError(f"Cache directory {path} is accessible to other users. "
+                           f"Restrict it with 'chmod 700 {path}' or choose another one.")
+    return path
+
+
+def file_digest(path: str) -> str:
+    """SHA-256 of a file's content."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ParsedNetworkCache:
+    """Cache of parsed network files, in memory and as pickle snapshots on disk.
+
+    Files are identified by their content hash. The hash of a path is reused as
+    long as its mtime and size do not change, so an unchanged file is never
+    parsed or hashed twice. Parsed networks are kept as pickled bytes: every
+    load returns an independent network that tools may modify freely.
+
+    Args:
+        memory_budget: Maximum bytes of pickled networks kept in memory
+        cache_dir: Directory of the on-disk snapshots, shared across server restarts;
+            checked with `private_dir` before snapshots are read or written
+    """
+
+    def __init__(self, memory_budget: int, cache_dir: str):
+        self.memory_budget = memory_budget
+        self.cache_dir = cache_dir
+        self._digests: Dict[Tuple[str, int, int], str] = {}
+        self._snapshots: "OrderedDict[str, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def load(self, path: str, parse: Callable[[str], pp.pandapowerNet]) -> Tuple[pp.pandapowerNet, str]:
+        """Load a network file through the cache.
+
+        Args:
+            path: Network file
+            parse: Function parsing the file on a cache miss, e.g. pp.from_json
+
+        Returns:
+            The network and where it came from ('memory', 'disk' or 'parsed')
+        """
+        stat = os.stat(path)
+        key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            digest = self._digests.get(key)
+        if digest is None:
+            digest = file_digest(path)
+            with self._lock:
+                self._digests[key] = digest
+
+        with self._lock:
+            snapshot = self._snapshots.get(digest)
+            if snapshot is not None:
+                self._snapshots.move_to_end(digest)
+                return pickle.loads(snapshot), "memory"
+
+        snapshot_path = os.path.join(private_dir(self.cache_dir), f"{digest}-pp{pp.__version__}.p")
+        if os.path.exists(snapshot_path):
+            with open(snapshot_path, "rb") as f:
+                snapshot = f.read()
+            self._remember(digest, snapshot)
+            return pickle.loads(snapshot), "disk"
+
+        net = parse(path)
+        snapshot = pickle.dumps(net, protocol=pickle.HIGHEST_PROTOCOL)
+        # Write then rename so that a concurrent reader never sees a partial snapshot
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(snapshot)
+        os.replace(tmp_path, snapshot_path)
+        self._remember(digest, snapshot)
+        logger.info(f"Cached parsed network {path} as {snapshot_path}")
+        return net, "parsed"
+
+    def _remember(self, digest: str, snapshot: bytes) -> None:
+        with self._lock:
+            self._snapshots[digest] = snapshot
+            self._snapshots.move_to_end(digest)
+            total = sum(len(data) for data in self._snapshots.values())
+            while total > self.memory_budget and len(self._snapshots) > 1:
+                _, data = self._snapshots.popitem(last=False)
+                total -= len(data)
+
+
+class PowerFlowCache:
+    """Power flow results of recently solved network states.
+
+    Entries are keyed by the network fingerprint and the solver parameters,
+    so an edit that is undone later hits the cache again. Only the least
+    recently used `max_entries` entries are kept.
+
+    Args:
+        max_entries: Number of cached solves
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.saved_s = 0.
+        self._entries: "OrderedDict[Hashable, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable,
+            valid: Callable[[Dict[str, Any]], bool] = lambda entry: True) -> Optional[Dict[str, Any]]:
+        """Cached entry of a key, counting the lookup as a hit or a miss.
+
+        Args:
+            key: Network fingerprint and solver parameters
+            valid: Whether an entry can still be used; invalid entries are dropped and count as a miss
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and not valid(entry):
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            self.saved_s += entry["solve_s"]
+            return entry
+
+    def put(self, key: Hashable, entry: Dict[str, Any]) -> None:
+        """Cache an entry; it must contain the solve time in seconds as 'solve_s'."""
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.,
+                "entries": len(self._entries),
+                "solve_time_saved_s": round(self.saved_s, 4)
+            }
+
+
+def cache_from_env() -> ParsedNetworkCache:
+    """Cache configured by POWER_MCP_PARSE_CACHE_MB (default 512), in the `cache_root` directory."""
+    budget_mb = float(os.environ.get("POWER_MCP_PARSE_CACHE_MB", "512"))
+    return ParsedNetworkCache(memory_budget=int(budget_mb * 1024 ** 2), cache_dir=cache_root())
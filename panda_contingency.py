@@ -0,0 +1,415 @@
+from typing import Dict, Iterator, List, Optional, Tuple, Union, Any
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+import json
+import logging
+import os
+import time
+import numpy as np
+import pandapower as pp
+import pandas as pd
+
+from panda_registry import network_nbytes
+from panda_shared import SharedNetworkSpec, network_handoff, own_columns, pool_context, receive_network
+from panda_sensitivity import BRANCH_ELEMENTS, SensitivityModel, build_sensitivity_model, screen_double_outages
+
+logger = logging.getLogger(__name__)
+
+# Network held by each worker process of the contingency pool
+_worker_net = None
+# Base case bus results of the worker network when running in place
+_worker_res_bus = None
+
+
+# A contingency is the set of (element_type, index) elements taken out of service together
+Contingency = Tuple[Tuple[str, int], ...]
+
+
+def contingency_outages(net: pp.pandapowerNet, elements: List[str]) -> List[Contingency]:
+    """List the single outages to analyse, in the order the serial loop visits them.
+
+    Args:
+        net: Network to analyse
+        elements: Element tables to take out of service one by one (e.g. ['line', 'trafo'])
+
+    Returns:
+        List of single element contingencies
+    """
+    return [((element_type, int(idx)),) for element_type in elements for idx in net[element_type].index]
+
+
+def contingency_name(contingency: Contingency) -> str:
+    """Label of a contingency in the results, e.g. 'line_3' or 'line_3+trafo_1'."""
+    return "+".join(f"{element_type}_{idx}" for element_type, idx in contingency)
+
+
+def _outage_result(net: pp.pandapowerNet, contingency: Contingency) -> Dict[str, Any]:
+    """Build the contingency result of a solved outage network."""
+    # Check for violations
+    violations = {
+        'voltage_violations': net.res_bus[
+            (net.res_bus.vm_pu < 0.95) |
+            (net.res_bus.vm_pu > 1.05)
+        ].index.tolist(),
+        'loading_violations': net.res_line[
+            net.res_line.loading_percent > 100
+        ].index.tolist()
+    }
+
+    return {
+        'contingency': contingency_name(contingency),
+        'converged': net.converged,
+        'violations': violations
+    }
+
+
+def evaluate_outage(orig_net: pp.pandapowerNet, contingency: Contingency) -> Dict[str, Any]:
+    """Run the power flow for a contingency on a copy of the network.
+
+    Args:
+        orig_net: Base case network, left untouched
+        contingency: Elements taken out of service
+
+    Returns:
+        Contingency result dict
+    """
+    # Create contingency by taking elements out of service
+    contingency_net = orig_net.deepcopy()
+    for element_type, idx in contingency:
+        contingency_net[element_type].at[idx, 'in_service'] = False
+
+    try:
+        pp.runpp(contingency_net)
+        return _outage_result(contingency_net, contingency)
+    except Exception as e:
+        return {
+            'contingency': contingency_name(contingency),
+            'converged': False,
+            'error': str(e)
+        }
+
+
+def evaluate_outage_inplace(net: pp.pandapowerNet, contingency: Contingency,
+                            base_res_bus: pd.DataFrame) -> Dict[str, Any]:
+    """Run the power flow for a contingency directly on the live network.
+
+    The elements are switched out of service, the solve is seeded from the base
+    case voltages and the elements are switched back in afterwards.
+
+    Args:
+        net: Network to analyse, restored to its original topology on return
+        contingency: Elements taken out of service
+        base_res_bus: Base case bus results used as the starting point
+
+    Returns:
+        Contingency result dict
+    """
+    in_service = [net[element_type].at[idx, 'in_service'] for element_type, idx in contingency]
+    for element_type, idx in contingency:
+        net[element_type].at[idx, 'in_service'] = False
+    net['res_bus'] = base_res_bus.copy()
+
+    try:
+        pp.runpp(net, init="results")
+        return _outage_result(net, contingency)
+    except Exception as e:
+        return {
+            'contingency': contingency_name(contingency),
+            'converged': False,
+            'error': str(e)
+        }
+    finally:
+        for (element_type, idx), status in zip(contingency, in_service):
+            net[element_type].at[idx, 'in_service'] = status
+
+
+@contextmanager
+def warm_start_session(net: pp.pandapowerNet) -> Iterator[pd.DataFrame]:
+    """Solve the base case for in-place contingencies and restore the results afterwards.
+
+    Args:
+        net: Network to analyse
+
+    Yields:
+        Base case bus results
+    """
+    saved = {key: table.copy() for key, table in net.items()
+             if key.startswith('res_') and isinstance(table, pd.DataFrame)}
+    converged = net.converged
+    try:
+        pp.runpp(net)
+        yield net.res_bus.copy()
+    finally:
+        for key, table in saved.items():
+            net[key] = table
+        net.converged = converged
+
+
+def iter_outages_serial(net: pp.pandapowerNet, outages: List[Contingency],
+                        mode: str = "copy") -> Iterator[Dict[str, Any]]:
+    """Evaluate outages one after another in the current process.
+
+    Args:
+        net: Base case network
+        outages: Contingencies to evaluate
+        mode: "copy" solves each outage on a deepcopy, "inplace" toggles the
+            element on the live network and warm starts from the base case
+
+    Yields:
+        Contingency results in the order of `outages`, as soon as each one is solved
+    """
+    if mode == "inplace":
+        with warm_start_session(net) as base_res_bus:
+            for contingency in outages:
+                yield evaluate_outage_inplace(net, contingency, base_res_bus)
+        return
+    if mode != "copy":
+        raise ValueError(f"Unknown contingency mode '{mode}'. Use 'copy' or 'inplace'.")
+
+    orig_net = net.deepcopy()
+    for contingency in outages:
+        yield evaluate_outage(orig_net, contingency)
+
+
+def copy_savings(net: pp.pandapowerNet, n_outages: int, elapsed: float) -> Dict[str, Any]:
+    """Estimate the time and memory the in-place mode saved against one deepcopy per outage.
+
+    A single deepcopy of the network is timed and extrapolated to the number
+    of outages analysed. The size of the network arrays stands in for the
+    size of a copy.
+
+    Args:
+        net: Analysed network
+        n_outages: Number of outages solved in place
+        elapsed: Wall time of the in-place run in seconds
+
+    Returns:
+        Dict with the measured time and the estimated time and memory
+    """
+    start = time.perf_counter()
+    net.deepcopy()
+    copy_time = time.perf_counter() - start
+    nbytes = network_nbytes(net)
+    return {
+        "elapsed_s": round(elapsed, 4),
+        "deepcopy_time_saved_s": round(copy_time * n_outages, 4),
+        "deepcopy_bytes_avoided": nbytes * n_outages,
+        "peak_bytes_avoided": nbytes
+    }
+
+
+def _init_worker(handoff: Union[pp.pandapowerNet, SharedNetworkSpec], mode: str) -> None:
+    """Store the base case network once per worker process."""
+    global _worker_net, _worker_res_bus
+    _worker_net = receive_network(handoff)
+    if mode == "inplace":
+        # Outages toggle in_service in place
+        own_columns(_worker_net, [(key, 'in_service') for key, value in _worker_net.items()
+                                  if isinstance(value, pd.DataFrame) and 'in_service' in value])
+        pp.runpp(_worker_net)
+        _worker_res_bus = _worker_net.res_bus.copy()
+
+
+def _run_chunk(chunk: List[Contingency]) -> List[Dict[str, Any]]:
+    """Evaluate a chunk of outages against the worker's base case network."""
+    if _worker_res_bus is not None:
+        return [evaluate_outage_inplace(_worker_net, contingency, _worker_res_bus) for contingency in chunk]
+    return [evaluate_outage(_worker_net, contingency) for contingency in chunk]
+
+
+def iter_outages_parallel(net: pp.pandapowerNet, outages: List[Contingency],
+                          n_workers: Optional[int] = None,
+                          chunk_size: Optional[int] = None,
+                          mode: str = "copy") -> Iterator[Dict[str, Any]]:
+    """Evaluate outages on a process pool.
+
+    Workers are started from a forkserver (see `pool_context`), the network
+    is handed to every worker once through shared memory (see
+    `network_handoff`), and the outage list is split into chunks. Results are
+    yielded in the order of `outages` as soon as their chunk is done, so the
+    output is identical to `iter_outages_serial`.
+
+    Args:
+        net: Base case network
+        outages: Contingencies to evaluate
+        n_workers: Number of worker processes (defaults to the CPU count)
+        chunk_size: Outages per task (defaults to about four tasks per worker)
+        mode: "copy" or "inplace", see `iter_outages_serial`
+
+    Yields:
+        Contingency results in the order of `outages`
+    """
+    if n_workers is None:
+        n_workers = os.cpu_count() or 1
+    n_workers = max(1, min(n_workers, len(outages)))
+    if n_workers == 1:
+        yield from iter_outages_serial(net, outages, mode=mode)
+        return
+    if mode not in ("copy", "inplace"):
+        raise ValueError(f"Unknown contingency mode '{mode}'. Use 'copy' or 'inplace'.")
+
+    if chunk_size is None:
+        chunk_size = max(1, -(-len(outages) // (n_workers * 4)))
+    chunks = [outages[i:i + chunk_size] for i in range(0, len(outages), chunk_size)]
+
+    logger.info(f"Running {len(outages)} outages on {n_workers} workers in {len(chunks)} chunks")
+    context = pool_context()
+    with network_handoff(net, context) as handoff:
+        pool = ProcessPoolExecutor(max_workers=n_workers, mp_context=context,
+                                   initializer=_init_worker, initargs=(handoff, mode))
+        try:
+            for chunk_results in pool.map(_run_chunk, chunks):
+                yield from chunk_results
+        finally:
+            # Cancelled jobs do not wait for the remaining chunks
+            pool.shutdown(wait=True, cancel_futures=True)
+
+
+def double_outages(net: pp.pandapowerNet, elements: List[str],
+                   screen_threshold: float = 90.,
+                   model: Optional[SensitivityModel] = None) -> Tuple[List[Contingency], Dict[str, int]]:
+    """Enumerate N-2 outage pairs and keep those a DC screening flags as possibly severe.
+
+    Pairs of in-service lines and trafos are screened with compounded LODFs: a
+    pair is kept when the estimated loading of any remaining branch reaches
+    `screen_threshold` or when it splits the network. Pairs involving other
+    element types cannot be estimated linearly and are always kept, and
+    overloads of unrated branches are not seen by the screening.
+
+    Args:
+        net: Network to analyse
+        elements: Element tables whose in-service elements are paired
+        screen_threshold: Estimated branch loading in percent above which a pair is kept
+        model: DC sensitivities of `net`, built on demand when not given
+
+    Returns:
+        Contingencies to solve with AC power flow and a dict of pair counts
+    """
+    singles = [outage for (outage,) in contingency_outages(net, elements)
+               if net[outage[0]].at[outage[1], 'in_service']]
+    first, second = np.triu_indices(len(singles), k=1)
+    is_branch = np.array([element_type in BRANCH_ELEMENTS for element_type, _ in singles], dtype=bool)
+    branch_pair = is_branch[first] & is_branch[second]
+
+    keep = ~branch_pair
+    n_flagged = 0
+    if branch_pair.any():
+        if model is None:
+            model = build_sensitivity_model(net)
+        # Positions of every single outage in the sensitivity matrices (-1 for non branches)
+        branch_pos = np.full(len(singles), -1, dtype=np.int64)
+        branch_pos[is_branch] = model.positions([outage for outage, branch in zip(singles, is_branch) if branch])
+        screening = screen_double_outages(model, branch_pos[first[branch_pair]], branch_pos[second[branch_pair]])
+        severe = screening["islanding"] | (screening["max_loading_percent"] >= screen_threshold)
+        keep[np.flatnonzero(branch_pair)[severe]] = True
+        n_flagged = int(severe.sum())
+
+    selected = [(singles[a], singles[b]) for a, b in zip(first[keep], second[keep])]
+    counts = {
+        "pairs": len(first),
+        "screened": int(branch_pair.sum()),
+        "flagged": n_flagged,
+        "solved": len(selected),
+        # Branches whose overloads the screening cannot see
+        "unrated_branches": int(model.unrated.sum()) if model is not None else 0
+    }
+    logger.info(f"N-2 screening kept {len(selected)} of {len(first)} outage pairs")
+    return selected, counts
+
+
+class JsonlResultWriter:
+    """Append contingency results to a JSON Lines file, one result per line.
+
+    Lines are buffered and flushed to disk every `flush_every` results, so a
+    crash loses at most one batch.
+
+    Args:
+        path: JSONL file to write
+        flush_every: Number of results written between two flushes
+        append: Keep the existing content of the file and append to it
+    """
+
+    def __init__(self, path: str, flush_every: int = 50, append: bool = False):
+        self.path = path
+        self.flush_every = max(1, flush_every)
+        self.written = 0
+        self._pending = 0
+        self._file = open(path, "a" if append else "w")
+
+    def write(self, result: Dict[str, Any]) -> None:
+        self._file.write(json.dumps(result) + "\n")
+        self.written += 1
+        self._pending += 1
+        if self._pending >= self.flush_every:
+            self.flush()
+
+    def flush(self) -> None:
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._pending = 0
+
+    def close(self) -> None:
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
+
+    def __enter__(self) -> "JsonlResultWriter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def read_jsonl_results(path: str) -> Iterator[Dict[str, Any]]:
+    """Stream contingency results back from a JSON Lines file.
+
+    A trailing line cut short by a crash is ignored.
+
+    Args:
+        path: JSONL file written by `JsonlResultWriter`
+
+    Yields:
+        One contingency result dict per completed line
+    """
+    with open(path) as f:
+        for line in f:
+            if not line.endswith("\n"):
+                break
+            yield json.loads(line)
+
+
+def resume_jsonl_results(path: str, outages: List[Contingency]) -> int:
+    """Prepare a partially written JSONL file for resuming a contingency run.
+
+    Drops a trailing line cut short by a crash and checks that the completed
+    lines match the start of `outages`.
+
+    Args:
+        path: JSONL file of the interrupted run
+        outages: Contingencies of the run, in the same order as before
+
+    Returns:
+        Number of contingencies already completed
+    """
+    if not os.path.exists(path):
+        return 0
+
+    completed = 0
+    valid_bytes = 0
+    last = None
+    with open(path, "rb") as f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            last = json.loads(line)
+            completed += 1
+            valid_bytes += len(line)
+    if os.path.getsize(path) != valid_bytes:
+        with open(path, "r+b") as f:
+            f.truncate(valid_bytes)
+
+    if completed > len(outages) or (last is not None and
+                                    last['contingency'] != contingency_name(outages[completed - 1])):
+        raise ValueError(f"{path} does not belong to this contingency run and cannot be resumed.")
+    logger.info(f"Resuming contingency run after {completed} completed results")
+    return completed
@@ -0,0 +1,77 @@
+from typing import Any, Callable, ContextManager, Dict, Optional
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import contextvars
+import functools
+import inspect
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class ToolExecutor:
+    """Runs synchronous tools on a bounded thread pool instead of the event loop.
+
+    While a tool runs, the MCP server keeps answering other requests such as
+    list_tools. pandapower spends most of a solve in numpy and scipy, which
+    release the GIL, so tools on different networks also overlap.
+
+    Args:
+        max_workers: Number of tools running at the same time, further calls wait in a queue
+        lock: Returns the lock of the network a call uses, given its bound arguments;
+            it may resolve arguments in place, e.g. a default network handle, and
+            the call then runs with the resolved arguments
+    """
+
+    def __init__(self, max_workers: int,
+                 lock: Optional[Callable[[Dict[str, Any]], ContextManager]] = None):
+        self.max_workers = max_workers
+        self.lock = lock
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="power-tool")
+
+    def locked(self, func: Callable[..., Any]) -> Callable[..., Any]:
+        """Wrap a function so that it holds the lock of its network while running."""
+        if self.lock is None:
+            return func
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            with self.lock(bound.arguments):
+                return func(*bound.args, **bound.kwargs)
+        return wrapper
+
+    def offload(self, func: Callable[..., Any]) -> Callable[..., Any]:
+        """Turn a synchronous tool into a coroutine running it on the pool under its network lock.
+
+        The returned coroutine function keeps the signature of `func`, so that
+        FastMCP derives the same tool schema. The locked synchronous version
+        stays available as its `sync` attribute for callers outside the event
+        loop, such as background jobs.
+        """
+        sync = self.locked(func)
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            loop = asyncio.get_running_loop()
+            queued = time.perf_counter()
+            context = contextvars.copy_context()
+
+            def run():
+                waited = time.perf_counter() - queued
+                if waited > 1.:
+                    logger.info(f"{func.__name__} waited {waited:.1f} s for a worker")
+                return context.run(sync, *args, **kwargs)
+            return await loop.run_in_executor(self._pool, run)
+
+        wrapper.sync = sync
+        return wrapper
+
+
+def executor_from_env(lock: Optional[Callable[[Dict[str, Any]], ContextManager]] = None) -> ToolExecutor:
+    """Executor configured by POWER_MCP_TOOL_WORKERS (default 4)."""
+    return ToolExecutor(max_workers=int(os.environ.get("POWER_MCP_TOOL_WORKERS", "4")), lock=lock)
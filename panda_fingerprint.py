@@ -0,0 +1,107 @@
+from typing import Dict, Iterable, Optional, Set
+import hashlib
+import logging
+import pickle
+import pandas as pd
+import pandapower as pp
+
+logger = logging.getLogger(__name__)
+
+# Scalar network parameters that change power flow results
+_SCALARS = ('f_hz', 'sn_mva')
+
+# Columns of the injection tables that shape the power flow problem; the other
+# columns, such as p_mw and q_mvar, only change the injections
+_INJECTION_STRUCTURE = {
+    'load': ('bus', 'in_service', 'const_z_percent', 'const_i_percent'),
+    'sgen': ('bus', 'in_service'),
+    'storage': ('bus', 'in_service'),
+    'gen': ('bus', 'in_service', 'slack', 'slack_weight'),
+}
+
+
+def table_digest(table: pd.DataFrame) -> str:
+    """Content hash of a table: its columns, dtypes, index and values."""
+    digest = hashlib.sha256(repr([(str(column), str(dtype)) for column, dtype in table.dtypes.items()]).encode())
+    try:
+        digest.update(pd.util.hash_pandas_object(table, index=True).to_numpy().tobytes())
+    except TypeError:
+        # Unhashable cell values such as lists or controller objects
+        digest.update(pickle.dumps(table, protocol=pickle.HIGHEST_PROTOCOL))
+    return digest.hexdigest()
+
+
+def input_tables(net: pp.pandapowerNet) -> Iterable[str]:
+    """Names of the element tables of a network; result and internal tables are left out."""
+    # dict.items does not load the unread tables of lazily loaded networks
+    return [key for key, value in dict.items(net)
+            if not key.startswith(('res_', '_')) and (value is None or isinstance(value, pd.DataFrame))]
+
+
+class NetworkFingerprint:
+    """Content fingerprint of the inputs of a network, updated table by table.
+
+    Each element table is hashed once and its digest is kept until the table
+    is reported as changed, so that a fingerprint after an edit only rehashes
+    the tables that were edited.
+
+    Besides the content fingerprint, a structure fingerprint leaves out the
+    injection setpoints of loads, static generators, storages and generators.
+    Solves with the same structure share their admittance matrix and Jacobian
+    pattern.
+    """
+
+    def __init__(self):
+        self._digests: Dict[str, str] = {}
+        self._structure: Dict[str, str] = {}
+        self._stale: Optional[Set[str]] = None
+
+    def mark(self, tables: Optional[Iterable[str]] = None) -> None:
+        """Record that tables changed (default: any table may have changed)."""
+        if tables is None:
+            self._stale = None
+        elif self._stale is not None:
+            self._stale.update(tables)
+
+    def _refresh(self, net: pp.pandapowerNet) -> None:
+        """Rehash the tables changed since the last call."""
+        tables = input_tables(net)
+        stale = set(tables) if self._stale is None else \
+            self._stale | {table for table in tables if table not in self._digests}
+        for table in stale:
+            if table not in tables:
+                continue
+            self._digests[table] = table_digest(net[table])
+            if table in _INJECTION_STRUCTURE:
+                columns = [column for column in _INJECTION_STRUCTURE[table] if column in net[table]]
+                self._structure[table] = table_digest(net[table][columns])
+        for table in list(self._digests):
+            if table not in tables:
+                del self._digests[table]
+                self._structure.pop(table, None)
+        self._stale = set()
+        if stale:
+            logger.debug(f"Rehashed {len(stale)} tables for the network fingerprint")
+
+    def _combine(self, net: pp.pandapowerNet, digests: Dict[str, str]) -> str:
+        digest = hashlib.sha256()
+        for table in sorted(digests):
+            digest.update(f"{table}:{digests[table]};".encode())
+        for key in _SCALARS:
+            digest.update(f"{key}={net.get(key)!r};".encode())
+        return digest.hexdigest()
+
+    def value(self, net: pp.pandapowerNet) -> str:
+        """Fingerprint of the network content."""
+        self._refresh(net)
+        return self._combine(net, self._digests)
+
+    def tables(self, net: pp.pandapowerNet, names: Iterable[str]) -> Dict[str, str]:
+        """Digests of some element tables; tables missing from the network are left out."""
+        self._refresh(net)
+        return {name: self._digests[name] for name in names if name in self._digests}
+
+    def structure(self, net: pp.pandapowerNet) -> str:
+        """Fingerprint of the network without the injection setpoints."""
+        self._refresh(net)
+        return self._combine(net, {**self._digests, **self._structure})
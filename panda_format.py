@@ -0,0 +1,260 @@
+from typing import Any, Dict, Iterator, List, Tuple
+import json
+import logging
+import os
+import pickle
+import shutil
+import threading
+import uuid
+import weakref
+import numpy as np
+import pandas as pd
+import pandapower as pp
+
+logger = logging.getLogger(__name__)
+
+# File extension of network bundles
+BUNDLE_EXTENSION = ".ppnet"
+
+_FORMAT = "pandapower-bundle"
+_FORMAT_VERSION = 1
+_MANIFEST = "manifest.json"
+_MISC = "misc.pkl"
+
+# numpy dtype kinds stored in the binary table files (bool, integers, floats, complex, datetimes)
+_ARRAY_KINDS = "biufcmM"
+# Byte alignment of every column in the binary table files
+COLUMN_ALIGNMENT = 64
+
+# Lazily loaded networks, so that a bundle is not overwritten under one still reading from it
+_lazy_nets: "weakref.WeakValueDictionary[int, LazyPandapowerNet]" = weakref.WeakValueDictionary()
+# Serialises reading tables of lazy networks, which may be used from several threads
+_materialize_lock = threading.RLock()
+
+
+def is_array_dtype(dtype: Any) -> bool:
+    return isinstance(dtype, np.dtype) and dtype.kind in _ARRAY_KINDS and not dtype.hasobject
+
+
+def _save_table(table: pd.DataFrame, path_stem: str) -> Dict[str, Any]:
+    """Write a table as one binary file of numeric columns plus a pickle of the index and other columns.
+
+    Numeric columns are laid out back to back, each aligned to `COLUMN_ALIGNMENT`
+    bytes, so that they can be memory-mapped in place.
+
+    Returns:
+        Manifest entry of the table
+    """
+    columns = []
+    objects = {}
+    offset = 0
+    with open(f"{path_stem}.bin", "wb") as f:
+        for column in table.columns:
+            values = table[column]
+            if not is_array_dtype(values.dtype):
+                objects[column] = values.to_numpy()
+                columns.append({"name": column, "dtype": str(values.dtype), "storage": "pickle"})
+                continue
+            data = np.ascontiguousarray(values.to_numpy())
+            padding = -offset % COLUMN_ALIGNMENT
+            f.write(b"\0" * padding)
+            offset += padding
+            f.write(data.tobytes())
+            columns.append({"name": column, "dtype": data.dtype.str, "storage": "bin",
+                            "offset": offset, "nbytes": data.nbytes})
+            offset += data.nbytes
+
+    objects["__index__"] = table.index
+    with open(f"{path_stem}.pkl", "wb") as f:
+        pickle.dump(objects, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    return {
+        "file": os.path.basename(path_stem),
+        "rows": len(table),
+        "columns": columns
+    }
+
+
+def save_bundle(net: pp.pandapowerNet, path: str) -> None:
+    """Save a network as a bundle directory with one columnar file per table and a manifest.
+
+    Numeric and boolean columns of every non-empty table are stored in a binary
+    file that can be memory-mapped; other columns, empty tables and all
+    non-table entries are pickled.
+
+    The bundle is written to a temporary directory next to `path` and renamed
+    into place. Lazily loaded networks still reading from an existing bundle at
+    `path` load their remaining tables before it is replaced.
+
+    Args:
+        net: Network to save
+        path: Bundle directory to create, replaced if it exists
+    """
+    path = path.rstrip(os.sep)
+    tmp_path = f"{path}.{uuid.uuid4().hex[:12]}.tmp"
+    os.makedirs(tmp_path)
+    try:
+        tables = {}
+        misc = {}
+        for key, value in net.items():
+            if not isinstance(value, pd.DataFrame) or not len(value):
+                misc[key] = value
+                continue
+            tables[key] = _save_table(value, os.path.join(tmp_path, f"t{len(tables)}"))
+
+        with open(os.path.join(tmp_path, _MISC), "wb") as f:
+            pickle.dump(misc, f, protocol=pickle.HIGHEST_PROTOCOL)
+        with open(os.path.join(tmp_path, _MANIFEST), "w") as f:
+            json.dump({
+                "format": _FORMAT,
+                "version": _FORMAT_VERSION,
+                "pandapower_version": pp.__version__,
+                "tables": tables
+            }, f)
+    except BaseException:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        raise
+
+    _release_bundle(path)
+    if os.path.exists(path):
+        # Directories cannot be replaced in one rename: move the old bundle aside first
+        old_path = f"{tmp_path}.old"
+        os.replace(path, old_path)
+        os.replace(tmp_path, path)
+        shutil.rmtree(old_path, ignore_errors=True)
+    else:
+        os.replace(tmp_path, path)
+    logger.info(f"Saved network bundle with {len(tables)} tables to {path}")
+
+
+def _release_bundle(path: str) -> None:
+    """Load the remaining tables of every lazy network reading from a bundle about to be replaced."""
+    path = os.path.realpath(path)
+    for net in list(_lazy_nets.values()):
+        if os.path.realpath(net.__dict__["_bundle_path"]) == path:
+            net.materialize()
+
+
+def _load_table(path: str, spec: Dict[str, Any], mmap: bool) -> pd.DataFrame:
+    path_stem = os.path.join(path, spec["file"])
+    with open(f"{path_stem}.pkl", "rb") as f:
+        objects = pickle.load(f)
+
+    raw = None
+    if any(column["storage"] == "bin" for column in spec["columns"]):
+        # Copy-on-write mapping: pages are only read on access and edits stay private
+        raw = np.memmap(f"{path_stem}.bin", dtype=np.uint8, mode="c").view(np.ndarray) if mmap \
+            else np.fromfile(f"{path_stem}.bin", dtype=np.uint8)
+
+    data = {}
+    for column in spec["columns"]:
+        if column["storage"] == "bin":
+            start = column["offset"]
+            data[column["name"]] = raw[start:start + column["nbytes"]].view(np.dtype(column["dtype"]))
+        else:
+            data[column["name"]] = objects[column["name"]]
+    table = pd.DataFrame(data, index=objects["__index__"], copy=False)
+    for column in spec["columns"]:
+        if column["storage"] == "pickle" and str(data[column["name"]].dtype) != column["dtype"]:
+            table[column["name"]] = table[column["name"]].astype(column["dtype"])
+    return table
+
+
+class LazyPandapowerNet(pp.pandapowerNet):
+    """pandapowerNet whose tables are read from a bundle on first access.
+
+    Accessing a table by key or attribute loads it; iterating over items or
+    values, copying and pickling load every remaining table first, so the
+    network behaves like a regular pandapowerNet everywhere.
+    """
+
+    def _pending(self) -> Dict[str, Dict[str, Any]]:
+        return self.__dict__.setdefault("_pending_tables", {})
+
+    def _materialize(self, key: str) -> None:
+        if key not in self._pending():
+            return
+        with _materialize_lock:
+            spec = self._pending().get(key)
+            if spec is not None:
+                dict.__setitem__(self, key, _load_table(self.__dict__["_bundle_path"], spec,
+                                                        self.__dict__["_bundle_mmap"]))
+                del self._pending()[key]
+
+    def materialize(self) -> None:
+        """Load every table that was not accessed yet."""
+        for key in list(self._pending()):
+            self._materialize(key)
+
+    def loaded_tables(self) -> List[str]:
+        """Names of the tables read from the bundle so far."""
+        return [key for key, value in dict.items(self)
+                if isinstance(value, pd.DataFrame) and key not in self._pending()]
+
+    def __getitem__(self, key: str) -> Any:
+        self._materialize(key)
+        return dict.__getitem__(self, key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        self._materialize(key)
+        return dict.get(self, key, default)
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        with _materialize_lock:
+            self._pending().pop(key, None)
+            dict.__setitem__(self, key, value)
+
+    def items(self) -> Iterator[Tuple[str, Any]]:
+        self.materialize()
+        return dict.items(self)
+
+    def values(self) -> Iterator[Any]:
+        self.materialize()
+        return dict.values(self)
+
+    def copy(self) -> Dict[str, Any]:
+        self.materialize()
+        return dict.copy(self)
+
+    def __reduce__(self):
+        # Pickle as a regular network so snapshots do not depend on the bundle
+        self.materialize()
+        return pp.pandapowerNet, (dict(dict.items(self)),)
+
+    def __deepcopy__(self, memo):
+        self.materialize()
+        result = pp.pandapowerNet.__deepcopy__(self, memo)
+        return pp.pandapowerNet(dict(dict.items(result)))
+
+
+def load_bundle(path: str, lazy: bool = True, mmap: bool = True) -> pp.pandapowerNet:
+    """Load a network saved with `save_bundle`.
+
+    Args:
+        path: Bundle directory
+        lazy: Read each table on first access instead of all tables up front
+        mmap: Memory-map numeric columns instead of reading them into memory
+
+    Returns:
+        The network, a LazyPandapowerNet when `lazy` is set
+    """
+    with open(os.path.join(path, _MANIFEST)) as f:
+        manifest = json.load(f)
+    if manifest.get("format") != _FORMAT or manifest.get("version") != _FORMAT_VERSION:
+        raise ValueError(f"{path} is not a version {_FORMAT_VERSION} network bundle.")
+    with open(os.path.join(path, _MISC), "rb") as f:
+        misc = pickle.load(f)
+
+    if not lazy:
+        return pp.pandapowerNet({**misc, **{key: _load_table(path, spec, mmap)
+                                            for key, spec in manifest["tables"].items()}})
+
+    net = LazyPandapowerNet(misc)
+    net._setattr("_bundle_path", path)
+    net._setattr("_bundle_mmap", mmap)
+    net._setattr("_pending_tables", dict(manifest["tables"]))
+    # Placeholders keep the table keys visible to `in` checks and key listings
+    for key in manifest["tables"]:
+        dict.__setitem__(net, key, None)
+    _lazy_nets[id(net)] = net
+    return net
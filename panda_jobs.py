@@ -0,0 +1,208 @@
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, TypeVar
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+import logging
+import os
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Job states
+QUEUED, RUNNING, SUCCEEDED, FAILED, CANCELLED = "queued", "running", "succeeded", "failed", "cancelled"
+FINISHED = (SUCCEEDED, FAILED, CANCELLED)
+
+
+class JobCancelled(BaseException):
+    """Raised inside a job when it is cancelled.
+
+    Derives from BaseException so that the generic `except Exception` handlers
+    of the tools do not turn a cancellation into an error result.
+    """
+
+
+@dataclass
+class Job:
+    """A tool call running in the background."""
+    job_id: str
+    kind: str
+    params: Dict[str, Any]
+    status: str = QUEUED
+    progress: float = 0.
+    message: str = ""
+    submitted: float = field(default_factory=time.time)
+    started: Optional[float] = None
+    finished: Optional[float] = None
+    result: Any = None
+    error: Optional[str] = None
+    cancel_requested: threading.Event = field(default_factory=threading.Event)
+    changed: threading.Condition = field(default_factory=threading.Condition)
+
+    def info(self) -> Dict[str, Any]:
+        """JSON serialisable state of the job."""
+        end = self.finished or time.time()
+        return {
+            "job_id": self.job_id,
+            "kind": self.kind,
+            "status": self.status,
+            "progress_percent": round(self.progress, 1),
+            "message": self.message,
+            "queued_s": round((self.started or end) - self.submitted, 3),
+            "running_s": round(end - self.started, 3) if self.started else 0.,
+            "error": self.error
+        }
+
+
+_current_job: ContextVar[Optional[Job]] = ContextVar("current_job", default=None)
+
+
+def report_progress(done: float, total: float, message: str = "") -> None:
+    """Report the progress of the job running the caller, a no-op outside of jobs.
+
+    Also the point where a cancelled job stops: raises JobCancelled once
+    cancellation was requested.
+
+    Args:
+        done: Work done so far
+        total: Total work
+        message: Short description of the current step
+    """
+    job = _current_job.get()
+    if job is None:
+        return
+    if job.cancel_requested.is_set():
+        raise JobCancelled(job.job_id)
+    with job.changed:
+        job.progress = 100. * done / total if total else 100.
+        job.message = message or job.message
+        job.changed.notify_all()
+
+
+def track_progress(items: Iterable[T], total: int, message: str = "") -> Iterator[T]:
+    """Yield items while reporting the share of `total` consumed so far.
+
+    A generator of items is closed when the job is cancelled, so that it
+    releases its workers at once rather than when it is garbage collected.
+    """
+    try:
+        report_progress(0, total, message)
+        for done, item in enumerate(items, start=1):
+            yield item
+            report_progress(done, total, message)
+    finally:
+        close = getattr(items, "close", None)
+        if close is not None:
+            close()
+
+
+def timeseries_progress(i: int, time_step: Any, time_steps: List[Any], **kwargs) -> None:
+    """`progress_function` of pandapower's run_timeseries reporting the time steps done."""
+    report_progress(i, len(time_steps), f"time step {time_step}")
+
+
+class JobManager:
+    """Runs tool calls on a thread pool and keeps their state and results.
+
+    Finished jobs are kept until `max_finished` newer jobs finished.
+
+    Args:
+        max_workers: Number of jobs running at the same time
+        max_finished: Number of finished jobs whose results are kept
+    """
+
+    def __init__(self, max_workers: int, max_finished: int = 100):
+        self.max_workers = max_workers
+        self.max_finished = max_finished
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="power-job")
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, kind: str, func: Callable[..., Any], params: Dict[str, Any],
+               is_error: Callable[[Any], Optional[str]] = lambda result: None) -> Job:
+        """Queue `func(**params)` as a job.
+
+        Args:
+            kind: Name of the job type
+            func: Function to run
+            params: Keyword arguments of `func`
+            is_error: Returns an error message if a result denotes a failure
+
+        Returns:
+            The queued job
+        """
+        job = Job(job_id=f"job_{uuid.uuid4().hex[:12]}", kind=kind, params=params)
+        with self._lock:
+            self._jobs[job.job_id] = job
+        self._pool.submit(self._run, job, func, is_error)
+        logger.info(f"Submitted {kind} job {job.job_id}")
+        return job
+
+    def _run(self, job: Job, func: Callable[..., Any], is_error: Callable[[Any], Optional[str]]) -> None:
+        with job.changed:
+            if job.status != QUEUED:
+                return
+            job.status, job.started = RUNNING, time.time()
+        token = _current_job.set(job)
+        try:
+            job.result = func(**job.params)
+            job.error = is_error(job.result)
+            self._finish(job, FAILED if job.error else SUCCEEDED)
+        except JobCancelled:
+            self._finish(job, CANCELLED)
+        except Exception as e:
+            logger.exception(f"Job {job.job_id} failed")
+            job.error = str(e)
+            self._finish(job, FAILED)
+        finally:
+            _current_job.reset(token)
+
+    def _finish(self, job: Job, status: str) -> None:
+        with job.changed:
+            job.status, job.finished = status, time.time()
+            if status == SUCCEEDED:
+                job.progress = 100.
+            job.changed.notify_all()
+        logger.info(f"Job {job.job_id} {status}")
+        with self._lock:
+            finished = [job_id for job_id, other in self._jobs.items() if other.status in FINISHED]
+            for job_id in finished[:max(0, len(finished) - self.max_finished)]:
+                del self._jobs[job_id]
+
+    def get(self, job_id: str) -> Job:
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None:
+            raise ValueError(f"Unknown job '{job_id}'.")
+        return job
+
+    def cancel(self, job_id: str) -> Job:
+        """Request cancellation; queued jobs never start, running jobs stop at their next progress report."""
+        job = self.get(job_id)
+        with job.changed:
+            if job.status not in FINISHED:
+                job.cancel_requested.set()
+            if job.status == QUEUED:
+                self._finish(job, CANCELLED)
+        return job
+
+    def wait(self, job_id: str, timeout: float, since: Optional[float] = None) -> Job:
+        """Wait until the job finished, or its progress differs from `since`, or the timeout elapsed."""
+        job = self.get(job_id)
+        with job.changed:
+            job.changed.wait_for(lambda: job.status in FINISHED or (since is not None and job.progress != since),
+                                 timeout=timeout)
+        return job
+
+    def jobs(self) -> List[Job]:
+        with self._lock:
+            return list(self._jobs.values())
+
+
+def jobs_from_env() -> JobManager:
+    """Job manager configured by POWER_MCP_JOB_WORKERS (default 2)."""
+    return JobManager(max_workers=int(os.environ.get("POWER_MCP_JOB_WORKERS", "2")))
@@ -1,6 +1,6 @@
-from typing import Dict, List, Optional, Tuple, Any, Union
+from typing import ContextManager, Dict, List, Optional, Tuple, Any, Union
 import pandapower as pp
-from mcp.server.fastmcp import FastMCP
+from mcp.server.fastmcp import FastMCP, Context
 import logging
 import pandas as pd
 import numpy as np
@@ -10,10 +10,34 @@ from pandapower.timeseries import run_timeseries
 
 import sys
 import os
+import time
+import asyncio
+import contextlib
+import inspect
+import threading
 import json as js
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from common.utils import PowerError, power_mcp_tool
+from panda_contingency import contingency_outages, double_outages, iter_outages_serial, iter_outages_parallel, \
+    copy_savings, JsonlResultWriter, read_jsonl_results, resume_jsonl_results
+from panda_sensitivity import SensitivityModel, build_sensitivity_model, rank_single_outages
+from panda_results import store_results, load_results, query_frame, encode_page_token, decode_page_token, \
+    result_exists, result_frame, summarize_frame, fit_budget, DEFAULT_SUMMARY_COLUMNS
+from panda_fingerprint import input_tables
+from panda_registry import registry_from_env
+from panda_cache import cache_from_env, PowerFlowCache
+from panda_format import BUNDLE_EXTENSION, save_bundle, load_bundle
+from panda_bulk import Rows, add_elements
+from panda_jobs import FINISHED, SUCCEEDED, jobs_from_env, track_progress, timeseries_progress
+from panda_executor import executor_from_env
+from panda_profiles import ProfileData, convert_profiles, map_profile_columns
+from panda_timeseries import TimeseriesWriter, load_timeseries, load_timeseries_aggregates, timeseries_metadata, \
+    run_timeseries_parallel, stateful_controllers
+from panda_scenarios import SUMMARY_COLUMNS, scenario_overlay, scenario_summary, iter_scenarios_serial, \
+    iter_scenarios_parallel
+from panda_branches import NetworkBranch
+from panda_topology import BUS_COLUMNS, TOPOLOGY_TABLES, BusIncidence, TopologyGraph
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -23,41 +47,171 @@ logger = logging.getLogger(__name__)
 logger.info("Initializing Pandapower Analysis Server")
 mcp = FastMCP("Pandapower Analysis Server")
 
-# Global variable to store the current network
-_current_net = None
+# Registry of the loaded networks, addressed by handle
+_networks = registry_from_env()
+# Parsed network files, keyed by content hash
+_parsed_networks = cache_from_env()
+# Power flow results, keyed by network fingerprint and solver parameters
+_power_flows = PowerFlowCache(max_entries=int(os.environ.get("POWER_MCP_PF_CACHE_ENTRIES", "32")))
+# Scenario branches of the loaded networks, addressed by branch name
+_branches: Dict[str, NetworkBranch] = {}
+# Guards _branches, which tools on different networks change concurrently
+_branches_lock = threading.Lock()
 
-def _get_network() -> pp.pandapowerNet:
-    """Get the current pandapower network instance.
+
+def _network_lock(arguments: Dict[str, Any]) -> ContextManager:
+    """Locks of the networks a tool call uses; calls without a network handle need none.
+    
+    Calls on a branch hold the lock of the network the branch was forked from.
+    Calls using several networks, such as materializing a branch of one network
+    under the handle of another, take their locks in the order of the handles,
+    so that two such calls cannot deadlock.
+    
+    A network of None is replaced by the current handle in `arguments`, so that
+    the call runs on the network it locked even if the current network changes.
+    """
+    handles = set()
+    with _branches_lock:
+        for key in ("branch", "parent_branch"):
+            if arguments.get(key) in _branches:
+                handles.add(_branches[arguments[key]].network)
+    if "network" in arguments:
+        if arguments["network"] is None:
+            arguments["network"] = _networks.current
+        handles.add(arguments["network"])
+    stack = contextlib.ExitStack()
+    for handle in sorted(handles):
+        stack.enter_context(_networks.lock(handle))
+    return stack
+
+# CPU-bound tools run on a bounded thread pool, one at a time per network
+_tools = executor_from_env(lock=_network_lock)
+offloaded = _tools.offload
+
+def _get_network(network: Optional[str] = None) -> pp.pandapowerNet:
+    """Get a pandapower network instance.
+    
+    Args:
+        network: Handle of the network (default: the current network)
+    
+    Returns:
+        pp.pandapowerNet: The network or raises error if none loaded
+    """
+    return _networks.get(network)
+
+
+def _get_branch(branch: str) -> NetworkBranch:
+    """Get a scenario branch by name, or raise ValueError."""
+    with _branches_lock:
+        if branch not in _branches:
+            raise ValueError(f"No branch named '{branch}'. Use list_branches to see the {len(_branches)} branches.")
+        return _branches[branch]
+
+
+def _put_network(net: pp.pandapowerNet, network: Optional[str] = None) -> str:
+    """Register a network, dropping the branches of any network it replaces; returns its handle."""
+    handle = _networks.put(net, network)
+    _drop_branches(handle)
+    return handle
+
+
+def _drop_branches(network: str) -> None:
+    """Delete the branches of a network that was replaced or removed; their diffs no longer apply."""
+    with _branches_lock:
+        stale = [name for name, scenario in _branches.items() if scenario.network == network]
+        for name in stale:
+            del _branches[name]
+    if stale:
+        logger.info(f"Dropped branches {stale} of network '{network}'")
+
+
+def _get_sensitivity_model(network: Optional[str] = None) -> SensitivityModel:
+    """Get the cached PTDF/LODF model of a network, building it if needed.
+    
+    Args:
+        network: Handle of the network (default: the current network)
     
     Returns:
-        pp.pandapowerNet: The current network or raises error if none loaded
+        SensitivityModel: DC sensitivities of the network
     """
-    global _current_net
+    net = _get_network(network)
+    model = _networks.caches(network).get("sensitivity")
+    if model is None:
+        # The dense matrices count against the memory budget of the network
+        model = _networks.cache(network, "sensitivity", build_sensitivity_model(net))
+    return model
+
+
+def _get_topology(network: Optional[str] = None) -> Tuple[TopologyGraph, List[str]]:
+    """Get the connectivity graph of a network, rereading the tables changed since its last use.
+    
+    Args:
+        network: Handle of the network (default: the current network)
     
-    if _current_net is None:
-        raise RuntimeError("No pandapower network is currently loaded. Please create or load a network first.")
-    return _current_net
+    Returns:
+        The graph and the tables that were reread
+    """
+    net = _get_network(network)
+    # Kept in the network state, which survives edits, so that an edit only rereads its tables
+    graph = _networks.state(network).setdefault("topology", TopologyGraph())
+    changed = graph.update(net, _networks.table_digests(network, TOPOLOGY_TABLES))
+    return graph, changed
+
+
+def _get_incidence(network: Optional[str] = None) -> BusIncidence:
+    """Get the bus-to-element index of a network, building it on first use.
+    
+    Args:
+        network: Handle of the network (default: the current network)
+    
+    Returns:
+        BusIncidence: Elements attached to each bus
+    """
+    net = _get_network(network)
+    state = _networks.state(network)
+    if "incidence" not in state:
+        incidence = BusIncidence()
+        incidence.update(net)
+        state["incidence"] = incidence
+    return state["incidence"]
+
+
+def _invalidate_network_caches(network: Optional[str] = None, tables: Optional[List[str]] = None) -> None:
+    """Drop everything derived from a network after it changed, and update its bus-to-element index.
+    
+    Args:
+        network: Handle of the network (default: the current network)
+        tables: Element tables that changed (default: any table may have changed)
+    """
+    _networks.changed(network, tables=tables)
+    incidence = _networks.state(network).get("incidence")
+    if incidence is not None:
+        incidence.update(_get_network(network), tables)
 
 
 @power_mcp_tool(mcp)
-def create_empty_network() -> Dict[str, Any]:
+@offloaded
+def create_empty_network(network: Optional[str] = None) -> Dict[str, Any]:
     """Create an empty pandapower network.
     
+    Args:
+        network: Handle to create the network under (default: replaces the current network)
+    
     Returns:
         Dict containing status and network information
     """
     logger.info("Creating an empty pandapower network")
-    global _current_net
     try:
-        _current_net = pp.create_empty_network()
-        raise Exception("test")
+        net = pp.create_empty_network()
+        handle = _put_network(net, network)
         return {
             "status": "success",
             "message": "Empty network created successfully",
+            "network": handle,
             "network_info": {
-                "buses": len(_current_net.bus),
-                "lines": len(_current_net.line),
-                "trafos": len(_current_net.trafo)
+                "buses": len(net.bus),
+                "lines": len(net.line),
+                "trafos": len(net.trafo)
             }
         }
     except Exception as e:
@@ -67,32 +221,89 @@ def create_empty_network() -> Dict[str, Any]:
         )
 
 @power_mcp_tool(mcp)
-def load_network(file_path: str) -> Dict[str, Any]:
+def list_networks() -> Dict[str, Any]:
+    """List the loaded networks with their memory use.
+    
+    Networks that do not fit in the memory budget are kept on disk and reloaded
+    automatically when a tool uses them.
+    
+    Returns:
+        Dict containing the network handles, which one is current and their size in bytes
+    """
+    logger.info("Listing networks")
+    return {
+        "status": "success",
+        "message": f"{len(_networks.info())} networks loaded",
+        "networks": _networks.info(),
+        "resident_bytes": _networks.resident_bytes(),
+        "memory_budget_bytes": _networks.memory_budget
+    }
+
+@power_mcp_tool(mcp)
+@offloaded
+def remove_network(network: str) -> Dict[str, Any]:
+    """Remove a network and free its memory.
+    
+    Args:
+        network: Handle of the network to remove
+        
+    Returns:
+        Dict containing status
+    """
+    logger.info(f"Removing network {network}")
+    try:
+        _networks.remove(network)
+        _drop_branches(network)
+        return {"status": "success",
+                "message": f"Network {network} removed"}
+    except (RuntimeError, ValueError) as e:
+        return PowerError(
+            status="error",
+            message=str(e)
+        )
+
+@power_mcp_tool(mcp)
+@offloaded
+def load_network(file_path: str, network: Optional[str] = None, use_cache: bool = True) -> Dict[str, Any]:
     """Load a pandapower network from a file.
     
     Args:
-        file_path: Path to the network file (.json, .p)
+        file_path: Path to the network file (.json, .p) or network bundle (.ppnet)
+        network: Handle to load the network under (default: replaces the current network)
+        use_cache: Reuse the parsed network if this exact file content was loaded before
+            (bundles are read lazily table by table and are never cached)
         
     Returns:
         Dict containing status and network information
     """
     logger.info(f"Loading network from file: {file_path}")
-    global _current_net
     try:
+        file_path = file_path.rstrip(os.sep)
         if file_path.endswith('.json'):
-            _current_net = pp.from_json(file_path)
+            parse = pp.from_json
         elif file_path.endswith('.p'):
-            _current_net = pp.from_pickle(file_path)
+            parse = pp.from_pickle
+        elif file_path.endswith(BUNDLE_EXTENSION):
+            parse = load_bundle
+        else:
+            raise ValueError(f"Unsupported file format. Use .json, .p or {BUNDLE_EXTENSION} files.")
+        start = time.perf_counter()
+        if use_cache and parse is not load_bundle:
+            net, source = _parsed_networks.load(file_path, parse)
         else:
-            raise ValueError("Unsupported file format. Use .json or .p files.")
+            net, source = parse(file_path), "bundle" if parse is load_bundle else "parsed"
+        load_time = time.perf_counter() - start
+        handle = _put_network(net, network)
             
         return {
             "status": "success",
             "message": f"Network loaded successfully from {file_path}",
+            "network": handle,
+            "load": {"source": source, "time_s": round(load_time, 4)},
             "network_info": {
-                "buses": len(_current_net.bus),
-                "lines": len(_current_net.line),
-                "trafos": len(_current_net.trafo)
+                "buses": len(net.bus),
+                "lines": len(net.line),
+                "trafos": len(net.trafo)
             }
         }
     except FileNotFoundError:
@@ -111,9 +322,43 @@ def load_network(file_path: str) -> Dict[str, Any]:
             message=f"Failed to load network: {str(e)}"
         )
 
+# Solver structures refreshed by a recycled solve: injections of PQ buses and generators
+_RECYCLE = dict(trafo=False, gen=True, bus_pq=True)
+
+def _solve_power_flow(net: pp.pandapowerNet, parameters: Dict[str, Any], recycle: bool,
+                      network: Optional[str] = None) -> bool:
+    """Run runpp, recycling the solver structures of the previous solve when allowed.
+    
+    The structures are reused only if the previous solve on this network was
+    also done here, with the same parameters and network structure; any other
+    solve in between, e.g. a contingency analysis, replaces net._ppc.
+    
+    Returns:
+        Whether the solve was recycled
+    """
+    state = _networks.state(network)
+    recycle = recycle and parameters["algorithm"] == 'nr' and not net.controller.in_service.any()
+    if not recycle:
+        pp.runpp(net, **parameters)
+        state.pop("solved", None)
+        return False
+    
+    structure = (_networks.fingerprint(network, structure=True), *parameters.values())
+    previous = state.get("solved")
+    recycled = previous is not None and previous[0] == structure and previous[1] is net.get("_ppc")
+    if not recycled:
+        # Do not let runpp reuse structures of another network state
+        net._ppc = None
+    pp.runpp(net, **parameters, recycle=_RECYCLE)
+    state["solved"] = (structure, net._ppc)
+    return recycled
+
 @power_mcp_tool(mcp)
+@offloaded
 def run_power_flow(algorithm: str = 'nr', calculate_voltage_angles: bool = True, 
-                  max_iteration: int = 10, tolerance_mva: float = 1e-8) -> Dict[str, Any]:
+                  max_iteration: int = 10, tolerance_mva: float = 1e-8,
+                  network: Optional[str] = None, use_cache: bool = True,
+                  recycle: bool = False) -> Dict[str, Any]:
     """Run power flow analysis on the current network.
     
     Args:
@@ -121,35 +366,62 @@ def run_power_flow(algorithm: str = 'nr', calculate_voltage_angles: bool = True,
         calculate_voltage_angles: Consider voltage angles in calculation
         max_iteration: Maximum number of iterations
         tolerance_mva: Convergence tolerance in MVA
+        network: Handle of the network (default: the current network)
+        use_cache: Reuse the results of an earlier solve of the same network content
+            with the same parameters instead of solving again
+        recycle: Keep the admittance matrix and Jacobian structure of the previous solve
+            and only refresh the injections, when since then only load, sgen, storage or
+            gen setpoints changed (Newton-Raphson only). Speeds up repeated solves such
+            as load scaling studies
         
     Returns:
-        Message with status and saved path results
+        Message with status, the handle of the stored results and cache metrics
     """
     logger.info(f"Running power flow analysis")
     try:
-        net = _get_network()
-        pp.runpp(net, algorithm=algorithm, calculate_voltage_angles=calculate_voltage_angles,
-                max_iteration=max_iteration, tolerance_mva=tolerance_mva)
-        
-        # Extract key results
-        results = {
-            "bus_results": net.res_bus.to_dict(),
-            "line_results": net.res_line.to_dict(),
-            "trafo_results": net.res_trafo.to_dict(),
-            "converged": net.converged
+        net = _get_network(network)
+        start = time.perf_counter()
+        fingerprint = _networks.fingerprint(network)
+        fingerprint_s = time.perf_counter() - start
+        parameters = {
+            "algorithm": algorithm,
+            "calculate_voltage_angles": calculate_voltage_angles,
+            "max_iteration": max_iteration,
+            "tolerance_mva": tolerance_mva
         }
-        # with open(save_file, "r") as f:
-        #     js.dump(
-        #         {
-        #         "status": "success",
-        #         "message": "Power flow calculation completed successfully" if net.converged else "Power flow did not converge",
-        #         "results": results
-        #         },
-        #         f
-        #     )
+        key = (fingerprint, *parameters.values())
+        # Results pruned from the result store are solved again
+        cached = _power_flows.get(key, valid=lambda entry: result_exists(entry["result_handle"])) \
+            if use_cache else None
+        if cached is not None:
+            for table, results in cached["results"].items():
+                net[table] = results.copy()
+            net.converged = cached["converged"]
+            handle = cached["result_handle"]
+        else:
+            start = time.perf_counter()
+            recycled = _solve_power_flow(net, parameters, recycle, network)
+            solve_s = time.perf_counter() - start
+            
+            # Persist the result tables so follow-up questions do not need another solve
+            handle = store_results(net, {**parameters, "fingerprint": fingerprint})
+            _power_flows.put(key, {
+                "result_handle": handle,
+                "converged": bool(net.converged),
+                "results": {table: net[table].copy() for table in list(net.keys())
+                            if table.startswith('res_') and isinstance(net[table], pd.DataFrame)},
+                "solve_s": solve_s
+            })
+        _networks.changed(network, topology=False)
 
         return {"status": "success",
-                "message": f"Powerflow completed sucessfully. Converged: {net.converged}"}
+                "message": f"Powerflow completed sucessfully. Converged: {net.converged}",
+                "result_handle": handle,
+                "recycled": cached is None and recycled,
+                "cache": {"hit": cached is not None,
+                          "fingerprint": fingerprint[:16],
+                          "fingerprint_s": round(fingerprint_s, 4),
+                          **_power_flows.stats()}}
     except RuntimeError as re:
         return PowerError(
             status="error",
@@ -162,77 +434,164 @@ def run_power_flow(algorithm: str = 'nr', calculate_voltage_angles: bool = True,
         )
 
 @power_mcp_tool(mcp)
+@offloaded
+def query_results(result_handle: str,
+                  table: str = "res_bus",
+                  columns: Optional[List[str]] = None,
+                  filters: Optional[List[Dict[str, Any]]] = None,
+                  sort_by: Optional[str] = None,
+                  ascending: bool = False,
+                  top_k: Optional[int] = 50,
+                  group_by: Optional[List[str]] = None,
+                  aggregates: Optional[Dict[str, List[str]]] = None) -> Dict[str, Any]:
+    """Query stored power flow results on the server and return only the answer.
+    
+    Every table also has the columns name, vn_kv and zone (of the element's bus or
+    from/hv bus), plus from_bus/to_bus for lines and hv_bus/lv_bus for trafos.
+    
+    Examples:
+        Most loaded lines: table="res_line", sort_by="loading_percent", top_k=10
+        Low voltages: table="res_bus", filters=[{"column": "vm_pu", "op": "<", "value": 0.95}]
+        Mean loading per voltage level: table="res_line", group_by=["vn_kv"],
+            aggregates={"loading_percent": ["mean", "max"]}
+    
+    Args:
+        result_handle: Handle returned by run_power_flow
+        table: Result table ('res_bus', 'res_line', 'res_trafo', 'res_gen', ...)
+        columns: Columns to return (default: all)
+        filters: Conditions combined with AND, each {"column": ..., "op": ..., "value": ...}
+            with op one of ==, !=, <, <=, >, >=, in, not in, isnull, notnull
+        sort_by: Column to sort on
+        ascending: Sort in ascending order (default: descending)
+        top_k: Maximum number of rows to return (None returns all)
+        group_by: Columns to group on, e.g. ["vn_kv"] or ["zone"]
+        aggregates: Aggregates per column for group_by queries, among count, sum, mean,
+            std, min, max and median (default: mean, min and max of numeric columns)
+        
+    Returns:
+        Dict with the matching rows
+    """
+    logger.info(f"Querying {table} of results {result_handle}")
+    try:
+        frame = load_results(result_handle, [table])[table]
+        frame.index.name = "index"
+        frame = frame.reset_index()
+        if columns and not group_by:
+            # Always tell the caller which elements the rows belong to
+            columns = ["index"] + [column for column in columns if column != "index"]
+        answer = query_frame(frame, columns=columns, filters=filters, sort_by=sort_by,
+                             ascending=ascending, top_k=top_k, group_by=group_by,
+                             aggregates=aggregates)
+        return {
+            "status": "success",
+            "message": f"Query returned {len(answer)} rows",
+            "rows": js.loads(answer.to_json(orient="records"))
+        }
+    except ValueError as ve:
+        return PowerError(
+            status="error",
+            message=str(ve)
+        )
+    except Exception as e:
+        return PowerError(
+            status="error",
+            message=f"Failed to query results: {str(e)}"
+        )
+
+@power_mcp_tool(mcp)
+@offloaded
 def run_contingency_analysis(save_file : str,
                             contingency_type: str = "N-1", 
-                           elements: Optional[List[str]] = None) -> Dict[str, Any]:
+                           elements: Optional[List[str]] = None,
+                           n_workers: int = 1,
+                           chunk_size: Optional[int] = None,
+                           mode: str = "copy",
+                           screen_threshold: float = 90.0,
+                           output_format: str = "json",
+                           resume: bool = False,
+                           flush_every: int = 50,
+                           network: Optional[str] = None) -> Dict[str, Any]:
     """Run contingency analysis on the current network.
     
     Args:
-        save_file: A json file path (.json) to save the results
+        save_file: A json file path (.json, or .jsonl with output_format="jsonl") to save the results
         contingency_type: Type of contingency analysis ("N-1" or "N-2")
         elements: List of specific elements to analyze (optional)
+        n_workers: Number of worker processes (1 runs serially, 0 uses every CPU)
+        chunk_size: Number of outages sent to a worker at a time (optional)
+        mode: "copy" solves every outage on a deepcopy of the network, "inplace" toggles
+            in_service on the live network and warm starts from the base case voltages
+        screen_threshold: For N-2, estimated DC branch loading in percent above which an
+            outage pair is solved with AC power flow
+        output_format: "json" writes one document at the end, "jsonl" appends every
+            result to save_file as soon as it is solved
+        resume: With "jsonl", continue an interrupted run from its last completed contingency
+        flush_every: With "jsonl", number of results written between two flushes to disk
+        network: Handle of the network (default: the current network)
         
     Returns:
         Message with status and saved path results
     """
     logger.info(f"Running contingency analysis in {save_file}")
     try:
-        net = _get_network()
-        
-        # Store original state
-        orig_net = net.deepcopy()
-        results = []
+        net = _get_network(network)
         
         # Define elements to analyze
         if elements is None:
             elements = ['line', 'trafo']
+        screening = None
+        if contingency_type == "N-1":
+            outages = contingency_outages(net, elements)
+        elif contingency_type == "N-2":
+            outages, screening = double_outages(net, elements, screen_threshold=screen_threshold,
+                                                model=_get_sensitivity_model(network))
+        else:
+            raise ValueError(f"Unsupported contingency type '{contingency_type}'. Use 'N-1' or 'N-2'.")
+            
+        if output_format not in ("json", "jsonl"):
+            raise ValueError(f"Unsupported output format '{output_format}'. Use 'json' or 'jsonl'.")
+        completed = 0
+        if output_format == "jsonl" and resume:
+            completed = resume_jsonl_results(save_file, outages)
+        pending = outages[completed:]
             
         # Perform contingency analysis
-        for element_type in elements:
-            for idx in net[element_type].index:
-                # Create contingency by taking element out of service
-                contingency_net = orig_net.deepcopy()
-                contingency_net[element_type].at[idx, 'in_service'] = False
-                
-                try:
-                    pp.runpp(contingency_net)
-                    
-                    # Check for violations
-                    violations = {
-                        'voltage_violations': contingency_net.res_bus[
-                            (contingency_net.res_bus.vm_pu < 0.95) | 
-                            (contingency_net.res_bus.vm_pu > 1.05)
-                        ].index.tolist(),
-                        'loading_violations': contingency_net.res_line[
-                            contingency_net.res_line.loading_percent > 100
-                        ].index.tolist()
-                    }
-                    
-                    results.append({
-                        'contingency': f"{element_type}_{idx}",
-                        'converged': contingency_net.converged,
-                        'violations': violations
-                    })
-                    
-                except Exception as e:
-                    results.append({
-                        'contingency': f"{element_type}_{idx}",
-                        'converged': False,
-                        'error': str(e)
-                    })
-        
-        with open(save_file,"w") as f:
-            js.dump(
-                {
+        start = time.perf_counter()
+        if n_workers == 1:
+            stream = iter_outages_serial(net, pending, mode=mode)
+        else:
+            stream = iter_outages_parallel(net, pending, n_workers=n_workers or None,
+                                           chunk_size=chunk_size, mode=mode)
+        
+        stream = track_progress(stream, len(pending), "contingencies solved")
+        
+        if output_format == "jsonl":
+            with JsonlResultWriter(save_file, flush_every=flush_every, append=resume) as writer:
+                for result in stream:
+                    writer.write(result)
+        else:
+            output = {
                 "status": "success",
                 "message": "Contingency analysis completed",
-                "results": results
-                },
-                f
-            )
-        return {"statis": "success",
-                "message": f"Contingency analysis completed succesfully and saved to {save_file}"}
-    except RuntimeError as re:
+                "results": list(stream)
+            }
+            if screening is not None:
+                output["screening"] = screening
+            with open(save_file,"w") as f:
+                js.dump(output, f)
+        elapsed = time.perf_counter() - start
+        
+        response = {"status": "success",
+                    "message": f"Contingency analysis completed succesfully and saved to {save_file}"}
+        if output_format == "jsonl":
+            response["contingencies"] = {"total": len(outages), "resumed_from": completed,
+                                         "solved": len(pending)}
+        if screening is not None:
+            response["screening"] = screening
+        if mode == "inplace":
+            response["performance"] = copy_savings(net, len(pending), elapsed)
+        return response
+    except (RuntimeError, ValueError) as re:
         return PowerError(
             status="error",
             message=str(re)
@@ -243,16 +602,703 @@ def run_contingency_analysis(save_file : str,
             message=f"Contingency analysis failed: {str(e)}"
         )
 
+@power_mcp_tool(mcp)
+@offloaded
+def summarize_results(result_handle: Optional[str] = None, tables: Optional[List[str]] = None,
+                      columns: Optional[Dict[str, List[str]]] = None,
+                      group_by: Optional[List[str]] = None, bins: int = 10,
+                      max_tokens: Optional[int] = 2000, max_bytes: Optional[int] = None,
+                      network: Optional[str] = None) -> Dict[str, Any]:
+    """Summarize power flow results on the server: statistics overall and per voltage level and zone.
+    
+    For every column: count, mean, std, min and max with the element where they occur,
+    and a histogram. The response is cut to fit the budget: overall statistics come
+    first, then the per-group statistics, then the histograms; left out parts are listed.
+    
+    Examples:
+        Voltage and loading overview: no arguments after run_power_flow
+        Mean line loading per voltage level: tables=["res_line"], columns={"res_line": ["loading_percent"]},
+            group_by=["vn_kv"]
+    
+    Args:
+        result_handle: Handle returned by run_power_flow (default: the results of the network)
+        tables: Result tables to summarize (default: res_bus, res_line, res_trafo and res_gen)
+        columns: Columns per table, e.g. {"res_bus": ["vm_pu"]} (default: the main result
+            columns of each table)
+        group_by: Columns to group on (default: ["vn_kv", "zone"]); [] for overall statistics only
+        bins: Number of histogram bins
+        max_tokens: Approximate token budget of the response, at about 4 bytes per token
+        max_bytes: Byte budget of the response, used instead of or with max_tokens
+        network: Handle of the network, when no result_handle is given (default: the current network)
+        
+    Returns:
+        Dict with the statistics of each table and the parts left out to fit the budget
+    """
+    logger.info(f"Summarizing results {result_handle or network or ''}")
+    try:
+        if bins < 1:
+            raise ValueError("bins must be at least 1.")
+        group_by = ["vn_kv", "zone"] if group_by is None else group_by
+        requested = list(tables or DEFAULT_SUMMARY_COLUMNS)
+        if result_handle is not None:
+            frames = load_results(result_handle, requested if tables else None)
+        else:
+            net = _get_network(network)
+            if not len(net.res_bus):
+                raise ValueError("The network has no results. Run run_power_flow first.")
+            for table in requested:
+                if tables and table not in net:
+                    raise ValueError(f"Unknown result table '{table}'.")
+            frames = {table: result_frame(net, table) for table in requested if table in net and len(net[table])}
+        
+        summaries = {}
+        for table in requested:
+            if table not in frames:
+                continue
+            frame = frames[table]
+            chosen = (columns or {}).get(table)
+            if chosen is None:
+                chosen = [column for column in DEFAULT_SUMMARY_COLUMNS.get(table, ()) if column in frame]
+            summaries[table] = summarize_frame(frame, chosen, group_by, bins=bins)
+        
+        response = {
+            "status": "success",
+            "message": f"Summarized {', '.join(summaries) or 'no tables'}",
+            "group_by": group_by,
+            "rows": {table: summary["rows"] for table, summary in summaries.items()},
+            "summaries": {},
+            "omitted": []
+        }
+        parts = ("overall", "groups", "histograms") if group_by else ("overall", "histograms")
+        # Overall statistics of every table first, histograms last
+        sections = [(table, part, summary[part]) for part in parts for table, summary in summaries.items()]
+        budget = min(4 * max_tokens if max_tokens else float("inf"), max_bytes or float("inf"))
+        # Room is kept for the names of the left out sections, in case all are
+        reserved = len(js.dumps(response)) + len(js.dumps([f"{table}.{part}" for table, part, _ in sections]))
+        response["summaries"], response["omitted"] = fit_budget(sections, budget - reserved)
+        return response
+    except (RuntimeError, ValueError) as e:
+        return PowerError(
+            status="error",
+            message=str(e)
+        )
+    except Exception as e:
+        return PowerError(
+            status="error",
+            message=f"Summarizing the results failed: {str(e)}"
+        )
+
+@power_mcp_tool(mcp)
+@offloaded
+def read_contingency_results(save_file: str, offset: int = 0, limit: int = 100,
+                             violations_only: bool = False) -> Dict[str, Any]:
+    """Read a page of results from a contingency analysis saved as JSON Lines (.jsonl).
+    
+    Args:
+        save_file: JSONL file written by run_contingency_analysis with output_format="jsonl"
+        offset: Number of matching results to skip
+        limit: Maximum number of results to return
+        violations_only: Only return contingencies that diverged or have violations
+        
+    Returns:
+        Dict with the requested results and whether more are available
+    """
+    logger.info(f"Reading contingency results from {save_file}")
+    try:
+        page = []
+        matched = 0
+        has_more = False
+        for result in read_jsonl_results(save_file):
+            if violations_only and result.get('converged') and not any(result['violations'].values()):
+                continue
+            matched += 1
+            if matched <= offset:
+                continue
+            if len(page) == limit:
+                has_more = True
+                break
+            page.append(result)
+        return {
+            "status": "success",
+            "message": f"Read {len(page)} contingency results from {save_file}",
+            "results": page,
+            "next_offset": offset + len(page) if has_more else None
+        }
+    except FileNotFoundError:
+        return PowerError(
+            status="error",
+            message=f"File not found: {save_file}"
+        )
+    except Exception as e:
+        return PowerError(
+            status="error",
+            message=f"Failed to read contingency results: {str(e)}"
+        )
+
+@power_mcp_tool(mcp)
+@offloaded
+def rank_contingencies(top_k: int = 20, save_file: Optional[str] = None,
+                       network: Optional[str] = None) -> Dict[str, Any]:
+    """Rank all single line and trafo outages by estimated post-contingency overload.
+    
+    Uses DC PTDF/LODF sensitivities that are built once per network and reused until
+    the topology changes. Use it to pick the outages worth a full AC contingency run.
+    Outages that split the network cannot be estimated and are listed last. Branches
+    without a rating (or a placeholder one of 9900 MVA or more) are never counted as
+    overloaded; their number is returned as unrated_branches.
+    
+    Args:
+        top_k: Number of most severe outages to return
+        save_file: A json file path (.json) to save the full ranking (optional)
+        network: Handle of the network (default: the current network)
+        
+    Returns:
+        Dict with the most severe outages and timing information
+    """
+    logger.info("Ranking branch outages with PTDF/LODF sensitivities")
+    try:
+        _get_network(network)
+        cached = "sensitivity" in _networks.caches(network)
+        start = time.perf_counter()
+        model = _get_sensitivity_model(network)
+        built = time.perf_counter()
+        ranking = rank_single_outages(model)
+        ranked = time.perf_counter()
+        
+        outages = []
+        for pos, loading, worst, n_overloads, islanding in zip(
+                ranking["position"], ranking["max_loading_percent"], ranking["worst_branch"],
+                ranking["n_overloads"], ranking["islanding"]):
+            element_type, idx = model.branches[pos]
+            worst_type, worst_idx = model.branches[worst]
+            outages.append({
+                "contingency": f"{element_type}_{idx}",
+                "islanding": bool(islanding),
+                "max_loading_percent": None if islanding else round(float(loading), 2),
+                "most_loaded_branch": None if islanding else f"{worst_type}_{worst_idx}",
+                "n_overloads": None if islanding else int(n_overloads)
+            })
+        
+        if save_file is not None:
+            with open(save_file, "w") as f:
+                js.dump({"status": "success", "message": "Contingency ranking completed", "ranking": outages}, f)
+        
+        return {
+            "status": "success",
+            "message": f"Ranked {len(outages)} branch outages" +
+                       (f" and saved the full ranking to {save_file}" if save_file is not None else ""),
+            "ranking": outages[:top_k],
+            "islanding_outages": int(ranking["islanding"].sum()),
+            "unrated_branches": int(model.unrated.sum()),
+            "timing": {
+                "sensitivities_cached": cached,
+                "build_s": round(built - start, 4),
+                "rank_s": round(ranked - built, 4)
+            }
+        }
+    except RuntimeError as re:
+        return PowerError(
+            status="error",
+            message=str(re)
+        )
+    except Exception as e:
+        return PowerError(
+            status="error",
+            message=f"Contingency ranking failed: {str(e)}"
+        )
+
+@power_mcp_tool(mcp)
+@offloaded
+def run_scenario_batch(scenarios: List[Dict[str, Any]], n_workers: int = 1,
+                       chunk_size: Optional[int] = None,
+                       network: Optional[str] = None) -> Dict[str, Any]:
+    """Solve several what-if scenarios of a network and compare them in one table.
+    
+    Each scenario is applied as an overlay on the network and undone after its solve,
+    so the network itself is left unchanged. Every solve is warm-started from the base
+    case voltages.
+    
+    Example:
+        scenarios=[{"name": "loads +5%", "scale": {"load": 1.05}},
+                   {"name": "line 3 out", "outages": [["line", 3]]},
+                   {"name": "gen 0 at 1.02 pu", "setpoints": [
+                       {"element": "gen", "index": 0, "column": "vm_pu", "value": 1.02}]}]
+    
+    Args:
+        scenarios: Scenarios, each a dict with a name and any of
+            scale: factor per element table (load, sgen, gen, storage) applied to p_mw and q_mvar,
+            outages: [element, index] pairs taken out of service,
+            setpoints: {"element", "index", "column", "value"} changes
+        n_workers: Number of worker processes (1 runs serially, 0 uses every CPU)
+        chunk_size: Number of scenarios sent to a worker at a time (optional)
+        network: Handle of the network (default: the current network)
+        
+    Returns:
+        Dict with one row per scenario, base case first: losses, minimum and maximum
+        voltages and the highest branch loading
+    """
+    logger.info(f"Running {len(scenarios)} scenarios")
+    try:
+        net = _get_network(network)
+        names = [scenario.get("name") or f"scenario_{i}" for i, scenario in enumerate(scenarios)]
+        batch = [(name, scenario_overlay(net, {**scenario, "name": name}))
+                 for name, scenario in zip(names, scenarios)]
+        tables = sorted({table for _, overlay in batch for table, _, _, _ in overlay})
+        dtypes = {table: net[table].dtypes.copy() for table in tables}
+        
+        if n_workers == 1:
+            stream = iter_scenarios_serial(net, batch)
+        else:
+            stream = iter_scenarios_parallel(net, batch, n_workers=n_workers or None, chunk_size=chunk_size)
+        try:
+            rows = list(track_progress(stream, len(batch) + 1, "scenarios solved"))
+        finally:
+            # The overlays are undone, but a table whose dtypes differ afterwards did change
+            changed = [table for table in tables if not net[table].dtypes.equals(dtypes[table])]
+            if changed:
+                _invalidate_network_caches(network, tables=changed)
+        
+        failed = sum(not row["converged"] for row in rows)
+        return {
+            "status": "success",
+            "message": f"Solved {len(batch)} scenarios" + (f", {failed} did not converge" if failed else ""),
+            "columns": list(SUMMARY_COLUMNS),
+            "rows": [[row[column] for column in SUMMARY_COLUMNS] for row in rows]
+        }
+    except (RuntimeError, ValueError) as e:
+        return PowerError(
+            status="error",
+            message=str(e)
+        )
+    except Exception as e:
+        return PowerError(
+            status="error",
+            message=f"Scenario batch failed: {str(e)}"
+        )
+
+@power_mcp_tool(mcp)
+@offloaded
+def fork_network(branch: str, network: Optional[str] = None,
+                 parent_branch: Optional[str] = None) -> Dict[str, Any]:
+    """Fork a scenario branch off a network or off another branch.
+    
+    A branch only stores the cells its edits change, so many what-if branches of a
+    large network fit in memory where full copies would not. Edit it with edit_branch
+    and solve it with solve_branch; the network itself is never changed.
+    
+    Args:
+        branch: Name of the new branch
+        network: Handle of the network to fork (default: the current network)
+        parent_branch: Branch to fork instead, the new branch starts with its changes
+        
+    Returns:
+        Dict with the branch and the network it is based on
+    """
+    logger.info(f"Forking branch {branch}")
+    try:
+        if parent_branch is not None:
+            scenario = _get_branch(parent_branch).fork()
+        else:
+            _get_network(network)
+            handle = _networks.current if network is None else network
+            scenario = NetworkBranch(handle, _networks.fingerprint(handle))
+        with _branches_lock:
+            if branch in _branches:
+                raise ValueError(f"Branch '{branch}' already exists.")
+            _branches[branch] = scenario
+        return {
+            "status": "success",
+            "message": f"Branch '{branch}' forked from '{scenario.network}'",
+            "branch": branch,
+            "network": scenario.network,
+            "changed_cells": scenario.cells()
+        }
+    except (RuntimeError, ValueError) as e:
+        return PowerError(
+            status="error",
+            message=str(e)
+        )
+    except Exception as e:
+        return PowerError(
+            status="error",
+            message=f"Forking failed: {str(e)}"
+        )
+
+@power_mcp_tool(mcp)
+@offloaded
+def edit_branch(branch: str, scale: Optional[Dict[str, float]] = None,
+                outages: Optional[List[List[Any]]] = None,
+                setpoints: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+    """Change a scenario branch; the changes are stored as a diff over its network.
+    
+    Args:
+        branch: Name of the branch
+        scale: Factor per element table (load, sgen, gen, storage) applied to the
+            branch's p_mw and q_mvar, e.g. {"load": 1.05}
+        outages: [element, index] pairs taken out of service, e.g. [["line", 3]]
+        setpoints: Changes {"element": ..., "index": ..., "column": ..., "value": ...}
+        
+    Returns:
+        Dict with the number of cells changed
+    """
+    logger.info(f"Editing branch {branch}")
+    try:
+        scenario = _get_branch(branch)
+        net = scenario.materialize(_get_network(scenario.network))
+        overlay = scenario_overlay(net, {"name": branch, "scale": scale, "outages": outages,
+                                         "setpoints": setpoints})
+        cells = scenario.update(overlay)
+        return {
+            "status": "success",
+            "message": f"Changed {cells} cells of branch '{branch}'",
+            "changed_cells": scenario.cells(),
+            "diff_bytes": scenario.nbytes()
+        }
+    except (RuntimeError, ValueError) as e:
+        return PowerError(
+            status="error",
+            message=str(e)
+        )
+    except Exception as e:
+        return PowerError(
+            status="error",
+            message=f"Editing the branch failed: {str(e)}"
+        )
+
+@power_mcp_tool(mcp)
+@offloaded
+def solve_branch(branch: str, algorithm: str = 'nr', calculate_voltage_angles: bool = True,
+                 max_iteration: int = 50, tolerance_mva: float = 1e-8) -> Dict[str, Any]:
+    """Run a power flow on a scenario branch.
+    
+    The branch is materialized on top of its network for the solve, warm-started from
+    the network's last power flow results. Results are stored server-side like those
+    of run_power_flow; inspect them with query_results and the returned result_handle.
+    
+    Args:
+        branch: Name of the branch
+        algorithm: Power flow algorithm ('nr', 'bfsw', 'gs', 'fdbx', 'fdxb')
+        calculate_voltage_angles: Consider voltage angles in the power flow
+        max_iteration: Maximum number of iterations
+        tolerance_mva: Convergence tolerance in MVA
+        
+    Returns:
+        Dict with the result handle and the losses, voltage extremes and highest loading
+    """
+    logger.info(f"Solving branch {branch}")
+    try:
+        scenario = _get_branch(branch)
+        parent = _get_network(scenario.network)
+        net = scenario.materialize(parent)
+        init = "auto"
+        if parent.converged and len(parent.res_bus) == len(parent.bus):
+            # The voltages of internal nodes, e.g. trafo3w star points, are read from the branch results
+            for table in ("res_bus", "res_line", "res_trafo3w", "res_xward"):
+                if table in parent:
+                    net[table] = parent[table].copy()
+            init = "results"
+        pp.runpp(net, algorithm=algorithm, calculate_voltage_angles=calculate_voltage_angles,
+                 max_iteration=max_iteration, tolerance_mva=tolerance_mva, init=init)
+        handle = store_results(net, metadata={"network": scenario.network, "branch": branch})
+        summary = scenario_summary(net, branch)
+        return {
+            "status": "success",
+            "message": f"Power flow of branch '{branch}' converged",
+            "result_handle": handle,
+            "summary": {key: value for key, value in summary.items() if key not in ("scenario", "error")},
+            "changed_cells": scenario.cells(),
+            "network_changed_since_fork": scenario.fingerprint != _networks.fingerprint(scenario.network)
+        }
+    except pp.LoadflowNotConverged:
+        return PowerError(
+            status="error",
+            message=f"Power flow of branch '{branch}' did not converge"
+        )
+    except (RuntimeError, ValueError) as e:
+        return PowerError(
+            status="error",
+            message=str(e)
+        )
+    except Exception as e:
+        return PowerError(
+            status="error",
+            message=f"Solving the branch failed: {str(e)}"
+        )
+
+@power_mcp_tool(mcp)
+def list_branches(branch: Optional[str] = None) -> Dict[str, Any]:
+    """List the scenario branches, or the changes of one branch.
+    
+    Args:
+        branch: Name of a branch to list the changed cells of (default: list all branches)
+        
+    Returns:
+        Dict with the branches or the changes of the branch
+    """
+    try:
+        if branch is not None:
+            changes = _get_branch(branch).changes()
+            return {
+                "status": "success",
+                "message": f"Branch '{branch}' changes {len(changes)} cells",
+                "changes": changes[:200]
+            }
+        with _branches_lock:
+            branches = list(_branches.items())
+        return {
+            "status": "success",
+            "message": f"{len(branches)} branches",
+            "branches": [{"branch": name, "network": scenario.network, "changed_cells": scenario.cells(),
+                          "diff_bytes": scenario.nbytes()} for name, scenario in branches]
+        }
+    except ValueError as e:
+        return PowerError(
+            status="error",
+            message=str(e)
+        )
+
+@power_mcp_tool(mcp)
+def remove_branch(branch: str) -> Dict[str, Any]:
+    """Delete a scenario branch.
+    
+    Args:
+        branch: Name of the branch
+        
+    Returns:
+        Dict with the status
+    """
+    with _branches_lock:
+        removed = _branches.pop(branch, None)
+    if removed is None:
+        return PowerError(
+            status="error",
+            message=f"No branch named '{branch}'."
+        )
+    return {"status": "success", "message": f"Branch '{branch}' removed"}
+
+@power_mcp_tool(mcp)
+@offloaded
+def materialize_branch(branch: str, network: str) -> Dict[str, Any]:
+    """Turn a scenario branch into a full network, e.g. to edit it further or save it.
+    
+    Args:
+        branch: Name of the branch
+        network: Handle to register the new network under
+        
+    Returns:
+        Dict with the handle of the new network
+    """
+    logger.info(f"Materializing branch {branch} as {network}")
+    try:
+        scenario = _get_branch(branch)
+        # The materialized view shares its unchanged tables with the parent
+        net = scenario.materialize(_get_network(scenario.network)).deepcopy()
+        # The locks of both networks are held, see _network_lock
+        handle = _put_network(net, network)
+        return {
+            "status": "success",
+            "message": f"Branch '{branch}' materialized as network '{handle}'",
+            "network": handle
+        }
+    except (RuntimeError, ValueError) as e:
+        return PowerError(
+            status="error",
+            message=str(e)
+        )
+    except Exception as e:
+        return PowerError(
+            status="error",
+            message=f"Materializing the branch failed: {str(e)}"
+        )
+
+@power_mcp_tool(mcp)
+@offloaded
+def analyze_topology(limit: int = 100, network: Optional[str] = None) -> Dict[str, Any]:
+    """Find the islands, parallel branches and series chains of the network.
+    
+    Islands are groups of buses connected by in-service lines, trafos, impedances
+    and closed switches; an island without an ext_grid or slack gen is unsupplied.
+    Parallel groups are branches between the same two buses, series chains are
+    branches joined through buses with no other branch and nothing attached.
+    The graph is cached per network and only the edited tables are reread after a change.
+    
+    Args:
+        limit: Maximum number of items in each list (islands, buses of an island,
+            unsupplied elements, parallel groups, series chains); the totals are always given
+        network: Handle of the network (default: the current network)
+        
+    Returns:
+        Dict with the islands, unsupplied elements, parallel groups and series chains
+    """
+    logger.info("Analyzing network topology")
+    try:
+        start = time.perf_counter()
+        graph, changed = _get_topology(network)
+        report = graph.report(limit=limit)
+        return {
+            "status": "success",
+            "message": f"{report['n_islands']} islands ({report['n_unsupplied_islands']} without slack), "
+                       f"{report['n_parallel_groups']} parallel branch groups, "
+                       f"{report['n_series_chains']} series chains",
+            **report,
+            "timing": {
+                "reread_tables": changed,
+                "elapsed_s": round(time.perf_counter() - start, 4)
+            }
+        }
+    except (RuntimeError, ValueError) as e:
+        return PowerError(
+            status="error",
+            message=str(e)
+        )
+    except Exception as e:
+        return PowerError(
+            status="error",
+            message=f"Topology analysis failed: {str(e)}"
+        )
+
+@power_mcp_tool(mcp)
+@offloaded
+def get_bus_elements(buses: Optional[List[int]] = None, network: Optional[str] = None) -> Dict[str, Any]:
+    """List the elements attached to buses, or count them for every bus.
+    
+    Covers loads, sgens, gens, ext_grids, shunts, storages, wards, motors, lines,
+    trafos, impedances, dclines and switches. Answers come from an index kept
+    up to date by every tool that edits the network.
+    
+    Args:
+        buses: Bus indices to list the attached elements of, e.g. [2, 5]
+            (default: the number of attached elements of each type at every bus)
+        network: Handle of the network (default: the current network)
+        
+    Returns:
+        Dict with the elements of each bus by type, or a table of counts per bus
+    """
+    logger.info(f"Getting the elements of {'all' if buses is None else len(buses)} buses")
+    try:
+        incidence = _get_incidence(network)
+        if buses is not None:
+            attached = incidence.attached(buses)
+            return {
+                "status": "success",
+                "message": f"Elements of {len(buses)} buses",
+                "buses": [{"bus": int(bus), "n_elements": sum(len(elements) for elements in by_type.values()),
+                           "elements": by_type} for bus, by_type in zip(buses, attached)]
+            }
+        counts = incidence.counts()
+        present = np.flatnonzero(counts.any(axis=0))
+        table = np.column_stack([incidence.bus_index, counts[:, present], counts.sum(axis=1)])
+        return {
+            "status": "success",
+            "message": f"Number of attached elements of {len(table)} buses",
+            "columns": ["bus", *[list(BUS_COLUMNS)[code] for code in present], "total"],
+            "rows": table.tolist()
+        }
+    except (RuntimeError, ValueError) as e:
+        return PowerError(
+            status="error",
+            message=str(e)
+        )
+    except Exception as e:
+        return PowerError(
+            status="error",
+            message=f"Getting the bus elements failed: {str(e)}"
+        )
+
+# Largest page get_table returns
+MAX_PAGE_ROWS = 1000
+
+@power_mcp_tool(mcp)
+@offloaded
+def get_table(table: Optional[str] = None, columns: Optional[List[str]] = None,
+              filters: Optional[List[Dict[str, Any]]] = None, offset: int = 0, limit: int = 100,
+              page_token: Optional[str] = None, network: Optional[str] = None) -> Dict[str, Any]:
+    """Read a page of rows of an element table of the network.
+    
+    Rows are returned as lists in the order of the returned columns, the element
+    index first. Pass the returned next_page_token to read the next page; it
+    fails if the table changed in between.
+    
+    Examples:
+        All buses, page by page: table="bus", columns=["name", "vn_kv", "zone"]
+        High voltage lines: table="line", filters=[{"column": "max_i_ka", "op": ">", "value": 1}]
+    
+    Args:
+        table: Element table, e.g. 'bus', 'line', 'trafo', 'load', 'gen', 'switch'
+        columns: Columns to return (default: all)
+        filters: Conditions combined with AND, each {"column": ..., "op": ..., "value": ...}
+            with op one of ==, !=, <, <=, >, >=, in, not in, isnull, notnull
+        offset: Number of matching rows to skip
+        limit: Maximum number of rows to return, at most 1000
+        page_token: Token of the next page from a previous call; replaces table,
+            columns, filters and offset
+        network: Handle of the network (default: the current network)
+        
+    Returns:
+        Dict with the columns, the rows, the total number of matching rows and the next page token
+    """
+    try:
+        if page_token is not None:
+            query = decode_page_token(page_token)
+            table, columns, filters, offset = query.get("table"), query.get("columns"), query.get("filters"), \
+                query.get("offset", 0)
+        logger.info(f"Reading {table} rows from {offset}")
+        if table is None:
+            raise ValueError("Give the table to read, or the page_token of a previous call.")
+        if offset < 0 or not 0 < limit <= MAX_PAGE_ROWS:
+            raise ValueError(f"offset must not be negative and limit must be between 1 and {MAX_PAGE_ROWS}.")
+        net = _get_network(network)
+        if table not in input_tables(net):
+            raise ValueError(f"Unknown table '{table}'. Available: {', '.join(input_tables(net))}")
+        # Pages are only consistent while the table stays the same
+        digest = _networks.table_digests(network, [table])[table][:16]
+        if page_token is not None and query.get("digest") != digest:
+            raise ValueError(f"Table '{table}' changed since the first page. Start again without page_token.")
+        
+        frame = net[table]
+        if filters:
+            frame = query_frame(frame, filters=filters)
+        if columns:
+            columns = [column for column in columns if column != "index"]
+            query_frame(frame.iloc[:0], columns=columns)
+            frame = frame[columns]
+        total = len(frame)
+        page = frame.iloc[offset:offset + limit]
+        next_offset = offset + len(page)
+        return {
+            "status": "success",
+            "message": f"Rows {offset} to {next_offset} of {total} matching rows of {table}",
+            "columns": ["index", *page.columns],
+            "rows": js.loads(page.reset_index().to_json(orient="values", default_handler=str)),
+            "total": total,
+            "next_page_token": encode_page_token({"table": table, "columns": columns, "filters": filters,
+                                                  "offset": next_offset, "digest": digest})
+                               if next_offset < total else None
+        }
+    except (RuntimeError, ValueError) as e:
+        return PowerError(
+            status="error",
+            message=str(e)
+        )
+    except Exception as e:
+        return PowerError(
+            status="error",
+            message=f"Reading the table failed: {str(e)}"
+        )
+
 #@power_mcp_tool(mcp)
-def get_network_info() -> Dict[str, Any]:
+def get_network_info(network: Optional[str] = None) -> Dict[str, Any]:
     """Get information about the current network.
     
+    Args:
+        network: Handle of the network (default: the current network)
+    
     Returns:
         Dict containing network statistics and information
     """
     logger.info("Retrieving network information")
     try:
-        net = _get_network()
+        net = _get_network(network)
         info = {
             "buses": len(net.bus),
             "lines": len(net.line),
@@ -280,8 +1326,10 @@ def get_network_info() -> Dict[str, Any]:
             status="error",
             message=f"Failed to get network information: {str(e)}"
         )
-@power_mcp_tool(mcp)  
-def add_bus(name: str, vn_kv: float, type: str = 'b', zone: Optional[str] = None) -> Dict[str,Any]:
+@power_mcp_tool(mcp)
+@offloaded
+def add_bus(name: str, vn_kv: float, type: str = 'b', zone: Optional[str] = None,
+            network: Optional[str] = None) -> Dict[str,Any]:
     """Add a bus to the current network.
     
     Args:
@@ -289,14 +1337,16 @@ def add_bus(name: str, vn_kv: float, type: str = 'b', zone: Optional[str] = None
         vn_kv: Nominal voltage in kV
         type: Type of bus ('b', 'n', 'e')
         zone: Zone of the bus (optional)
+        network: Handle of the network (default: the current network)
         
     Returns:
         Index of the newly created bus
     """
     logger.info(f"Adding bus: {name}")
     try:
-        net = _get_network()
+        net = _get_network(network)
         bus_idx = pp.create_bus(net, vn_kv=vn_kv, name=name, type=type, zone=zone)
+        _invalidate_network_caches(network, tables=['bus'])
         return {"status": "success",
                 "bus_index": bus_idx}
     except RuntimeError as re:
@@ -305,7 +1355,9 @@ def add_bus(name: str, vn_kv: float, type: str = 'b', zone: Optional[str] = None
         raise RuntimeError(f"Failed to add bus: {str(e)}")
     
 @power_mcp_tool(mcp)
-def add_line(from_bus: int, to_bus: int, length: float, std_type: str, name: Optional[str] = None) -> Dict[str, Any]:
+@offloaded
+def add_line(from_bus: int, to_bus: int, length: float, std_type: str, name: Optional[str] = None,
+             network: Optional[str] = None) -> Dict[str, Any]:
     """Add a line to the current network. 
     Standards:
     NAYY 4x50 SE
@@ -320,6 +1372,7 @@ def add_line(from_bus: int, to_bus: int, length: float, std_type: str, name: Opt
         length: Length of the line in km
         std_type: Standard line type (as defined in pandapower library or custom)
         name: Optional name of the line
+        network: Handle of the network (default: the current network)
 
     Returns:
         Index of the newly created line
@@ -327,7 +1380,7 @@ def add_line(from_bus: int, to_bus: int, length: float, std_type: str, name: Opt
     logger.info(f"Adding line: {name or f'{from_bus}-{to_bus}'} ({std_type}, {length} km)")
     logger.info(f"from_bus {from_bus} to_bus {to_bus} length {length} std_type {std_type} name {name}")
     try:
-        net = _get_network()
+        net = _get_network(network)
 
         # # Allow using bus names instead of indices
         # if isinstance(from_bus, str):
@@ -343,6 +1396,7 @@ def add_line(from_bus: int, to_bus: int, length: float, std_type: str, name: Opt
         # Create the line
         line_idx = pp.create_line(net, from_bus=from_bus, to_bus=to_bus,
                                   length_km=length, std_type=std_type, name=name)
+        _invalidate_network_caches(network, tables=['line'])
 
         return {"status": "success",
                 "line_index": line_idx}
@@ -352,74 +1406,354 @@ def add_line(from_bus: int, to_bus: int, length: float, std_type: str, name: Opt
     except Exception as e:
         raise RuntimeError(f"Failed to add line: {str(e)}")
 
-@power_mcp_tool(mcp)  
-def timeseries(time_steps: int):
+def _add_elements(element: str, rows: Rows, network: Optional[str]) -> Dict[str, Any]:
+    """Create many elements of one type in one vectorized call, or none if any row is invalid."""
+    logger.info(f"Adding {element} elements in bulk")
+    try:
+        net = _get_network(network)
+        indices, errors = add_elements(net, element, rows)
+        if errors:
+            return {
+                "status": "error",
+                "message": f"{len(errors)} {element} rows are invalid, nothing was created",
+                "row_errors": errors
+            }
+        _invalidate_network_caches(network, tables=[element])
+        return {
+            "status": "success",
+            "message": f"Created {len(indices)} {element} elements",
+            f"{element}_indices": indices
+        }
+    except (RuntimeError, ValueError) as e:
+        return PowerError(
+            status="error",
+            message=str(e)
+        )
+    except Exception as e:
+        return PowerError(
+            status="error",
+            message=f"Failed to add {element} elements: {str(e)}"
+        )
+
+@power_mcp_tool(mcp)
+@offloaded
+def add_buses(buses: Rows, network: Optional[str] = None) -> Dict[str, Any]:
+    """Add many buses to the network in one call.
+    
+    Args:
+        buses: One object per bus, or one list per column. Columns: vn_kv (required),
+            name, type ('b', 'n', 'm'), zone, in_service, max_vm_pu, min_vm_pu, index
+        network: Handle of the network (default: the current network)
+        
+    Returns:
+        Indices of the new buses, or the errors of each invalid row if nothing was created
+    """
+    return _add_elements('bus', buses, network)
+
+@power_mcp_tool(mcp)
+@offloaded
+def add_lines(lines: Rows, network: Optional[str] = None) -> Dict[str, Any]:
+    """Add many lines to the network in one call.
+    
+    Args:
+        lines: One object per line, or one list per column. Columns: from_bus, to_bus
+            (bus index or unique bus name), length_km, std_type (e.g. 'NAYY 4x150 SE') (required),
+            name, parallel, df, in_service, max_loading_percent, index
+        network: Handle of the network (default: the current network)
+        
+    Returns:
+        Indices of the new lines, or the errors of each invalid row if nothing was created
+    """
+    return _add_elements('line', lines, network)
+
+@power_mcp_tool(mcp)
+@offloaded
+def add_loads(loads: Rows, network: Optional[str] = None) -> Dict[str, Any]:
+    """Add many loads to the network in one call.
+    
+    Args:
+        loads: One object per load, or one list per column. Columns: bus (bus index or
+            unique bus name), p_mw (required), q_mvar, name, scaling, sn_mva, const_z_percent,
+            const_i_percent, type ('wye', 'delta'), in_service, controllable,
+            max_p_mw, min_p_mw, max_q_mvar, min_q_mvar, index
+        network: Handle of the network (default: the current network)
+        
+    Returns:
+        Indices of the new loads, or the errors of each invalid row if nothing was created
+    """
+    return _add_elements('load', loads, network)
+
+@power_mcp_tool(mcp)
+@offloaded
+def add_sgens(sgens: Rows, network: Optional[str] = None) -> Dict[str, Any]:
+    """Add many static generators (PV, wind, ...) to the network in one call.
+    
+    Args:
+        sgens: One object per static generator, or one list per column. Columns: bus (bus
+            index or unique bus name), p_mw (required), q_mvar, name, type, scaling, sn_mva,
+            in_service, controllable, max_p_mw, min_p_mw, max_q_mvar, min_q_mvar, index
+        network: Handle of the network (default: the current network)
+        
+    Returns:
+        Indices of the new static generators, or the errors of each invalid row if nothing was created
+    """
+    return _add_elements('sgen', sgens, network)
+
+@power_mcp_tool(mcp)
+@offloaded
+def add_gens(gens: Rows, network: Optional[str] = None) -> Dict[str, Any]:
+    """Add many voltage controlled generators to the network in one call.
+    
+    Args:
+        gens: One object per generator, or one list per column. Columns: bus (bus index or
+            unique bus name), p_mw (required), vm_pu, name, scaling, sn_mva, slack, slack_weight,
+            in_service, controllable, max_p_mw, min_p_mw, max_q_mvar, min_q_mvar,
+            max_vm_pu, min_vm_pu, index
+        network: Handle of the network (default: the current network)
+        
+    Returns:
+        Indices of the new generators, or the errors of each invalid row if nothing was created
+    """
+    return _add_elements('gen', gens, network)
+
+@power_mcp_tool(mcp)
+@offloaded
+def timeseries(time_steps: Optional[int] = None, network: Optional[str] = None, recycle: bool = True,
+               load_profiles: Optional[str] = None, sgen_profiles: Optional[str] = None,
+               profile_variable: str = "p_mw", time_column: Optional[str] = None, seed: int = 0,
+               variables: Optional[List[str]] = None, downsample: int = 1,
+               aggregates: Optional[List[str]] = None, n_workers: int = 1):
     """
     Runs a timeseries on the network
 
+    Loads and static generators follow the given profile files. Elements without a
+    profile file get random profiles around their current p_mw, reproducible with seed.
+
+    Only the requested result variables are kept. They are written to disk time step
+    by time step, so long runs on large networks do not fill the memory. Read them
+    back with read_timeseries_results and the returned result_handle.
+
+    With n_workers other than 1, the time steps are split into chunks solved on a
+    process pool. This needs every time step to be independent: networks with
+    controllers keeping state between time steps, such as tap changers, run serially.
+
     Args:
-        time_steps: Number of time steps
+        time_steps: Number of time steps (default: every row of the profile files)
+        network: Handle of the network (default: the current network)
+        recycle: Keep the admittance matrix and Jacobian structure across time steps
+            and only refresh the load and sgen injections
+        load_profiles: CSV or Parquet file with one row per time step and one column per
+            load, labelled with the load index or name. Read in chunks and memory-mapped,
+            so a year of 15-minute values for thousands of loads does not need to fit in memory
+        sgen_profiles: Same as load_profiles for static generators
+        profile_variable: Column set by the profiles: "p_mw" or "q_mvar" for absolute
+            values, "scaling" for multipliers of the element's nominal power
+        time_column: Column of the profile files holding the time stamps
+        seed: Seed of the random profiles
+        variables: Result variables to store as 'table.column'
+            (default: ["res_bus.vm_pu", "res_line.loading_percent"])
+        downsample: Store the mean of every downsample time steps instead of each step
+        aggregates: Per-element aggregates over all time steps, among "min", "max", "mean"
+            and percentiles such as "p95" (default: min, max and mean)
+        n_workers: Number of worker processes (1 runs serially, 0 uses every CPU).
+            Runs with percentile aggregates are serial: their streaming estimates
+            depend on the order of the time steps and cannot be combined across chunks
     """
-    # load a pandapower network
-    #net = mv_oberrhein(scenario='generation')
-    # number of time steps
-    n_ts = time_steps
-    net = _get_network()
-    # load your timeseries from a file (here csv file)
-    # df = pd.read_csv("sgen_timeseries.csv")
-    # or create a DataFrame with some random time series as an example
-    df = pd.DataFrame(np.random.normal(1., 0.1, size=(n_ts, len(net.sgen.index))),
-                    index=list(range(n_ts)), columns=net.sgen.index) * net.sgen.p_mw.values
-    # create the data source from it
-    ds = DFData(df)
+    logger.info("Running timeseries")
+    try:
+        net = _get_network(network)
+        if profile_variable not in ("p_mw", "q_mvar", "scaling"):
+            raise ValueError(f"Unsupported profile variable '{profile_variable}'. Use 'p_mw', 'q_mvar' or 'scaling'.")
+        
+        # Profile files are converted once into memory-mapped matrices
+        sources = {}
+        for element, path in (('sgen', sgen_profiles), ('load', load_profiles)):
+            if path is not None:
+                data_path, meta = convert_profiles(path, time_column=time_column)
+                indices, columns = map_profile_columns(net, element, meta["columns"])
+                sources[element] = (ProfileData(data_path, meta), indices, columns, path)
+        rows = min((source[0].get_time_steps_len() for source in sources.values()), default=None)
+        if time_steps is None:
+            if rows is None:
+                raise ValueError("Give time_steps or at least one profile file.")
+            time_steps = rows
+        elif rows is not None and time_steps > rows:
+            raise ValueError(f"The profile files only have {rows} time steps.")
+        n_ts = time_steps
+        
+        rng = np.random.default_rng(seed)
+        controllers = []
+        profiles = {}
+        for element in ('sgen', 'load'):
+            if element in sources:
+                ds, indices, columns, path = sources[element]
+                variable = profile_variable
+                profiles[element] = {"source": path, "elements": len(indices)}
+            else:
+                # Random profiles around the current values of every element
+                indices = columns = net[element].index
+                df = pd.DataFrame(rng.normal(1., 0.1, size=(n_ts, len(indices))),
+                                  index=list(range(n_ts)), columns=indices) * net[element].p_mw.values
+                ds, variable = DFData(df), 'p_mw'
+                profiles[element] = {"source": "random", "elements": len(indices)}
+            if len(indices):
+                control = ConstControl(net, element=element, element_index=indices,
+                                       variable=variable, data_source=ds, profile_name=columns)
+                controllers.append(control.index)
+        
+        # The controllers and the writer only live for this run, so later power flows do not replay them
+        previous_writer = net.output_writer.copy() if "output_writer" in net else None
+        # Profiles are written into the network at every step; the values are put back
+        # afterwards, so that a serial run leaves the network as a parallel run does
+        controlled = {(control.element, control.variable) for control in net.controller.object
+                      if isinstance(control, ConstControl) and control.element in net}
+        previous_values = {(element, variable): net[element][variable].copy()
+                           for element, variable in controlled if variable in net[element]}
+        writer = None
+        try:
+            writer = TimeseriesWriter(net, n_ts, variables=variables, downsample=downsample,
+                                      aggregates=aggregates, metadata={"profiles": profiles})
+            # pandapower recycles the solver structures when every controller allows it
+            options = {} if recycle else {"recycle": False}
+            stateful = stateful_controllers(net)
+            serial_reason = None
+            if stateful:
+                serial_reason = f"stateful controllers: {', '.join(stateful[:5])}"
+            elif writer.has_percentiles():
+                serial_reason = "percentile aggregates"
+            if n_workers != 1 and serial_reason:
+                logger.info(f"Running timeseries serially because of {serial_reason}")
+            if n_workers != 1 and not serial_reason:
+                execution = {"mode": "parallel",
+                             **run_timeseries_parallel(net, writer, n_workers=n_workers or None, **options)}
+            else:
+                run_timeseries(net, time_steps=range(n_ts), progress_function=timeseries_progress, **options)
+                execution = {"mode": "serial"}
+                if n_workers != 1:
+                    execution["reason"] = serial_reason
+            summary = writer.finish()
+        except BaseException:
+            if writer is not None:
+                writer.discard()
+            raise
+        finally:
+            net.controller.drop(controllers, inplace=True)
+            for (element, variable), values in previous_values.items():
+                net[element][variable] = values
+            if previous_writer is None:
+                net.pop("output_writer", None)
+            else:
+                net.output_writer = previous_writer
+        _invalidate_network_caches(network)
+        return {"status": "success",
+                "message": f"Timeseries of {n_ts} time steps completed",
+                "time_steps": n_ts,
+                "profiles": profiles,
+                "result_handle": writer.handle,
+                "variables": summary,
+                "execution": execution}
+    except (RuntimeError, ValueError) as e:
+        return PowerError(
+            status="error",
+            message=str(e)
+        )
+    except Exception as e:
+        return PowerError(
+            status="error",
+            message=f"Timeseries failed: {str(e) or type(e).__name__}"
+        )
 
-    # initialising ConstControl controller to update values of the regenerative generators ("sgen" elements)
-    # the element_index specifies which elements to update (here all sgens in the net since net.sgen.index is passed)
-    # the controlled variable is "p_mw"
-    # the profile_name are the columns in the csv file (here this is also equal to the sgen indices 0-N )
-    const_sgen = ConstControl(net, element='sgen', element_index=net.sgen.index,
-                            variable='p_mw', data_source=ds, profile_name=net.sgen.index)
+@power_mcp_tool(mcp)
+def read_timeseries_results(result_handle: str, variable: Optional[str] = None,
+                            elements: Optional[List[int]] = None, start: int = 0,
+                            limit: Optional[int] = 100, aggregates_only: bool = False) -> Dict[str, Any]:
+    """Read stored timeseries results.
 
-    # do the same for loads
-    # df = pd.read_csv("load_timeseries.csv")
-    # create a DataFrame with some random time series as an example
-    df = pd.DataFrame(np.random.normal(1., 0.1, size=(n_ts, len(net.load.index))),
-                    index=list(range(n_ts)), columns=net.load.index) * net.load.p_mw.values
-    ds = DFData(df)
-    const_load = ConstControl(net, element='load', element_index=net.load.index,
-                            variable='p_mw', data_source=ds, profile_name=net.load.index)
+    Without a variable, returns what the handle holds. Otherwise returns one row per
+    stored time step (each downsample time steps) and one column per element, or the
+    per-element aggregates over the whole run with aggregates_only.
 
-    # starting the timeseries simulation for one day -> 96 15 min values.
-    run_timeseries(net)
+    Args:
+        result_handle: Handle returned by timeseries
+        variable: Stored variable, e.g. "res_bus.vm_pu"
+        elements: Element indices to return (default: all)
+        start: First stored row to return
+        limit: Maximum number of rows to return (None returns all)
+        aggregates_only: Return the aggregates instead of the time steps
 
+    Returns:
+        Dict with the requested values
+    """
+    logger.info(f"Reading {variable} of timeseries results {result_handle}")
+    try:
+        meta = timeseries_metadata(result_handle)
+        if variable is None:
+            return {"status": "success",
+                    "message": f"Timeseries results {result_handle}",
+                    **meta}
+        if aggregates_only:
+            frame = load_timeseries_aggregates(result_handle, variable)
+            if elements is not None:
+                frame = frame.reindex(elements)
+            frame.index.name = "index"
+            rows = js.loads(frame.reset_index().to_json(orient="records"))
+            return {"status": "success",
+                    "message": f"Aggregates of {variable} for {len(rows)} elements",
+                    "aggregates": rows}
+        if start < 0 or (limit is not None and limit < 0):
+            raise ValueError("start and limit must not be negative.")
+        frame = load_timeseries(result_handle, variable, elements=elements, start=start,
+                                stop=None if limit is None else start + limit)
+        return {"status": "success",
+                "message": f"{len(frame)} of {meta['variables'][variable]['rows']} rows of {variable}",
+                "time_steps": frame.index.tolist(),
+                "elements": frame.columns.tolist(),
+                "values": js.loads(frame.to_json(orient="values", double_precision=6))}
+    except (RuntimeError, ValueError) as e:
+        return PowerError(
+            status="error",
+            message=str(e)
+        )
+    except Exception as e:
+        return PowerError(
+            status="error",
+            message=f"Reading timeseries results failed: {str(e)}"
+        )
 
-    
 @power_mcp_tool(mcp)
-def save_network(file_path: str) -> Dict[str, Any]:
+@offloaded
+def save_network(file_path: str, network: Optional[str] = None) -> Dict[str, Any]:
     """Save a pandapower network to a file.
     
     Args:
-        file_path: Path to save the network file (.json)
+        file_path: Path to save the network file (.json, .p) or network bundle (.ppnet),
+            a directory with one columnar file per table that loads much faster than .json
+        network: Handle of the network (default: the current network)
         
     Returns:
         Dict containing status and network information
     """
 
     logger.info(f"Saving network at: {file_path}")
-    global _current_net
     try:
+        net = _get_network(network)
+        file_path = file_path.rstrip(os.sep)
         if file_path.endswith('.json'):
-            pp.to_json(_current_net,file_path)
+            pp.to_json(net,file_path)
+        elif file_path.endswith('.p'):
+            pp.to_pickle(net, file_path)
+        elif file_path.endswith(BUNDLE_EXTENSION):
+            save_bundle(net, file_path)
         else:
-            raise ValueError("Unsupported file format. Use .json.")
+            raise ValueError(f"Unsupported file format. Use .json, .p or {BUNDLE_EXTENSION}.")
             
         return {
             "status": "success",
             "message": f"Network saved successfully to {file_path}",
             "network_info": {
-                "buses": len(_current_net.bus),
-                "lines": len(_current_net.line),
-                "trafos": len(_current_net.trafo)
+                "buses": len(net.bus),
+                "lines": len(net.line),
+                "trafos": len(net.trafo)
             }
         }
     except FileNotFoundError:
@@ -439,6 +1773,154 @@ def save_network(file_path: str) -> Dict[str, Any]:
         )
 
 
+# Tools that can run as background jobs
+JOB_KINDS = {
+    "contingency_analysis": run_contingency_analysis.sync,
+    "rank_contingencies": rank_contingencies.sync,
+    "timeseries": timeseries.sync,
+    "power_flow": run_power_flow.sync,
+}
+
+# Longest time poll_job waits, kept below the client session timeout
+MAX_POLL_WAIT_S = 20.
+
+_jobs = jobs_from_env()
+
+
+def _job_error(result: Any) -> Optional[str]:
+    """Error message of a tool result that reports a failure."""
+    if isinstance(result, dict) and result.get("status") == "error":
+        return result.get("message", "Job failed")
+    return None
+
+@power_mcp_tool(mcp)
+def submit_job(kind: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Start a long-running analysis in the background and return at once.
+    
+    The job runs on a worker pool, so it is not bound by the client timeout and
+    other tools keep answering meanwhile. Follow it with poll_job and fetch its
+    output with job_result.
+    
+    Args:
+        kind: Analysis to run: "contingency_analysis", "rank_contingencies",
+            "timeseries" or "power_flow"
+        params: Arguments of the matching tool, e.g. {"save_file": "n1.json",
+            "contingency_type": "N-1"} for "contingency_analysis" or {"time_steps": 96}
+            for "timeseries"; "network" selects the network handle
+        
+    Returns:
+        Dict containing the job id
+    """
+    logger.info(f"Submitting {kind} job")
+    try:
+        if kind not in JOB_KINDS:
+            raise ValueError(f"Unknown job kind '{kind}'. Use one of {', '.join(JOB_KINDS)}.")
+        params = params or {}
+        try:
+            inspect.signature(JOB_KINDS[kind]).bind(**params)
+        except TypeError as e:
+            raise ValueError(f"Invalid parameters for {kind}: {e}")
+        job = _jobs.submit(kind, JOB_KINDS[kind], params, is_error=_job_error)
+        return {"status": "success",
+                "message": f"Job {job.job_id} submitted",
+                "job": job.info()}
+    except ValueError as e:
+        return PowerError(
+            status="error",
+            message=str(e)
+        )
+    except Exception as e:
+        return PowerError(
+            status="error",
+            message=f"Failed to submit job: {str(e)}"
+        )
+
+@power_mcp_tool(mcp)
+async def poll_job(job_id: str, wait_s: float = 0.0, ctx: Context = None) -> Dict[str, Any]:
+    """Get the status and progress of a background job.
+    
+    With wait_s, waits until the job finishes or wait_s elapsed, and sends MCP
+    progress notifications meanwhile if the request carries a progress token.
+    
+    Args:
+        job_id: Id returned by submit_job
+        wait_s: Seconds to wait for the job to finish (at most 20)
+        
+    Returns:
+        Dict containing the job status ("queued", "running", "succeeded", "failed"
+        or "cancelled") and its progress in percent
+    """
+    try:
+        job = _jobs.get(job_id)
+        deadline = time.monotonic() + min(max(wait_s, 0.), MAX_POLL_WAIT_S)
+        while job.status not in FINISHED and time.monotonic() < deadline:
+            progress = job.progress
+            if ctx is not None:
+                await ctx.report_progress(progress, 100.)
+            await asyncio.to_thread(_jobs.wait, job_id, deadline - time.monotonic(), progress)
+        if ctx is not None and job.status in FINISHED and wait_s > 0:
+            await ctx.report_progress(job.progress, 100.)
+        return {"status": "success",
+                "message": f"Job {job_id} is {job.status}",
+                "job": job.info()}
+    except ValueError as e:
+        return PowerError(
+            status="error",
+            message=str(e)
+        )
+
+@power_mcp_tool(mcp)
+def cancel_job(job_id: str) -> Dict[str, Any]:
+    """Cancel a background job.
+    
+    Queued jobs never start; running jobs stop at their next progress step, e.g.
+    after the contingency or time step being solved.
+    
+    Args:
+        job_id: Id returned by submit_job
+        
+    Returns:
+        Dict containing the job status
+    """
+    logger.info(f"Cancelling job {job_id}")
+    try:
+        job = _jobs.cancel(job_id)
+        return {"status": "success",
+                "message": f"Cancellation of job {job_id} requested" if job.status not in FINISHED
+                else f"Job {job_id} is {job.status}",
+                "job": job.info()}
+    except ValueError as e:
+        return PowerError(
+            status="error",
+            message=str(e)
+        )
+
+@power_mcp_tool(mcp)
+def job_result(job_id: str) -> Dict[str, Any]:
+    """Get the output of a finished background job.
+    
+    Args:
+        job_id: Id returned by submit_job
+        
+    Returns:
+        Dict containing the output of the tool the job ran
+    """
+    try:
+        job = _jobs.get(job_id)
+        if job.status not in FINISHED:
+            raise ValueError(f"Job {job_id} is {job.status} ({job.progress:.0f}%), poll it until it finishes.")
+        if job.status != SUCCEEDED:
+            raise ValueError(f"Job {job_id} {job.status}" + (f": {job.error}" if job.error else "."))
+        return {"status": "success",
+                "message": f"Result of job {job_id}",
+                "job": job.info(),
+                "result": job.result}
+    except ValueError as e:
+        return PowerError(
+            status="error",
+            message=str(e)
+        )
+
 
 if __name__ == "__main__":
     mcp.run(transport="stdio") 
\ No newline at end of file
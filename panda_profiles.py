@@ -0,0 +1,192 @@
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import json
+import logging
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+import pandapower as pp
+from pandapower.timeseries.data_source import DataSource
+
+from panda_cache import cache_root, file_digest, private_dir
+
+logger = logging.getLogger(__name__)
+
+# Profile file formats
+PROFILE_EXTENSIONS = ('.csv', '.parquet')
+
+# Rows read from a profile file at a time while converting it
+_CHUNK_ROWS = 4096
+
+# Values are stored in single precision, enough for profiles and half the memory
+_DTYPE = np.float32
+
+
+def profile_cache_dir() -> str:
+    """Directory of the converted profiles, profiles in the `cache_root` directory."""
+    return os.path.join(cache_root(), "profiles")
+
+
+def _iter_chunks(path: str, chunk_rows: int) -> Iterator[pd.DataFrame]:
+    """Read a CSV or Parquet file a block of rows at a time."""
+    if path.endswith('.csv'):
+        yield from pd.read_csv(path, chunksize=chunk_rows)
+    elif path.endswith('.parquet'):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ValueError("Reading Parquet profiles requires pyarrow. Install it or use a CSV file.")
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_rows):
+            yield batch.to_pandas()
+    else:
+        raise ValueError(f"Unsupported profile format '{path}'. Use {' or '.join(PROFILE_EXTENSIONS)} files.")
+
+
+def convert_profiles(path: str, time_column: Optional[str] = None,
+                     chunk_rows: int = _CHUNK_ROWS) -> Tuple[str, Dict[str, Any]]:
+    """Convert a profile file into a row-major binary matrix that can be memory-mapped.
+
+    The file is read in chunks, so that only `chunk_rows` rows are in memory at
+    a time. Conversions are cached by file content and reused on later calls.
+
+    Args:
+        path: CSV or Parquet file with one row per time step and one column per profile
+        time_column: Column holding the time stamps, left out of the profiles
+        chunk_rows: Rows read at a time
+
+    Returns:
+        Path of the binary matrix and its metadata (columns, rows, dtype, time stamps)
+    """
+    cache_dir = private_dir(profile_cache_dir())
+    stem = os.path.join(cache_dir, f"{file_digest(path)}-{time_column or ''}")
+    meta_path = f"{stem}.json"
+    if os.path.exists(meta_path):
+        with open(meta_path) as f:
+            return f"{stem}.bin", json.load(f)
+
+    columns: Optional[List[str]] = None
+    times: List[str] = []
+    rows = 0
+    # Written under unique names and renamed, so that concurrent conversions of
+    # one file do not mix and a reader never sees a partial matrix or metadata
+    f = tempfile.NamedTemporaryFile(dir=cache_dir, suffix=".bin.tmp", delete=False)
+    try:
+        with f:
+            for chunk in _iter_chunks(path, chunk_rows):
+                if time_column is not None:
+                    if time_column not in chunk:
+                        raise ValueError(f"Time column '{time_column}' not found in {path}.")
+                    times.extend(chunk.pop(time_column).astype(str))
+                if columns is None:
+                    columns = [str(column) for column in chunk.columns]
+                try:
+                    values = chunk.to_numpy(dtype=_DTYPE)
+                except ValueError as e:
+                    raise ValueError(f"Profiles in {path} must be numeric ({e}). "
+                                     f"Pass time_column for a time stamp column.")
+                f.write(np.ascontiguousarray(values).tobytes())
+                rows += len(chunk)
+        if not rows or not columns:
+            raise ValueError(f"Profile file {path} has no rows.")
+    except BaseException:
+        os.remove(f.name)
+        raise
+    os.replace(f.name, f"{stem}.bin")
+
+    meta = {"source": os.path.abspath(path), "columns": columns, "rows": rows,
+            "dtype": np.dtype(_DTYPE).str, "time": times or None}
+    with tempfile.NamedTemporaryFile("w", dir=cache_dir, suffix=".json.tmp", delete=False) as f:
+        json.dump(meta, f)
+    os.replace(f.name, meta_path)
+    logger.info(f"Converted {rows} x {len(columns)} profiles from {path} to {stem}.bin")
+    return f"{stem}.bin", meta
+
+
+class ProfileData(DataSource):
+    """pandapower data source reading time steps from a memory-mapped profile matrix.
+
+    Only the rows of the simulated time steps are paged in, so a year of
+    15-minute profiles for thousands of elements never has to fit in memory.
+
+    Args:
+        path: Binary matrix written by `convert_profiles`
+        meta: Its metadata
+    """
+
+    def __init__(self, path: str, meta: Dict[str, Any]):
+        super().__init__()
+        self.path = path
+        self.meta = meta
+        self._values: Optional[np.ndarray] = None
+        self._positions: Dict[Tuple[str, ...], np.ndarray] = {}
+        self._column_positions = {column: i for i, column in enumerate(meta["columns"])}
+
+    @property
+    def values(self) -> np.ndarray:
+        if self._values is None:
+            self._values = np.memmap(self.path, dtype=np.dtype(self.meta["dtype"]), mode="r",
+                                     shape=(self.meta["rows"], len(self.meta["columns"])))
+        return self._values
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # Pickle the file reference instead of the mapped values
+        state = self.__dict__.copy()
+        state["_values"] = None
+        return state
+
+    def get_time_steps_len(self) -> int:
+        return self.meta["rows"]
+
+    def get_time_step_value(self, time_step: int, profile_name: Any, scale_factor: float = 1.0) -> Any:
+        if isinstance(profile_name, str):
+            return float(self.values[time_step, self._column_positions[profile_name]]) * scale_factor
+        key = tuple(profile_name)
+        positions = self._positions.get(key)
+        if positions is None:
+            positions = self._positions[key] = np.array([self._column_positions[name] for name in key])
+        return self.values[time_step, positions].astype(np.float64) * scale_factor
+
+
+def map_profile_columns(net: pp.pandapowerNet, element: str, columns: List[str]) -> Tuple[List[int], List[str]]:
+    """Match profile columns to elements by index, or by name where the column is not an index.
+
+    Args:
+        net: Network
+        element: Element table, e.g. 'load'
+        columns: Profile column labels
+
+    Returns:
+        Element indices and the matching column labels
+    """
+    table = net[element]
+    names: Dict[str, Optional[int]] = {}
+    for index, name in zip(table.index, table.name):
+        if isinstance(name, str):
+            names[name] = None if name in names else int(index)
+
+    indices, matched, unknown, ambiguous = [], [], [], []
+    for column in columns:
+        index: Optional[int] = None
+        try:
+            if int(column) in table.index:
+                index = int(column)
+        except ValueError:
+            pass
+        if index is None and column in names:
+            index = names[column]
+            if index is None:
+                ambiguous.append(column)
+                continue
+        if index is None:
+            unknown.append(column)
+            continue
+        indices.append(index)
+        matched.append(column)
+
+    if unknown or ambiguous:
+        problems = ([f"Unknown: {unknown[:10]}."] if unknown else []) \
+            + ([f"Names used by several {element}s: {ambiguous[:10]}."] if ambiguous else [])
+        raise ValueError(f"Profile columns must be {element} indices or unique names. {' '.join(problems)}")
+    if len(set(indices)) != len(indices):
+        raise ValueError(f"Several profile columns map to the same {element}.")
+    return indices, matched
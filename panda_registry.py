@@ -0,0 +1,278 @@
+from typing import Dict, Iterable, List, Optional, Any
+from collections import OrderedDict
+from dataclasses import dataclass, field
+import logging
+import os
+import pickle
+import re
+import threading
+import pandas as pd
+import pandapower as pp
+
+from panda_cache import cache_root, private_dir
+from panda_fingerprint import NetworkFingerprint
+
+logger = logging.getLogger(__name__)
+
+# Handle used by tools that are called without a network handle
+DEFAULT_NETWORK = "default"
+
+_HANDLE_PATTERN = re.compile(r"^[A-Za-z0-9_.-]+$")
+
+
+def network_nbytes(net: pp.pandapowerNet) -> int:
+    """Estimate the memory held by the element and result tables of a network.
+
+    Args:
+        net: Network to measure
+
+    Returns:
+        Size in bytes of all DataFrames stored in the network
+    """
+    # dict.values skips tables of lazily loaded networks that were not read yet
+    return int(sum(table.memory_usage(index=True, deep=True).sum()
+                   for table in dict.values(net) if isinstance(table, pd.DataFrame)))
+
+
+def cache_nbytes(caches: Dict[str, Any]) -> int:
+    """Memory held by derived data such as sensitivity matrices, for values that report their `nbytes`."""
+    return int(sum(getattr(value, "nbytes", 0) for value in caches.values()))
+
+
+@dataclass
+class _Entry:
+    """A registered network, resident in memory or spilled to disk."""
+    net: Optional[pp.pandapowerNet]
+    nbytes: int
+    snapshot: Optional[str] = None
+    dirty: bool = True
+    caches: Dict[str, Any] = field(default_factory=dict)
+    fingerprint: NetworkFingerprint = field(default_factory=NetworkFingerprint)
+    state: Dict[str, Any] = field(default_factory=dict)
+
+
+class NetworkRegistry:
+    """Named pandapower networks kept in memory under a byte budget.
+
+    Networks are kept in least recently used order. When the resident networks
+    exceed the budget, the least recently used ones are pickled to `spill_dir`
+    and dropped from memory; they are loaded back transparently on next access.
+    The network being accessed is never evicted, even if it alone exceeds the
+    budget. Derived data stored with `cache` counts towards the budget of its
+    network and is dropped when the network is evicted.
+
+    Args:
+        memory_budget: Maximum bytes of resident networks
+        spill_dir: Directory of the on-disk snapshots of evicted networks, checked
+            with `private_dir` before snapshots are written or read
+    """
+
+    def __init__(self, memory_budget: int, spill_dir: str):
+        self.memory_budget = memory_budget
+        self.spill_dir = spill_dir
+        self.current = DEFAULT_NETWORK
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._network_locks: Dict[str, threading.RLock] = {}
+
+    def _name(self, name: Optional[str]) -> str:
+        name = self.current if name is None else name
+        if not _HANDLE_PATTERN.match(name):
+            raise ValueError(f"Invalid network handle '{name}'. Use letters, digits, '_', '-' or '.'.")
+        return name
+
+    def put(self, net: pp.pandapowerNet, name: Optional[str] = None) -> str:
+        """Register a network under a handle, replacing any network with that handle.
+
+        The registered network becomes the current one.
+
+        Args:
+            net: Network to register
+            name: Handle of the network (default: the current handle)
+
+        Returns:
+            Handle of the network
+        """
+        with self._lock:
+            name = self._name(name)
+            self._drop_snapshot(name)
+            self._entries[name] = _Entry(net=net, nbytes=network_nbytes(net))
+            self._entries.move_to_end(name)
+            self.current = name
+            self._evict(keep=name)
+            return name
+
+    def get(self, name: Optional[str] = None) -> pp.pandapowerNet:
+        """Get a network, loading it back from its snapshot if it was evicted.
+
+        Args:
+            name: Handle of the network (default: the current handle)
+
+        Returns:
+            pp.pandapowerNet: The network or raises error if none is registered under the handle
+        """
+        with self._lock:
+            name = self._name(name)
+            entry = self._entries.get(name)
+            if entry is None:
+                raise RuntimeError(f"No pandapower network is loaded under '{name}'. "
+                                   f"Please create or load a network first.")
+            self._entries.move_to_end(name)
+            if entry.net is None:
+                private_dir(self.spill_dir)
+                with open(entry.snapshot, "rb") as f:
+                    entry.net = pickle.load(f)
+                logger.info(f"Reloaded network '{name}' from {entry.snapshot}")
+                self._evict(keep=name)
+            return entry.net
+
+    def lock(self, name: Optional[str] = None) -> threading.RLock:
+        """Lock serialising the tools that use a network; other networks stay available.
+
+        Held networks are never evicted. The lock exists before the network
+        does, so that loading a network under a handle is serialised as well.
+        """
+        with self._lock:
+            return self._network_locks.setdefault(self._name(name), threading.RLock())
+
+    def caches(self, name: Optional[str] = None) -> Dict[str, Any]:
+        """Per-network cache of derived data, cleared by `changed`."""
+        with self._lock:
+            return self._entry(name).caches
+
+    def cache(self, name: Optional[str], key: str, value: Any) -> Any:
+        """Store derived data in a network's `caches` and count it against the memory budget.
+
+        Args:
+            name: Handle of the network (default: the current handle)
+            key: Cache key
+            value: Derived data; its `nbytes`, when it has one, counts towards the network's memory
+
+        Returns:
+            The value
+        """
+        with self._lock:
+            self._entry(name).caches[key] = value
+            self._evict(keep=self._name(name))
+            return value
+
+    def state(self, name: Optional[str] = None) -> Dict[str, Any]:
+        """Per-network solver state that, unlike `caches`, is kept when the network changes."""
+        with self._lock:
+            return self._entry(name).state
+
+    def changed(self, name: Optional[str] = None, topology: bool = True,
+                tables: Optional[Iterable[str]] = None) -> None:
+        """Record that a network was modified.
+
+        Args:
+            name: Handle of the network (default: the current handle)
+            topology: Whether elements or parameters changed, which clears the
+                derived caches; False for result-only updates such as a power flow
+            tables: Element tables that changed, so that only those are rehashed
+                for the fingerprint (default: any table may have changed)
+        """
+        with self._lock:
+            entry = self._entry(name)
+            if topology:
+                entry.caches.clear()
+                entry.fingerprint.mark(tables)
+            entry.dirty = True
+            if entry.net is not None:
+                entry.nbytes = network_nbytes(entry.net)
+            self._evict(keep=self._name(name))
+
+    def fingerprint(self, name: Optional[str] = None, structure: bool = False) -> str:
+        """Content fingerprint of a network's element tables, see NetworkFingerprint.
+
+        Args:
+            name: Handle of the network (default: the current handle)
+            structure: Leave out the injection setpoints, see NetworkFingerprint.structure
+        """
+        with self._lock:
+            fingerprint = self._entry(name).fingerprint
+            net = self.get(name)
+            return fingerprint.structure(net) if structure else fingerprint.value(net)
+
+    def table_digests(self, name: Optional[str], tables: Iterable[str]) -> Dict[str, str]:
+        """Content digests of some element tables of a network, see NetworkFingerprint.tables."""
+        with self._lock:
+            fingerprint = self._entry(name).fingerprint
+            return fingerprint.tables(self.get(name), tables)
+
+    def remove(self, name: str) -> None:
+        """Forget a network and delete its snapshot."""
+        with self._lock:
+            name = self._name(name)
+            self._entry(name)
+            self._drop_snapshot(name)
+            del self._entries[name]
+
+    def info(self) -> List[Dict[str, Any]]:
+        """Describe the registered networks, least recently used first."""
+        with self._lock:
+            return [{
+                "network": name,
+                "current": name == self.current,
+                "resident": entry.net is not None,
+                "bytes": entry.nbytes,
+                "cache_bytes": cache_nbytes(entry.caches)
+            } for name, entry in self._entries.items()]
+
+    def resident_bytes(self) -> int:
+        with self._lock:
+            return sum(entry.nbytes + cache_nbytes(entry.caches)
+                       for entry in self._entries.values() if entry.net is not None)
+
+    def _entry(self, name: Optional[str]) -> _Entry:
+        name = self._name(name)
+        if name not in self._entries:
+            raise RuntimeError(f"No pandapower network is loaded under '{name}'.")
+        return self._entries[name]
+
+    def _snapshot_path(self, name: str) -> str:
+        return os.path.join(self.spill_dir, f"{name}.p")
+
+    def _drop_snapshot(self, name: str) -> None:
+        path = self._snapshot_path(name)
+        if os.path.exists(path):
+            os.remove(path)
+
+    def _evict(self, keep: str) -> None:
+        """Spill least recently used networks until the resident ones fit in the budget."""
+        resident = self.resident_bytes()
+        for name, entry in list(self._entries.items()):
+            if resident <= self.memory_budget:
+                break
+            if name == keep or entry.net is None:
+                continue
+            # Never pickle a network that a tool is using in another thread
+            lock = self._network_locks.get(name)
+            if lock is not None and not lock.acquire(blocking=False):
+                continue
+            try:
+                if entry.dirty or entry.snapshot is None:
+                    private_dir(self.spill_dir)
+                    entry.snapshot = self._snapshot_path(name)
+                    with open(entry.snapshot, "wb") as f:
+                        pickle.dump(entry.net, f, protocol=pickle.HIGHEST_PROTOCOL)
+                    entry.dirty = False
+            finally:
+                if lock is not None:
+                    lock.release()
+            resident -= entry.nbytes + cache_nbytes(entry.caches)
+            entry.net = None
+            entry.caches.clear()
+            logger.info(f"Evicted network '{name}' ({entry.nbytes} bytes) to {entry.snapshot}")
+
+
+def registry_from_env() -> NetworkRegistry:
+    """Registry configured by POWER_MCP_MEMORY_BUDGET_MB (default 2048) and POWER_MCP_SPILL_DIR.
+
+    Snapshots go to a subdirectory per process of POWER_MCP_SPILL_DIR, or of
+    spill in the `cache_root` directory.
+    """
+    budget_mb = float(os.environ.get("POWER_MCP_MEMORY_BUDGET_MB", "2048"))
+    spill_dir = os.path.join(os.environ.get("POWER_MCP_SPILL_DIR") or os.path.join(cache_root(), "spill"),
+                             str(os.getpid()))
+    return NetworkRegistry(memory_budget=int(budget_mb * 1024 ** 2), spill_dir=spill_dir)
@@ -0,0 +1,448 @@
+from typing import Dict, List, Optional, Tuple, Any
+from datetime import datetime, timezone
+import base64
+import json
+import logging
+import os
+import shutil
+import uuid
+import numpy as np
+import pandas as pd
+import pandapower as pp
+
+logger = logging.getLogger(__name__)
+
+# Result tables persisted for every solve
+RESULT_TABLES = ('res_bus', 'res_line', 'res_trafo', 'res_trafo3w', 'res_gen', 'res_sgen',
+                 'res_load', 'res_ext_grid', 'res_shunt')
+
+# Element columns stored next to the results so that handles stay readable after the network changes
+_ELEMENT_COLUMNS = {
+    'bus': ('name',),
+    'line': ('name', 'from_bus', 'to_bus'),
+    'trafo': ('name', 'hv_bus', 'lv_bus'),
+    'trafo3w': ('name', 'hv_bus', 'mv_bus', 'lv_bus'),
+}
+_DEFAULT_ELEMENT_COLUMNS = ('name', 'bus')
+
+# Bus whose voltage level and zone an element is grouped under
+_REFERENCE_BUS = {'line': 'from_bus', 'trafo': 'hv_bus', 'trafo3w': 'hv_bus'}
+
+# Prefixes of the result directories kept under `result_dir`: power flows and timeseries
+RESULT_PREFIXES = ('pf_', 'ts_')
+
+# Identifier columns that are never aggregated by default
+KEY_COLUMNS = ('index', 'name', 'bus', 'from_bus', 'to_bus', 'hv_bus', 'mv_bus', 'lv_bus', 'vn_kv', 'zone')
+
+
+def result_dir() -> str:
+    """Directory holding the stored results, POWER_MCP_RESULT_DIR or ./results next to this file."""
+    return os.environ.get("POWER_MCP_RESULT_DIR",
+                          os.path.join(os.path.dirname(os.path.abspath(__file__)), "results"))
+
+
+def prune_results(keep: Optional[str] = None) -> List[str]:
+    """Delete the oldest stored results beyond the retention limits.
+
+    At most POWER_MCP_RESULT_MAX_COUNT (default 200) result handles taking at
+    most POWER_MCP_RESULT_MAX_MB (default 2048) are kept. Only complete results,
+    those with their meta.json written, are counted and deleted, so that runs
+    still writing are left alone.
+
+    Args:
+        keep: Handle never deleted, e.g. the one just stored
+
+    Returns:
+        Deleted handles
+    """
+    max_count = int(os.environ.get("POWER_MCP_RESULT_MAX_COUNT", "200"))
+    max_bytes = float(os.environ.get("POWER_MCP_RESULT_MAX_MB", "2048")) * 1024 ** 2
+    root = result_dir()
+    try:
+        names = [name for name in os.listdir(root) if name.startswith(RESULT_PREFIXES)]
+    except FileNotFoundError:
+        return []
+
+    stored = []
+    for name in names:
+        path = os.path.join(root, name)
+        try:
+            created = os.stat(os.path.join(path, "meta.json")).st_mtime
+            nbytes = sum(entry.stat().st_size for entry in os.scandir(path) if entry.is_file())
+        except FileNotFoundError:
+            continue
+        stored.append((created, name, nbytes))
+    stored.sort()
+
+    count, total = len(stored), sum(nbytes for _, _, nbytes in stored)
+    deleted = []
+    for _, name, nbytes in stored:
+        if count <= max_count and total <= max_bytes:
+            break
+        if name == keep:
+            continue
+        shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+        deleted.append(name)
+        count -= 1
+        total -= nbytes
+    if deleted:
+        logger.info(f"Deleted {len(deleted)} old result handles: {', '.join(deleted[:10])}")
+    return deleted
+
+
+def _handle_dir(handle: str) -> str:
+    if not handle or os.sep in handle or handle.startswith('.'):
+        raise ValueError(f"Invalid result handle '{handle}'.")
+    return os.path.join(result_dir(), handle)
+
+
+def _column_array(values: pd.Series) -> np.ndarray:
+    """Convert a column to an array that np.load can read back without pickle."""
+    if values.dtype == object:
+        return np.array(["" if pd.isnull(value) else str(value) for value in values], dtype=np.str_)
+    return values.to_numpy()
+
+
+def result_frame(net: pp.pandapowerNet, table: str) -> pd.DataFrame:
+    """Result table joined with its element keys and the voltage level and zone of its bus.
+
+    Args:
+        net: Solved network
+        table: Result table name, e.g. 'res_line'
+
+    Returns:
+        DataFrame indexed like the result table
+    """
+    element = table[len('res_'):]
+    res = net[table]
+    elements = net[element].reindex(res.index)
+    columns = [column for column in _ELEMENT_COLUMNS.get(element, _DEFAULT_ELEMENT_COLUMNS)
+               if column in elements]
+    frame = pd.concat([res, elements[columns]], axis=1)
+
+    if element == 'bus':
+        buses = elements.index
+    else:
+        buses = elements[_REFERENCE_BUS.get(element, 'bus')]
+    bus_info = net.bus.reindex(buses)
+    frame['vn_kv'] = bus_info['vn_kv'].to_numpy()
+    frame['zone'] = bus_info['zone'].to_numpy()
+    return frame
+
+
+def store_results(net: pp.pandapowerNet, metadata: Optional[Dict[str, Any]] = None) -> str:
+    """Persist the result tables of a solved network as one .npz file per table.
+
+    The oldest stored results are deleted beyond the limits of `prune_results`.
+
+    Args:
+        net: Solved network
+        metadata: Extra JSON serialisable information stored with the results
+
+    Returns:
+        Handle of the stored results
+    """
+    handle = f"pf_{uuid.uuid4().hex[:12]}"
+    path = _handle_dir(handle)
+    os.makedirs(path)
+
+    tables = {}
+    for table in RESULT_TABLES:
+        if table not in net or not len(net[table]):
+            continue
+        frame = result_frame(net, table)
+        arrays = {column: _column_array(frame[column]) for column in frame.columns}
+        arrays['index'] = frame.index.to_numpy()
+        np.savez(os.path.join(path, f"{table}.npz"), **arrays)
+        tables[table] = len(frame)
+
+    with open(os.path.join(path, "meta.json"), "w") as f:
+        json.dump({
+            "handle": handle,
+            "created": datetime.now(timezone.utc).isoformat(),
+            "converged": bool(net.converged),
+            "tables": tables,
+            **(metadata or {})
+        }, f)
+    logger.info(f"Stored {len(tables)} result tables under {handle}")
+    prune_results(keep=handle)
+    return handle
+
+
+def result_exists(handle: str) -> bool:
+    """Whether a result handle is complete and was not deleted by `prune_results`."""
+    return os.path.exists(os.path.join(_handle_dir(handle), "meta.json"))
+
+
+def result_metadata(handle: str) -> Dict[str, Any]:
+    """Read the metadata stored with a result handle."""
+    path = os.path.join(_handle_dir(handle), "meta.json")
+    if not os.path.exists(path):
+        raise ValueError(f"Unknown result handle '{handle}'.")
+    with open(path) as f:
+        return json.load(f)
+
+
+def load_results(handle: str, tables: Optional[List[str]] = None) -> Dict[str, pd.DataFrame]:
+    """Load stored result tables.
+
+    Args:
+        handle: Handle returned by `store_results`
+        tables: Tables to load (default: all stored tables)
+
+    Returns:
+        Dict of table name to DataFrame
+    """
+    stored = result_metadata(handle)["tables"]
+    if tables is None:
+        tables = list(stored)
+    frames = {}
+    for table in tables:
+        if table not in stored:
+            raise ValueError(f"Table '{table}' is not stored under '{handle}'. Available: {', '.join(stored)}")
+        with np.load(os.path.join(_handle_dir(handle), f"{table}.npz")) as data:
+            index = data['index']
+            frames[table] = pd.DataFrame({column: data[column] for column in data.files if column != 'index'},
+                                         index=index)
+    return frames
+
+
+# Comparison operators accepted in query filters
+_FILTER_OPS = {
+    '==': lambda values, value: values == value,
+    '!=': lambda values, value: values != value,
+    '<': lambda values, value: values < value,
+    '<=': lambda values, value: values <= value,
+    '>': lambda values, value: values > value,
+    '>=': lambda values, value: values >= value,
+    'in': lambda values, value: np.isin(values, value),
+    'not in': lambda values, value: ~np.isin(values, value),
+    'isnull': lambda values, value: pd.isnull(values),
+    'notnull': lambda values, value: ~pd.isnull(values),
+}
+
+# Aggregates accepted in group-by queries
+AGGREGATES = ('count', 'sum', 'mean', 'std', 'min', 'max', 'median')
+
+
+def _check_columns(frame: pd.DataFrame, columns: List[str]) -> None:
+    unknown = [column for column in columns if column not in frame.columns]
+    if unknown:
+        raise ValueError(f"Unknown columns {unknown}. Available: {', '.join(frame.columns)}")
+
+
+def query_frame(frame: pd.DataFrame,
+                columns: Optional[List[str]] = None,
+                filters: Optional[List[Dict[str, Any]]] = None,
+                sort_by: Optional[str] = None,
+                ascending: bool = False,
+                top_k: Optional[int] = None,
+                group_by: Optional[List[str]] = None,
+                aggregates: Optional[Dict[str, List[str]]] = None) -> pd.DataFrame:
+    """Filter, aggregate, sort and truncate a result table.
+
+    Args:
+        frame: Result table, e.g. from `load_results`
+        columns: Columns to keep (default: all)
+        filters: Predicates combined with AND, each {"column", "op", "value"} with op
+            one of ==, !=, <, <=, >, >=, in, not in, isnull, notnull
+        sort_by: Column to sort on
+        ascending: Sort order
+        top_k: Number of rows to keep after sorting
+        group_by: Columns to group on, e.g. ["vn_kv"] or ["zone"]
+        aggregates: Per column aggregates for group-by queries, e.g. {"loading_percent": ["mean", "max"]}
+            (default: mean, min and max of every numeric result column)
+
+    Returns:
+        Resulting DataFrame
+    """
+    mask = np.ones(len(frame), dtype=bool)
+    for predicate in filters or []:
+        column, op = predicate.get('column'), predicate.get('op', '==')
+        _check_columns(frame, [column])
+        if op not in _FILTER_OPS:
+            raise ValueError(f"Unknown filter operator '{op}'. Use one of {', '.join(_FILTER_OPS)}.")
+        mask &= np.asarray(_FILTER_OPS[op](frame[column].to_numpy(), predicate.get('value')), dtype=bool)
+    frame = frame[mask]
+
+    if group_by:
+        _check_columns(frame, group_by)
+        if not aggregates:
+            aggregates = {column: ['mean', 'min', 'max'] for column in (columns or frame.columns)
+                          if column not in group_by and column not in KEY_COLUMNS
+                          and pd.api.types.is_numeric_dtype(frame[column])}
+        _check_columns(frame, list(aggregates))
+        for functions in aggregates.values():
+            unknown = [function for function in functions if function not in AGGREGATES]
+            if unknown:
+                raise ValueError(f"Unknown aggregates {unknown}. Use one of {', '.join(AGGREGATES)}.")
+        frame = frame.groupby(group_by, dropna=False).agg(aggregates)
+        frame.columns = [f"{column}_{function}" for column, function in frame.columns]
+        frame = frame.reset_index()
+
+    if sort_by is not None:
+        _check_columns(frame, [sort_by])
+        frame = frame.sort_values(sort_by, ascending=ascending, kind='stable')
+    if top_k is not None:
+        frame = frame.head(top_k)
+    if columns and not group_by:
+        _check_columns(frame, columns)
+        frame = frame[columns]
+    return frame
+
+
+def encode_page_token(query: Dict[str, Any]) -> str:
+    """Opaque continuation token holding the query of the next page."""
+    return base64.urlsafe_b64encode(json.dumps(query, separators=(',', ':')).encode()).decode()
+
+
+def decode_page_token(token: str) -> Dict[str, Any]:
+    """Query held by a token from `encode_page_token`."""
+    try:
+        query = json.loads(base64.urlsafe_b64decode(token.encode()))
+    except ValueError:
+        query = None
+    if not isinstance(query, dict):
+        raise ValueError(f"Invalid page token '{token[:20]}'.")
+    return query
+
+
+# Columns summarized by default, per result table
+DEFAULT_SUMMARY_COLUMNS = {
+    'res_bus': ('vm_pu', 'va_degree', 'p_mw', 'q_mvar'),
+    'res_line': ('loading_percent', 'pl_mw', 'ql_mvar', 'i_ka'),
+    'res_trafo': ('loading_percent', 'pl_mw', 'ql_mvar'),
+    'res_gen': ('p_mw', 'q_mvar', 'vm_pu'),
+}
+
+# Columns of each row of the statistics tables of `summarize_frame`
+STAT_COLUMNS = ('count', 'mean', 'std', 'min', 'min_index', 'max', 'max_index')
+
+
+def _significant(values: np.ndarray) -> List[Optional[float]]:
+    """Floats rounded to 6 significant digits, None for NaN, to keep summaries short."""
+    return [None if np.isnan(value) else float(f"{value:.6g}") for value in values.tolist()]
+
+
+def _group_stats(x: np.ndarray, index: np.ndarray, group: np.ndarray, n_groups: int,
+                 by_value: np.ndarray) -> List[List[Any]]:
+    """Rows of STAT_COLUMNS per group, from bincount sums and the values in sorted order.
+
+    Args:
+        x: Values, without NaN
+        index: Element index of each value
+        group: Group of each value
+        n_groups: Number of groups
+        by_value: Stable argsort of x
+
+    Returns:
+        One row per group; ties of the min or max go to the first element, as in pandas
+    """
+    count = np.bincount(group, minlength=n_groups)
+    # Sums of values centred on the overall mean keep the variance accurate
+    shift = x.mean() if len(x) else 0.
+    total = np.bincount(group, x - shift, minlength=n_groups)
+    squares = np.bincount(group, (x - shift) ** 2, minlength=n_groups)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = total / count + shift
+        std = np.sqrt(np.maximum(squares - total * total / count, 0.) / (count - 1))
+    std[count < 2] = np.nan
+
+    # Sorting the value order by group, stably, sorts by group then value
+    order = by_value[np.argsort(group[by_value], kind='stable')]
+    values = x[order]
+    first = np.cumsum(count) - count
+    last = first + count - 1
+    # The max ties form the last run of equal values of a group; take the start of that run
+    run_start = np.flatnonzero(np.r_[True, (values[1:] != values[:-1]) | (group[order][1:] != group[order][:-1])])
+    has_values = count > 0
+    low = np.full(n_groups, -1)
+    high = np.full(n_groups, -1)
+    low[has_values] = order[first[has_values]]
+    high[has_values] = order[run_start[np.searchsorted(run_start, last[has_values], side='right') - 1]]
+
+    minimum, maximum = np.full(n_groups, np.nan), np.full(n_groups, np.nan)
+    minimum[has_values], maximum[has_values] = x[low[has_values]], x[high[has_values]]
+    min_index = [index[position].item() if position >= 0 else None for position in low.tolist()]
+    max_index = [index[position].item() if position >= 0 else None for position in high.tolist()]
+    return [list(row) for row in zip(count.tolist(), _significant(mean), _significant(std), _significant(minimum),
+                                     min_index, _significant(maximum), max_index)]
+
+
+def summarize_frame(frame: pd.DataFrame, columns: List[str], group_by: List[str], bins: int = 10) -> Dict[str, Any]:
+    """Statistics of result columns, overall and per group, with NumPy instead of a pandas groupby.
+
+    Each column is summarized with a few bincounts and one sort: count, mean,
+    standard deviation (ddof=1, as in query_results), min and max with the
+    index of the element where they occur, and a histogram over `bins` equal
+    bins between the overall min and max. NaN values are left out.
+
+    Args:
+        frame: Result table with its key columns, e.g. from `load_results` or `result_frame`
+        columns: Numeric columns to summarize
+        group_by: Key columns to group on, e.g. ["vn_kv"] or ["vn_kv", "zone"]
+        bins: Number of histogram bins
+
+    Returns:
+        Dict with "rows", "overall" {column: stats}, "groups" {"keys", "columns", column: rows}
+        and "histograms" {column: {"edges", "overall", "groups"}}
+    """
+    _check_columns(frame, columns + group_by)
+    codes = np.zeros(len(frame), dtype=np.int64)
+    keys = [[]]
+    if group_by:
+        factors = [pd.factorize(frame[column], sort=True, use_na_sentinel=False) for column in group_by]
+        combined = np.ravel_multi_index([factor[0] for factor in factors], [len(factor[1]) for factor in factors])
+        unique, codes = np.unique(combined, return_inverse=True)
+        levels = [[None if pd.isnull(value) else value for value in pd.Index(uniques).tolist()]
+                  for _, uniques in factors]
+        positions = np.unravel_index(unique, [len(level) for level in levels])
+        keys = [[level[p] for level, p in zip(levels, position)] for position in zip(*(p.tolist() for p in positions))]
+    index = frame.index.to_numpy()
+
+    summary = {"rows": len(frame), "overall": {}, "groups": {"keys": group_by, "columns": list(STAT_COLUMNS)},
+               "histograms": {}}
+    for column in columns:
+        x = frame[column].to_numpy(dtype=np.float64)
+        valid = ~np.isnan(x)
+        x, column_index, group = x[valid], index[valid], codes[valid]
+        by_value = np.argsort(x, kind='stable')
+        overall = _group_stats(x, column_index, np.zeros(len(x), dtype=np.int64), 1, by_value)[0]
+        summary["overall"][column] = dict(zip(STAT_COLUMNS, overall))
+        if group_by:
+            summary["groups"][column] = [key + row for key, row in
+                                         zip(keys, _group_stats(x, column_index, group, len(keys), by_value))]
+        if len(x):
+            low, high = x.min(), x.max()
+            width = (high - low) / bins
+            bin_of = np.minimum(((x - low) / width).astype(np.int64), bins - 1) if width > 0 \
+                else np.zeros(len(x), dtype=np.int64)
+            counts = np.bincount(group * bins + bin_of, minlength=len(keys) * bins).reshape(len(keys), bins)
+            summary["histograms"][column] = {
+                "edges": _significant(low + width * np.arange(bins + 1)),
+                "overall": counts.sum(axis=0).tolist(),
+                **({"groups": counts.tolist()} if group_by else {})
+            }
+    return summary
+
+
+def fit_budget(sections: List[Tuple[str, str, Any]], max_bytes: float) -> Tuple[Dict[str, Dict[str, Any]], List[str]]:
+    """Keep the sections of a response that fit in a size budget, in order of priority.
+
+    Args:
+        sections: (table, part, value) in decreasing priority
+        max_bytes: Budget for the JSON of the kept sections
+
+    Returns:
+        Kept sections as {table: {part: value}}, and the "table.part" names of the left out ones
+    """
+    kept: Dict[str, Dict[str, Any]] = {}
+    omitted = []
+    for table, part, value in sections:
+        kept.setdefault(table, {})[part] = value
+        if len(json.dumps(kept)) > max_bytes:
+            del kept[table][part]
+            if not kept[table]:
+                del kept[table]
+            omitted.append(f"{table}.{part}")
+    return kept, omitted
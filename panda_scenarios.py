@@ -0,0 +1,255 @@
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+import logging
+import os
+import numpy as np
+import pandas as pd
+import pandapower as pp
+
+from panda_contingency import warm_start_session
+from panda_shared import SharedNetworkSpec, network_handoff, own_columns, pool_context, receive_network
+
+logger = logging.getLogger(__name__)
+
+# Columns multiplied by the scaling factor of each element table
+SCALED_COLUMNS = {
+    'load': ('p_mw', 'q_mvar'),
+    'sgen': ('p_mw', 'q_mvar'),
+    'gen': ('p_mw',),
+    'storage': ('p_mw', 'q_mvar'),
+}
+
+# Branch result tables whose pl_mw add up to the network losses
+_LOSS_TABLES = ('res_line', 'res_trafo', 'res_trafo3w', 'res_impedance', 'res_dcline')
+
+# Branch result tables searched for the highest loading
+_LOADING_TABLES = ('res_line', 'res_trafo', 'res_trafo3w')
+
+# Columns of the comparison table, one row per scenario
+SUMMARY_COLUMNS = ('scenario', 'converged', 'losses_mw', 'min_vm_pu', 'min_vm_bus', 'max_vm_pu', 'max_vm_bus',
+                   'max_loading_percent', 'max_loading_element', 'error')
+
+# An overlay is a list of (table, column, indices, values) changes applied on top of a network
+Overlay = List[Tuple[str, str, np.ndarray, np.ndarray]]
+
+# Network and base case bus results held by each worker process of the scenario pool
+_worker_net = None
+_worker_res_bus = None
+
+
+def scenario_overlay(net: pp.pandapowerNet, scenario: Dict[str, Any]) -> Overlay:
+    """Check a scenario and turn it into the cell changes it makes to the network.
+
+    Args:
+        net: Base case network
+        scenario: Dict with any of
+            "scale": factor per element table, e.g. {"load": 1.05}, applied to p_mw and q_mvar
+            "outages": [element, index] pairs taken out of service, e.g. [["line", 3]]
+            "setpoints": changes {"element": ..., "index": ..., "column": ..., "value": ...}
+
+    Returns:
+        The changes, in the order they are applied
+    """
+    name = scenario.get("name", "scenario")
+    unknown = set(scenario) - {"name", "scale", "outages", "setpoints"}
+    if unknown:
+        raise ValueError(f"Scenario '{name}': unknown keys {sorted(unknown)}. "
+                         f"Use name, scale, outages and setpoints.")
+    overlay: Overlay = []
+
+    for element, factor in (scenario.get("scale") or {}).items():
+        if element not in SCALED_COLUMNS:
+            raise ValueError(f"Scenario '{name}': cannot scale '{element}'. "
+                             f"Use {', '.join(SCALED_COLUMNS)}.")
+        table = net[element]
+        for column in SCALED_COLUMNS[element]:
+            if column in table and len(table):
+                overlay.append((element, column, table.index.to_numpy(),
+                                table[column].to_numpy(dtype=np.float64) * float(factor)))
+
+    for outage in scenario.get("outages") or []:
+        try:
+            element, index = outage
+            index = int(index)
+        except (TypeError, ValueError):
+            raise ValueError(f"Scenario '{name}': outages must be [element, index] pairs, got {outage!r}.")
+        if element not in net or index not in net[element].index or 'in_service' not in net[element]:
+            raise ValueError(f"Scenario '{name}': unknown {element} {index}.")
+        overlay.append((element, 'in_service', np.array([index]), np.array([False])))
+
+    for change in scenario.get("setpoints") or []:
+        element, index, column = change.get("element"), change.get("index"), change.get("column")
+        if element not in net or index not in net[element].index:
+            raise ValueError(f"Scenario '{name}': unknown {element} {index}.")
+        if column not in net[element] or column in ('bus', 'from_bus', 'to_bus', 'hv_bus', 'lv_bus') \
+                or not pd.api.types.is_numeric_dtype(net[element][column]):
+            raise ValueError(f"Scenario '{name}': cannot set column '{column}' of {element}.")
+        overlay.append((element, column, np.array([index]),
+                        np.array([_setpoint_value(name, net[element][column].dtype, change.get("value"))])))
+    return overlay
+
+
+def _setpoint_value(name: str, dtype: np.dtype, value: Any) -> Any:
+    """Check that a setpoint fits the column it is written to, so applying it keeps the column dtype."""
+    if pd.api.types.is_bool_dtype(dtype):
+        if not isinstance(value, (bool, np.bool_)):
+            raise ValueError(f"Scenario '{name}': setpoint value {value!r} must be true or false.")
+        return bool(value)
+    if isinstance(value, (bool, np.bool_)) or not isinstance(value, (int, float, np.number)):
+        raise ValueError(f"Scenario '{name}': setpoint value {value!r} must be a number.")
+    if pd.api.types.is_integer_dtype(dtype):
+        if not float(value).is_integer():
+            raise ValueError(f"Scenario '{name}': setpoint value {value!r} must be a whole number.")
+        return int(value)
+    return float(value)
+
+
+@contextmanager
+def applied(net: pp.pandapowerNet, overlay: Overlay) -> Iterator[pp.pandapowerNet]:
+    """Apply an overlay to the network and restore the original values and dtypes afterwards."""
+    saved = []
+    try:
+        for element, column, indices, values in overlay:
+            saved.append((element, column, indices, net[element].loc[indices, column].to_numpy(),
+                          net[element][column].dtype))
+            net[element].loc[indices, column] = values
+        yield net
+    finally:
+        for element, column, indices, values, dtype in reversed(saved):
+            net[element].loc[indices, column] = values
+            if net[element][column].dtype != dtype:
+                net[element][column] = net[element][column].astype(dtype)
+
+
+def _extreme(frame: pd.DataFrame, column: str, largest: bool) -> Tuple[Optional[float], Any]:
+    values = frame[column].dropna()
+    if values.empty:
+        return None, None
+    index = values.idxmax() if largest else values.idxmin()
+    return float(values[index]), index
+
+
+def scenario_summary(net: pp.pandapowerNet, name: str) -> Dict[str, Any]:
+    """Losses, voltage extremes and highest branch loading of a solved network."""
+    losses = sum(float(net[table].pl_mw.sum()) for table in _LOSS_TABLES
+                 if table in net and 'pl_mw' in net[table])
+    min_vm, min_bus = _extreme(net.res_bus, 'vm_pu', largest=False)
+    max_vm, max_bus = _extreme(net.res_bus, 'vm_pu', largest=True)
+    max_loading, max_element = None, None
+    for table in _LOADING_TABLES:
+        if table not in net or 'loading_percent' not in net[table]:
+            continue
+        loading, index = _extreme(net[table], 'loading_percent', largest=True)
+        if loading is not None and (max_loading is None or loading > max_loading):
+            max_loading, max_element = loading, f"{table[len('res_'):]}_{index}"
+    return {
+        'scenario': name,
+        'converged': True,
+        'losses_mw': round(losses, 6),
+        'min_vm_pu': None if min_vm is None else round(min_vm, 6),
+        'min_vm_bus': None if min_bus is None else int(min_bus),
+        'max_vm_pu': None if max_vm is None else round(max_vm, 6),
+        'max_vm_bus': None if max_bus is None else int(max_bus),
+        'max_loading_percent': None if max_loading is None else round(max_loading, 4),
+        'max_loading_element': max_element,
+        'error': None
+    }
+
+
+def evaluate_scenario(net: pp.pandapowerNet, name: str, overlay: Overlay,
+                      base_res_bus: pd.DataFrame) -> Dict[str, Any]:
+    """Solve one scenario on the live network, warm-started from the base case voltages.
+
+    Args:
+        net: Base case network, restored on return
+        name: Scenario name
+        overlay: Changes of the scenario, see `scenario_overlay`
+        base_res_bus: Base case bus results used as the starting point
+
+    Returns:
+        Summary row of the scenario
+    """
+    with applied(net, overlay):
+        net['res_bus'] = base_res_bus.copy()
+        try:
+            pp.runpp(net, init="results")
+            return scenario_summary(net, name)
+        except Exception as e:
+            return {**dict.fromkeys(SUMMARY_COLUMNS), 'scenario': name, 'converged': False,
+                    'error': str(e) or type(e).__name__}
+
+
+def iter_scenarios_serial(net: pp.pandapowerNet,
+                          scenarios: List[Tuple[str, Overlay]]) -> Iterator[Dict[str, Any]]:
+    """Solve scenarios one after another in the current process, base case first.
+
+    The results of the network are restored afterwards.
+
+    Yields:
+        Summary rows in the order of `scenarios`
+    """
+    with warm_start_session(net) as base_res_bus:
+        yield scenario_summary(net, "base")
+        for name, overlay in scenarios:
+            yield evaluate_scenario(net, name, overlay, base_res_bus)
+
+
+def _init_worker(handoff: Union[pp.pandapowerNet, SharedNetworkSpec]) -> None:
+    """Store the base case network and its solution once per worker process."""
+    global _worker_net, _worker_res_bus
+    _worker_net = receive_network(handoff)
+    pp.runpp(_worker_net)
+    _worker_res_bus = _worker_net.res_bus.copy()
+
+
+def _run_chunk(chunk: List[Tuple[str, Overlay]]) -> List[Dict[str, Any]]:
+    """Solve a chunk of scenarios against the worker's base case network."""
+    own_columns(_worker_net, {(table, column) for _, overlay in chunk for table, column, _, _ in overlay})
+    return [evaluate_scenario(_worker_net, name, overlay, _worker_res_bus) for name, overlay in chunk]
+
+
+def iter_scenarios_parallel(net: pp.pandapowerNet, scenarios: List[Tuple[str, Overlay]],
+                            n_workers: Optional[int] = None,
+                            chunk_size: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    """Solve scenarios on a process pool, base case first.
+
+    Workers are started from a forkserver, see `pool_context`, and the
+    network is handed to every worker once, see `network_handoff`. Each
+    worker solves the base case and warm-starts its scenarios from it.
+    Rows are yielded in the order of `scenarios`, so the output is identical
+    to `iter_scenarios_serial`.
+
+    Args:
+        net: Base case network
+        scenarios: Scenario names and overlays
+        n_workers: Number of worker processes (defaults to the CPU count)
+        chunk_size: Scenarios per task (defaults to about four tasks per worker)
+
+    Yields:
+        Summary rows in the order of `scenarios`
+    """
+    if n_workers is None:
+        n_workers = os.cpu_count() or 1
+    n_workers = max(1, min(n_workers, len(scenarios)))
+    if n_workers == 1:
+        yield from iter_scenarios_serial(net, scenarios)
+        return
+
+    with warm_start_session(net):
+        yield scenario_summary(net, "base")
+    if chunk_size is None:
+        chunk_size = max(1, -(-len(scenarios) // (n_workers * 4)))
+    chunks = [scenarios[i:i + chunk_size] for i in range(0, len(scenarios), chunk_size)]
+
+    logger.info(f"Running {len(scenarios)} scenarios on {n_workers} workers in {len(chunks)} chunks")
+    context = pool_context()
+    with network_handoff(net, context) as handoff:
+        pool = ProcessPoolExecutor(max_workers=n_workers, mp_context=context,
+                                   initializer=_init_worker, initargs=(handoff,))
+        try:
+            for chunk_rows in pool.map(_run_chunk, chunks):
+                yield from chunk_rows
+        finally:
+            # Cancelled jobs do not wait for the remaining chunks
+            pool.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,234 @@
+from typing import Dict, List, Tuple
+from dataclasses import dataclass
+import logging
+import numpy as np
+import pandapower as pp
+from scipy.sparse import csc_matrix
+from scipy.sparse.linalg import splu
+from pandapower.pypower.idx_brch import F_BUS, T_BUS, BR_X, TAP, BR_STATUS, RATE_A, PF
+from pandapower.pypower.idx_bus import BUS_TYPE, REF, NONE
+
+logger = logging.getLogger(__name__)
+
+# Branch element tables covered by the DC sensitivity model
+BRANCH_ELEMENTS = ('line', 'trafo')
+
+# Below this value an outage is considered to split the network
+_ISLANDING_TOL = 1e-6
+
+# Ratings from this value up stand for unlimited branches: MATPOWER cases use
+# 9900 MVA and pandapower's converter 99999 kA or MVA where rateA is zero
+UNRATED_MVA = 9900.
+
+
+@dataclass
+class SensitivityModel:
+    """DC sensitivities of a network around its base case.
+
+    Attributes:
+        branches: (element_type, index) of every row of the matrices
+        ptdf: Branch flow change per MW injected at each bus (n_branch x n_bus)
+        lodf: Flow change on branch m per MW flowing on outaged branch k (n_branch x n_branch)
+        in_service: True for branches in service in the base case
+        islanding: True where outaging the branch alone splits the network
+        base_flow_mw: Base case DC flow of every branch
+        rating_mva: Branch rating, 0 where the branch has no limit or a placeholder one
+    """
+    branches: List[Tuple[str, int]]
+    ptdf: np.ndarray
+    lodf: np.ndarray
+    in_service: np.ndarray
+    islanding: np.ndarray
+    base_flow_mw: np.ndarray
+    rating_mva: np.ndarray
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the matrices and branch arrays, counted by the network registry."""
+        return self.ptdf.nbytes + self.lodf.nbytes + sum(array.nbytes for array in (
+            self.in_service, self.islanding, self.base_flow_mw, self.rating_mva))
+
+    @property
+    def unrated(self) -> np.ndarray:
+        """True for branches without a rating, whose loading is never estimated."""
+        return self.rating_mva <= 0
+
+    def positions(self, outages: List[Tuple[str, int]]) -> np.ndarray:
+        """Map (element_type, index) outages to matrix rows."""
+        lookup = {branch: pos for pos, branch in enumerate(self.branches)}
+        return np.array([lookup[outage] for outage in outages], dtype=np.int64)
+
+
+def build_sensitivity_model(net: pp.pandapowerNet) -> SensitivityModel:
+    """Solve the DC base case on a copy of the network and build its PTDF and LODF.
+
+    Every reference bus acts as a slack, so networks with several supplied
+    islands are handled as long as each island has an ext_grid or slack gen.
+    Branches without a rating, or with a placeholder one of `UNRATED_MVA` or
+    more, get a rating of 0 and are left out of the loading estimates.
+
+    Args:
+        net: Network to linearise, left untouched
+
+    Returns:
+        SensitivityModel of the in-service network
+    """
+    dc_net = net.deepcopy()
+    pp.rundcpp(dc_net)
+    ppc = dc_net._ppc
+    bus, branch = ppc['bus'], ppc['branch']
+
+    branches = []
+    rows = []
+    for element_type in BRANCH_ELEMENTS:
+        if element_type not in dc_net._pd2ppc_lookups['branch']:
+            continue
+        start, end = dc_net._pd2ppc_lookups['branch'][element_type]
+        branches.extend((element_type, int(idx)) for idx in dc_net[element_type].index)
+        rows.append(np.arange(start, end))
+    rows = np.concatenate(rows) if rows else np.zeros(0, dtype=np.int64)
+    branch = branch[rows]
+
+    n_bus = bus.shape[0]
+    f = np.real(branch[:, F_BUS]).astype(np.int64)
+    t = np.real(branch[:, T_BUS]).astype(np.int64)
+    status = np.real(branch[:, BR_STATUS]) > 0
+    tap = np.real(branch[:, TAP])
+    tap[tap == 0] = 1.
+    b = np.where(status, 1. / (np.real(branch[:, BR_X]) * tap), 0.)
+
+    # Reduce the DC susceptance matrix to the energised, non reference buses
+    bus_type = np.real(bus[:, BUS_TYPE])
+    free = np.flatnonzero((bus_type != REF) & (bus_type != NONE))
+    n_br = len(branches)
+    incidence = csc_matrix((np.r_[np.ones(n_br), -np.ones(n_br)],
+                            (np.r_[np.arange(n_br), np.arange(n_br)], np.r_[f, t])),
+                           shape=(n_br, n_bus))
+    bf = incidence.multiply(b[:, None]).tocsc()
+    bbus = (incidence.T @ bf).tocsc()
+
+    ptdf = np.zeros((n_br, n_bus))
+    if len(free):
+        lu = splu(bbus[free][:, free].tocsc())
+        ptdf[:, free] = lu.solve(bf[:, free].toarray().T).T
+
+    # Branch to branch transfer factors and their outage distribution
+    h = ptdf[:, f] - ptdf[:, t]
+    h_diag = np.diag(h).copy()
+    islanding = status & (np.abs(1. - h_diag) < _ISLANDING_TOL)
+    denom = np.where(islanding | ~status, 1., 1. - h_diag)
+    lodf = h / denom[None, :]
+    lodf[:, ~status | islanding] = 0.
+    np.fill_diagonal(lodf, -1.)
+
+    rating = np.real(branch[:, RATE_A])
+    rating[~np.isfinite(rating) | (rating >= UNRATED_MVA)] = 0.
+
+    logger.info(f"Built DC sensitivities for {n_br} branches and {n_bus} buses, "
+                f"{int((rating <= 0).sum())} of them unrated")
+    return SensitivityModel(
+        branches=branches,
+        ptdf=ptdf,
+        lodf=lodf,
+        in_service=status,
+        islanding=islanding,
+        base_flow_mw=np.where(status, np.real(branch[:, PF]), 0.),
+        rating_mva=rating
+    )
+
+
+def _loading_percent(flow_mw: np.ndarray, rating_mva: np.ndarray) -> np.ndarray:
+    """Loading of flows against ratings, 0 for unrated branches."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        loading = np.abs(flow_mw) / rating_mva[None, :] * 100.
+    loading[:, rating_mva <= 0] = 0.
+    return loading
+
+
+def screen_double_outages(model: SensitivityModel, first: np.ndarray, second: np.ndarray,
+                          block_size: int = 20_000_000) -> Dict[str, np.ndarray]:
+    """Estimate post-contingency loadings of branch outage pairs with compounded LODFs.
+
+    Only branches the pair loads more heavily than the base case count towards
+    the maximum, so branches that are already overloaded do not flag every pair.
+    Unrated branches never count, see `SensitivityModel.unrated`.
+
+    Args:
+        model: DC sensitivities of the base case
+        first: Matrix positions of the first outaged branch of every pair
+        second: Matrix positions of the second outaged branch of every pair
+        block_size: Maximum number of matrix cells evaluated at once
+
+    Returns:
+        Dict with the estimated maximum aggravated loading in percent and an islanding flag per pair
+    """
+    lodf, flow = model.lodf, model.base_flow_mw
+    n_br = len(flow)
+    max_loading = np.zeros(len(first))
+    islanding = model.islanding[first] | model.islanding[second]
+    base_loading = _loading_percent(flow[None, :], model.rating_mva)
+
+    pairs_per_block = max(1, block_size // max(n_br, 1))
+    for start in range(0, len(first), pairs_per_block):
+        k = first[start:start + pairs_per_block]
+        l = second[start:start + pairs_per_block]
+        l_kl, l_lk = lodf[k, l], lodf[l, k]
+        det = 1. - l_kl * l_lk
+        split = np.abs(det) < _ISLANDING_TOL
+        det[split] = 1.
+        # Flows the two branches would carry before being opened simultaneously
+        x = (flow[k] + l_kl * flow[l]) / det
+        y = (flow[l] + l_lk * flow[k]) / det
+        post = flow[None, :] + x[:, None] * lodf[:, k].T + y[:, None] * lodf[:, l].T
+        rows = np.arange(len(k))
+        post[rows, k] = 0.
+        post[rows, l] = 0.
+        loading = _loading_percent(post, model.rating_mva)
+        loading[loading <= base_loading] = 0.
+        max_loading[start:start + len(k)] = loading.max(axis=1, initial=0.)
+        islanding[start:start + len(k)] |= split
+
+    return {"max_loading_percent": max_loading, "islanding": islanding}
+
+
+def rank_single_outages(model: SensitivityModel, block_size: int = 20_000_000) -> Dict[str, np.ndarray]:
+    """Estimate the post-contingency loading of every single in-service branch outage.
+
+    Unrated branches are outaged but never count as loaded, see `SensitivityModel.unrated`.
+
+    Args:
+        model: DC sensitivities of the base case
+        block_size: Maximum number of matrix cells evaluated at once
+
+    Returns:
+        Dict with, per outage ordered from most to least severe, its matrix
+        position, estimated maximum loading in percent, most loaded branch
+        position, number of overloaded branches and islanding flag
+    """
+    lodf, flow = model.lodf, model.base_flow_mw
+    n_br = len(flow)
+    outages = np.flatnonzero(model.in_service)
+    max_loading = np.zeros(len(outages))
+    worst_branch = np.zeros(len(outages), dtype=np.int64)
+    n_overloads = np.zeros(len(outages), dtype=np.int64)
+
+    outages_per_block = max(1, block_size // max(n_br, 1))
+    for start in range(0, len(outages), outages_per_block):
+        k = outages[start:start + outages_per_block]
+        post = flow[None, :] + flow[k][:, None] * lodf[:, k].T
+        post[np.arange(len(k)), k] = 0.
+        loading = _loading_percent(post, model.rating_mva)
+        max_loading[start:start + len(k)] = loading.max(axis=1, initial=0.)
+        worst_branch[start:start + len(k)] = loading.argmax(axis=1) if n_br else 0
+        n_overloads[start:start + len(k)] = (loading > 100.).sum(axis=1)
+
+    islanding = model.islanding[outages]
+    # Most loaded first, islanding outages last since their DC estimate is meaningless
+    order = np.lexsort((-max_loading, islanding))
+    return {
+        "position": outages[order],
+        "max_loading_percent": max_loading[order],
+        "worst_branch": worst_branch[order],
+        "n_overloads": n_overloads[order],
+        "islanding": islanding[order]
+    }
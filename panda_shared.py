@@ -0,0 +1,172 @@
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+from contextlib import contextmanager
+from dataclasses import dataclass
+from multiprocessing.shared_memory import SharedMemory
+import logging
+import multiprocessing
+import multiprocessing.context
+import os
+import pickle
+import pandas as pd
+import pandapower as pp
+
+from panda_format import COLUMN_ALIGNMENT
+
+logger = logging.getLogger(__name__)
+
+# Shared memory blocks attached by this process; kept open while their arrays are in use
+_attached: Dict[str, SharedMemory] = {}
+
+
+@dataclass(frozen=True)
+class SharedNetworkSpec:
+    """What a worker process needs to attach to a published network; small to pickle.
+
+    Attributes:
+        name: Name of the shared memory block
+        payload: Pickle of the network without its array data
+        buffers: Offset and size in the block of every array left out of the payload
+    """
+    name: str
+    payload: bytes
+    buffers: List[Tuple[int, int]]
+
+
+class SharedNetwork:
+    """Network published once into shared memory, for worker processes to attach to.
+
+    The network is pickled with protocol 5, which hands the data of numpy
+    arrays out of band: the element table columns and the bus, branch and gen
+    matrices of the last power flow are copied into one shared memory block,
+    each aligned to `COLUMN_ALIGNMENT` bytes, and only `spec` is sent to the
+    workers instead of a pickle of the whole network.
+
+    Result tables other than res_bus, kept for warm starts, are published
+    empty and the solver internals of the last power flow (its admittance
+    matrices and Jacobian) are left out; workers build their own when they
+    solve.
+
+    Args:
+        net: Network to publish
+    """
+
+    def __init__(self, net: pp.pandapowerNet):
+        published = pp.pandapowerNet(dict(net.items()))
+        for key, value in net.items():
+            if key.startswith('res_') and key != 'res_bus' and isinstance(value, pd.DataFrame):
+                published[key] = value.iloc[:0]
+        if isinstance(net.get('_ppc'), dict):
+            published['_ppc'] = {key: value for key, value in net._ppc.items() if key != 'internal'}
+
+        buffers: List[pickle.PickleBuffer] = []
+        payload = pickle.dumps(published, protocol=5, buffer_callback=buffers.append)
+        layout = []
+        offset = 0
+        for buffer in buffers:
+            offset += -offset % COLUMN_ALIGNMENT
+            layout.append((offset, buffer.raw().nbytes))
+            offset += buffer.raw().nbytes
+
+        self._shm = SharedMemory(create=True, size=max(offset, 1))
+        for (start, nbytes), buffer in zip(layout, buffers):
+            self._shm.buf[start:start + nbytes] = buffer.raw()
+        self.nbytes = offset
+        self.spec = SharedNetworkSpec(name=self._shm.name, payload=payload, buffers=layout)
+        logger.info(f"Published network with {len(buffers)} arrays ({offset / 2 ** 20:.1f} MiB) "
+                    f"to shared memory {self._shm.name}")
+
+    def close(self) -> None:
+        """Release the shared memory; attached workers must have finished."""
+        self._shm.close()
+        self._shm.unlink()
+
+    def __enter__(self) -> "SharedNetwork":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def attach_network(spec: SharedNetworkSpec) -> pp.pandapowerNet:
+    """Rebuild a published network in a worker process without copying its arrays.
+
+    The arrays are read-only views of the shared memory, so that no worker can
+    change them for the others. Call `own_columns` before changing a column in
+    place.
+
+    Args:
+        spec: `SharedNetwork.spec` of the published network
+
+    Returns:
+        The network
+    """
+    shm = _attached.get(spec.name)
+    if shm is None:
+        shm = _attached[spec.name] = SharedMemory(name=spec.name)
+    memory = shm.buf.toreadonly()
+    return pickle.loads(spec.payload, buffers=[memory[start:start + nbytes] for start, nbytes in spec.buffers])
+
+
+def own_columns(net: pp.pandapowerNet, columns: Iterable[Tuple[str, str]]) -> None:
+    """Replace shared read-only columns by private copies before changing them in place.
+
+    Args:
+        net: Network returned by `attach_network`
+        columns: (table, column) pairs about to be changed
+    """
+    for table, column in columns:
+        if table not in net or column not in net[table]:
+            continue
+        values = net[table][column].to_numpy()
+        if not values.flags.writeable:
+            net[table][column] = values.copy()
+
+
+def pool_context() -> multiprocessing.context.BaseContext:
+    """Start method for the worker pools of the parallel runs.
+
+    Forking copies only the calling thread into the child, together with every
+    lock the other threads of the server (tool executor, job manager, event
+    loop) held at that moment, so a forked worker can hang on a lock nobody
+    will release. Pools therefore start their workers from a forkserver, or
+    spawn them where there is none. Set POWER_MCP_START_METHOD=fork to opt in
+    to forking anyway, e.g. from a single-threaded script; it is unsafe under
+    the server.
+
+    Returns:
+        The multiprocessing context to pass as `mp_context`
+    """
+    method = os.environ.get("POWER_MCP_START_METHOD")
+    if method is None:
+        method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    return multiprocessing.get_context(method)
+
+
+@contextmanager
+def network_handoff(net: pp.pandapowerNet,
+                    context: Optional[multiprocessing.context.BaseContext] = None) -> Iterator[Union[pp.pandapowerNet, SharedNetworkSpec]]:
+    """Initializer argument of a worker pool that gives every worker the network.
+
+    Workers started from a forkserver or spawned would each unpickle a full
+    copy, so the network is published to shared memory once and they attach
+    to it. Only when forking was chosen explicitly, see `pool_context`, is the
+    network handed over as is, since forked workers inherit it. Read it back
+    with `receive_network`.
+
+    Args:
+        net: Network the workers need
+        context: Context the pool starts its workers with (defaults to `pool_context()`)
+
+    Yields:
+        The network or the spec of its shared memory copy
+    """
+    if (context or pool_context()).get_start_method() == "fork":
+        yield net
+        return
+    with SharedNetwork(net) as shared:
+        yield shared.spec
+
+
+def receive_network(handoff: Union[pp.pandapowerNet, SharedNetworkSpec]) -> pp.pandapowerNet:
+    """Network handed over by `network_handoff`, in the worker process."""
+    return attach_network(handoff) if isinstance(handoff, SharedNetworkSpec) else handoff
@@ -0,0 +1,480 @@
+from typing import Any, Dict, List, Optional, Tuple, Union
+from datetime import datetime, timezone
+from concurrent.futures import ProcessPoolExecutor
+import copy
+import json
+import logging
+import os
+import re
+import shutil
+import uuid
+import numpy as np
+import pandas as pd
+import pandapower as pp
+from pandapower.control import ConstControl
+from pandapower.io_utils import JSONSerializableClass
+from pandapower.timeseries import run_timeseries
+
+from panda_jobs import track_progress
+from panda_shared import SharedNetworkSpec, network_handoff, own_columns, pool_context, receive_network
+
+from panda_results import prune_results, result_dir
+
+logger = logging.getLogger(__name__)
+
+# Variables logged when none are requested
+DEFAULT_VARIABLES = ('res_bus.vm_pu', 'res_line.loading_percent')
+
+# Aggregates computed when none are requested
+DEFAULT_AGGREGATES = ('min', 'max', 'mean')
+
+_PERCENTILE = re.compile(r"^p(\d{1,2}(\.\d+)?)$")
+
+# Rows written between two flushes of the memory-mapped arrays
+_FLUSH_ROWS = 256
+
+# Network of a worker process of a parallel timeseries
+_worker_net = None
+
+
+class StreamingQuantile:
+    """P-square estimate of one quantile for many series at once, in constant memory.
+
+    Keeps five markers per series (Jain and Chlamtac, 1985) instead of the
+    observations, so that percentiles of a year of time steps can be updated
+    step by step. The markers depend on the order of the observations and the
+    estimates of two runs cannot be combined, so percentiles need all time
+    steps in one writer, see `has_percentiles`.
+
+    Args:
+        q: Quantile in [0, 1]
+        n_series: Number of series updated together
+    """
+
+    def __init__(self, q: float, n_series: int):
+        self.q = q
+        self.count = 0
+        self._first = np.empty((5, n_series))
+        self.heights = np.empty((n_series, 5))
+        self.positions = np.tile(np.arange(1., 6.), (n_series, 1))
+        self.desired = np.tile(np.array([1., 1 + 2 * q, 1 + 4 * q, 3 + 2 * q, 5.]), (n_series, 1))
+        self.increments = np.array([0., q / 2, q, (1 + q) / 2, 1.])
+
+    def update(self, values: np.ndarray) -> None:
+        """Add one observation per series."""
+        if self.count < 5:
+            self._first[self.count] = values
+            self.count += 1
+            if self.count == 5:
+                self.heights = np.sort(self._first, axis=0).T.copy()
+            return
+        self.count += 1
+        heights, positions = self.heights, self.positions
+        heights[:, 0] = np.minimum(heights[:, 0], values)
+        heights[:, 4] = np.maximum(heights[:, 4], values)
+        # Markers above the observation move up by one position
+        positions[:, 1:] += values[:, None] < heights[:, 1:]
+        positions[:, 4] = self.count
+        self.desired += self.increments
+
+        for i in (1, 2, 3):
+            delta = self.desired[:, i] - positions[:, i]
+            move = ((delta >= 1) & (positions[:, i + 1] - positions[:, i] > 1)) | \
+                   ((delta <= -1) & (positions[:, i - 1] - positions[:, i] < -1))
+            if not move.any():
+                continue
+            step = np.sign(delta[move])
+            h, n = heights[move], positions[move]
+            parabolic = h[:, i] + step / (n[:, i + 1] - n[:, i - 1]) * (
+                (n[:, i] - n[:, i - 1] + step) * (h[:, i + 1] - h[:, i]) / (n[:, i + 1] - n[:, i])
+                + (n[:, i + 1] - n[:, i] - step) * (h[:, i] - h[:, i - 1]) / (n[:, i] - n[:, i - 1]))
+            neighbour = np.where(step > 0, i + 1, i - 1)
+            rows = np.arange(len(h))
+            linear = h[:, i] + step * (h[rows, neighbour] - h[:, i]) / (n[rows, neighbour] - n[:, i])
+            inside = (h[:, i - 1] < parabolic) & (parabolic < h[:, i + 1])
+            heights[move, i] = np.where(inside, parabolic, linear)
+            positions[move, i] += step
+
+    def value(self) -> np.ndarray:
+        """Current estimate per series, exact while fewer than five observations were added."""
+        if self.count < 5:
+            if not self.count:
+                return np.full(self._first.shape[1], np.nan)
+            return np.percentile(self._first[:self.count], self.q * 100, axis=0)
+        return self.heights[:, 2].copy()
+
+
+def parse_variables(net: pp.pandapowerNet, variables: Optional[List[str]]) -> List[Tuple[str, str]]:
+    """Check variables given as 'table.column', e.g. 'res_bus.vm_pu'."""
+    parsed = []
+    for variable in variables or DEFAULT_VARIABLES:
+        table, _, column = variable.partition('.')
+        if not table.startswith('res_') or not column:
+            raise ValueError(f"Invalid variable '{variable}'. Use 'res_<element>.<column>', e.g. 'res_bus.vm_pu'.")
+        if table[len('res_'):] not in net:
+            raise ValueError(f"Unknown result table '{table}'.")
+        if table in net and len(net[table].columns) and column not in net[table]:
+            raise ValueError(f"Unknown column '{column}' of {table}. Available: {', '.join(net[table].columns)}")
+        parsed.append((table, column))
+    return parsed
+
+
+def parse_aggregates(aggregates: Optional[List[str]]) -> List[str]:
+    """Check aggregates: 'min', 'max', 'mean' or percentiles such as 'p95'."""
+    aggregates = list(aggregates or DEFAULT_AGGREGATES)
+    for aggregate in aggregates:
+        if aggregate not in ('min', 'max', 'mean') and not _PERCENTILE.match(aggregate):
+            raise ValueError(f"Unknown aggregate '{aggregate}'. Use 'min', 'max', 'mean' or a percentile like 'p95'.")
+    return aggregates
+
+
+class TimeseriesWriter(JSONSerializableClass):
+    """Output writer streaming selected timeseries results to memory-mapped arrays on disk.
+
+    Takes the place of pandapower's OutputWriter in net.output_writer. Each
+    logged variable gets one .npy array of shape (rows, elements), written row
+    by row; with `downsample`, a row holds the mean of that many time steps.
+    Aggregates over all time steps are updated as the steps are solved, so the
+    full-resolution results are never held in memory. Time steps whose power
+    flow did not converge are stored as NaN and left out of the aggregates.
+
+    Args:
+        net: Network of the timeseries
+        n_steps: Number of time steps
+        variables: Variables to log as 'table.column'
+        downsample: Number of time steps averaged into one stored row
+        aggregates: Aggregates over all time steps, see `parse_aggregates`
+        metadata: Extra JSON serialisable information stored with the results
+    """
+
+    def __init__(self, net: pp.pandapowerNet, n_steps: int, variables: Optional[List[str]] = None,
+                 downsample: int = 1, aggregates: Optional[List[str]] = None,
+                 metadata: Optional[Dict[str, Any]] = None):
+        super().__init__()
+        if downsample < 1:
+            raise ValueError("downsample must be at least 1.")
+        self.variables = parse_variables(net, variables)
+        self.aggregates = parse_aggregates(aggregates)
+        # Entries longer than (table, column), as pandapower's own (table, column, index),
+        # keep run_timeseries from switching to voltage-only results with batch reads
+        self.log_variables = [(table, column, None) for table, column in self.variables]
+        self.n_steps = n_steps
+        self.downsample = downsample
+        self.metadata = metadata or {}
+        self.handle = f"ts_{uuid.uuid4().hex[:12]}"
+        self.path = os.path.join(result_dir(), self.handle)
+        self.time_step = None
+        self.time_steps = None
+        # Time steps [_first, _stop) are written by this writer, see `chunk`
+        self._first = 0
+        self._stop = n_steps
+        self._create = True
+        self._step = 0
+        self._arrays: Dict[str, np.ndarray] = {}
+        # run_timeseries uses the writer registered in the network
+        self.add_to_net(net, element="output_writer", index=0, overwrite=True)
+
+    def init_all(self, net: pp.pandapowerNet) -> None:
+        """Create or open the arrays; called by run_timeseries before the first time step."""
+        if self._create:
+            os.makedirs(self.path)
+        rows = -(-self.n_steps // self.downsample)
+        self._index = {}
+        self._window = {}
+        self._stats = {}
+        for table, column in self.variables:
+            name = f"{table}.{column}"
+            index = net[table[len('res_'):]].index
+            self._index[name] = index
+            if self._create:
+                self._arrays[name] = np.lib.format.open_memmap(os.path.join(self.path, f"{name}.npy"), mode="w+",
+                                                               dtype=np.float32, shape=(rows, len(index)))
+            else:
+                self._arrays[name] = np.load(os.path.join(self.path, f"{name}.npy"), mmap_mode="r+")
+            self._window[name] = (np.zeros(len(index)), np.zeros(len(index)))
+            stats = {"count": np.zeros(len(index)), "sum": np.zeros(len(index)),
+                     "min": np.full(len(index), np.inf), "max": np.full(len(index), -np.inf)}
+            for aggregate in self.aggregates:
+                match = _PERCENTILE.match(aggregate)
+                if match:
+                    stats[aggregate] = StreamingQuantile(float(match.group(1)) / 100, len(index))
+            self._stats[name] = stats
+        self._converged = np.zeros(self.n_steps, dtype=bool)
+        self._step = self._first
+
+    def save_results(self, net: pp.pandapowerNet, time_step: Any, pf_converged: bool = True,
+                     ctrl_converged: bool = True, recycle_options: Any = None) -> None:
+        """Write the results of one time step; called by run_timeseries after every step."""
+        converged = bool(pf_converged and ctrl_converged)
+        self._converged[self._step] = converged
+        row, last = divmod(self._step, self.downsample)
+        end_of_window = last == self.downsample - 1 or self._step == self.n_steps - 1
+        for table, column in self.variables:
+            name = f"{table}.{column}"
+            total, count = self._window[name]
+            if converged:
+                values = net[table][column].reindex(self._index[name]).to_numpy(dtype=np.float64)
+                valid = ~np.isnan(values)
+                total += np.where(valid, values, 0.)
+                count += valid
+                self._update_stats(self._stats[name], values, valid)
+            if end_of_window:
+                with np.errstate(invalid='ignore', divide='ignore'):
+                    self._arrays[name][row] = np.where(count > 0, total / count, np.nan)
+                total[:] = 0.
+                count[:] = 0.
+                if row % _FLUSH_ROWS == _FLUSH_ROWS - 1:
+                    self._arrays[name].flush()
+        self._step += 1
+
+    def has_percentiles(self) -> bool:
+        """Whether percentile aggregates are requested, which rules out running in chunks."""
+        return any(_PERCENTILE.match(aggregate) for aggregate in self.aggregates)
+
+    def chunk(self, start: int, stop: int) -> "TimeseriesWriter":
+        """Writer for time steps [start, stop) writing into the arrays created by this writer.
+
+        Chunks can run in other processes. `start` must be a multiple of
+        `downsample`, so that no stored row spans two chunks. Combine their
+        `partial` results with `merge`.
+        """
+        if start % self.downsample:
+            raise ValueError(f"Chunks must start at multiples of downsample ({self.downsample}).")
+        part = copy.copy(self)
+        part._arrays = {}
+        part._first, part._stop, part._create = start, stop, False
+        return part
+
+    def partial(self) -> Dict[str, Any]:
+        """Flush the arrays of a chunk and return its convergence flags and aggregates."""
+        for array in self._arrays.values():
+            array.flush()
+        self._arrays.clear()
+        return {"first": self._first, "stop": self._stop,
+                "converged": self._converged[self._first:self._stop], "stats": self._stats}
+
+    def merge(self, partial: Dict[str, Any]) -> None:
+        """Add the convergence flags and aggregates of a chunk; percentiles cannot be merged."""
+        self._converged[partial["first"]:partial["stop"]] = partial["converged"]
+        for name, chunk_stats in partial["stats"].items():
+            stats = self._stats[name]
+            stats["count"] += chunk_stats["count"]
+            stats["sum"] += chunk_stats["sum"]
+            np.fmin(stats["min"], chunk_stats["min"], out=stats["min"])
+            np.fmax(stats["max"], chunk_stats["max"], out=stats["max"])
+
+    @staticmethod
+    def _update_stats(stats: Dict[str, Any], values: np.ndarray, valid: np.ndarray) -> None:
+        stats["count"] += valid
+        stats["sum"] += np.where(valid, values, 0.)
+        np.fmin(stats["min"], values, out=stats["min"])
+        np.fmax(stats["max"], values, out=stats["max"])
+        for estimator in stats.values():
+            if isinstance(estimator, StreamingQuantile):
+                # Elements without a result keep their previous estimate
+                estimator.update(np.where(valid, values, estimator.value() if estimator.count else 0.))
+
+    def finish(self) -> Dict[str, Any]:
+        """Flush the arrays and store the aggregates and metadata, then prune old results, see `prune_results`.
+
+        Returns:
+            Summary per variable: stored shape and the extreme values with their elements
+        """
+        summary = {}
+        variables = {}
+        for name, array in self._arrays.items():
+            array.flush()
+            stats = self._stats[name]
+            with np.errstate(invalid='ignore', divide='ignore'):
+                aggregates = {
+                    "min": np.where(stats["count"] > 0, stats["min"], np.nan),
+                    "max": np.where(stats["count"] > 0, stats["max"], np.nan),
+                    "mean": np.where(stats["count"] > 0, stats["sum"] / stats["count"], np.nan),
+                }
+            for aggregate in self.aggregates:
+                if aggregate not in aggregates:
+                    aggregates[aggregate] = np.where(stats["count"] > 0, stats[aggregate].value(), np.nan)
+            index = self._index[name]
+            np.savez(os.path.join(self.path, f"{name}.aggregates.npz"), index=index.to_numpy(),
+                     **{aggregate: aggregates[aggregate] for aggregate in self.aggregates})
+            variables[name] = {"rows": array.shape[0], "elements": array.shape[1]}
+            entry = dict(variables[name])
+            if np.isfinite(aggregates["max"]).any():
+                entry["max"] = {"value": float(np.nanmax(aggregates["max"])),
+                                "element": int(index[np.nanargmax(aggregates["max"])])}
+                entry["min"] = {"value": float(np.nanmin(aggregates["min"])),
+                                "element": int(index[np.nanargmin(aggregates["min"])])}
+            summary[name] = entry
+        self._arrays.clear()
+
+        with open(os.path.join(self.path, "meta.json"), "w") as f:
+            json.dump({
+                "handle": self.handle,
+                "created": datetime.now(timezone.utc).isoformat(),
+                "time_steps": self.n_steps,
+                "downsample": self.downsample,
+                "aggregates": self.aggregates,
+                "variables": variables,
+                "non_converged_steps": int((~self._converged).sum()),
+                **self.metadata
+            }, f)
+        np.save(os.path.join(self.path, "converged.npy"), self._converged)
+        logger.info(f"Stored timeseries results of {len(variables)} variables under {self.handle}")
+        prune_results(keep=self.handle)
+        return summary
+
+    def discard(self) -> None:
+        """Delete the partial results of a failed or cancelled run."""
+        self._arrays.clear()
+        shutil.rmtree(self.path, ignore_errors=True)
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # The arrays are files, do not copy them into pickles of the network
+        state = self.__dict__.copy()
+        state["_arrays"] = {}
+        return state
+
+
+def stateful_controllers(net: pp.pandapowerNet) -> List[str]:
+    """Controllers whose state carries over from one time step to the next, such as tap changers.
+
+    Only ConstControl, which sets values from a data source, is known to keep
+    no state; other controllers are treated as stateful.
+    """
+    if "controller" not in net:
+        return []
+    return [f"{type(controller).__name__} {index}" for index, controller in net.controller.object.items()
+            if not isinstance(controller, ConstControl)]
+
+
+def _no_progress(*args, **kwargs) -> None:
+    pass
+
+
+def _init_worker(handoff: Union[pp.pandapowerNet, SharedNetworkSpec]) -> None:
+    """Store the network once per worker process."""
+    global _worker_net
+    _worker_net = receive_network(handoff)
+    # The controllers write their values in place at every time step
+    own_columns(_worker_net, [(controller.element, controller.variable)
+                              for controller in _worker_net.controller.object
+                              if isinstance(controller, ConstControl)])
+
+
+def _run_chunk(task: Tuple[TimeseriesWriter, Dict[str, Any]]) -> Dict[str, Any]:
+    """Run the time steps of one chunk on the worker's network."""
+    writer, kwargs = task
+    writer.add_to_net(_worker_net, element="output_writer", index=0, overwrite=True)
+    run_timeseries(_worker_net, time_steps=range(writer._first, writer._stop), verbose=False,
+                   progress_function=_no_progress, **kwargs)
+    return writer.partial()
+
+
+def run_timeseries_parallel(net: pp.pandapowerNet, writer: TimeseriesWriter, n_workers: Optional[int] = None,
+                            chunk_size: Optional[int] = None, **kwargs) -> Dict[str, int]:
+    """Run the time steps of a timeseries in chunks on a process pool.
+
+    Without stateful controllers the time steps are independent power flows,
+    see `stateful_controllers`. Workers are started from a forkserver, see
+    `pool_context`, the network is handed to every worker once, see
+    `network_handoff`, and each chunk writes its rows straight into the
+    arrays of `writer`; the aggregates of the chunks are merged in time step
+    order. Percentile aggregates cannot be merged and are rejected, see
+    `StreamingQuantile`. Every chunk is warm-started from the power flow
+    results of `net`, solved here first when missing, so its first time step
+    does not start from a flat voltage profile.
+
+    Args:
+        net: Network with the controllers of the timeseries
+        writer: Writer of the timeseries, not yet initialised
+        n_workers: Number of worker processes (defaults to the CPU count)
+        chunk_size: Time steps per task (defaults to about four tasks per worker)
+        **kwargs: Keyword arguments of run_timeseries, such as recycle
+
+    Returns:
+        Number of workers and chunks used
+    """
+    if writer.has_percentiles():
+        raise ValueError("Percentile aggregates cannot be combined across chunks. Run the timeseries serially.")
+    n_steps = writer.n_steps
+    if n_workers is None:
+        n_workers = os.cpu_count() or 1
+    n_workers = max(1, min(n_workers, n_steps))
+    if chunk_size is None:
+        chunk_size = max(1, -(-n_steps // (n_workers * 4)))
+    # Stored rows average `downsample` time steps and must not span two chunks
+    chunk_size = -(-chunk_size // writer.downsample) * writer.downsample
+
+    if not net.get("converged", False):
+        try:
+            pp.runpp(net)
+        except pp.LoadflowNotConverged:
+            logger.info("Base case did not converge, chunks start from the default initialisation")
+    if net.get("converged", False):
+        kwargs = {"init": "results", **kwargs}
+    writer.init_all(net)
+    tasks = [(writer.chunk(start, min(start + chunk_size, n_steps)), kwargs)
+             for start in range(0, n_steps, chunk_size)]
+
+    logger.info(f"Running {n_steps} time steps on {n_workers} workers in {len(tasks)} chunks")
+    context = pool_context()
+    with network_handoff(net, context) as handoff:
+        pool = ProcessPoolExecutor(max_workers=n_workers, mp_context=context,
+                                   initializer=_init_worker, initargs=(handoff,))
+        try:
+            for partial in track_progress(pool.map(_run_chunk, tasks), len(tasks), "timeseries chunks"):
+                writer.merge(partial)
+        finally:
+            # Cancelled jobs do not wait for the remaining chunks
+            pool.shutdown(wait=True, cancel_futures=True)
+    return {"workers": n_workers, "chunks": len(tasks)}
+
+
+def timeseries_metadata(handle: str) -> Dict[str, Any]:
+    """Read the metadata stored with a timeseries result handle."""
+    path = os.path.join(result_dir(), handle, "meta.json")
+    if not handle.startswith("ts_") or os.sep in handle or not os.path.exists(path):
+        raise ValueError(f"Unknown timeseries result handle '{handle}'.")
+    with open(path) as f:
+        return json.load(f)
+
+
+def load_timeseries(handle: str, variable: str, elements: Optional[List[int]] = None,
+                    start: int = 0, stop: Optional[int] = None) -> pd.DataFrame:
+    """Read stored rows of one variable, memory-mapping the array.
+
+    Args:
+        handle: Handle returned by the timeseries tool
+        variable: Variable as 'table.column'
+        elements: Element indices to read (default: all)
+        start: First stored row
+        stop: Row after the last one (default: the end)
+
+    Returns:
+        DataFrame with one row per stored row (labelled by its first time step) and one column per element
+    """
+    meta = timeseries_metadata(handle)
+    if variable not in meta["variables"]:
+        raise ValueError(f"Variable '{variable}' is not stored under '{handle}'. "
+                         f"Available: {', '.join(meta['variables'])}")
+    path = os.path.join(result_dir(), handle)
+    with np.load(os.path.join(path, f"{variable}.aggregates.npz")) as data:
+        index = pd.Index(data["index"])
+    values = np.load(os.path.join(path, f"{variable}.npy"), mmap_mode="r")
+    columns = np.arange(len(index)) if elements is None else index.get_indexer(elements)
+    if (columns < 0).any():
+        raise ValueError(f"Unknown elements {list(np.asarray(elements)[columns < 0][:10])} for '{variable}'.")
+    rows = np.arange(values.shape[0])[start:stop]
+    return pd.DataFrame(values[rows[0]:rows[-1] + 1, columns] if len(rows) else np.empty((0, len(columns))),
+                        index=rows * meta["downsample"], columns=index[columns])
+
+
+def load_timeseries_aggregates(handle: str, variable: str) -> pd.DataFrame:
+    """Per-element aggregates of one variable over all time steps."""
+    meta = timeseries_metadata(handle)
+    if variable not in meta["variables"]:
+        raise ValueError(f"Variable '{variable}' is not stored under '{handle}'. "
+                         f"Available: {', '.join(meta['variables'])}")
+    with np.load(os.path.join(result_dir(), handle, f"{variable}.aggregates.npz")) as data:
+        return pd.DataFrame({aggregate: data[aggregate] for aggregate in meta["aggregates"]},
+                            index=data["index"])
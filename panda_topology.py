@@ -0,0 +1,412 @@
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+import numpy as np
+import pandapower as pp
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import connected_components
+
+logger = logging.getLogger(__name__)
+
+# Bus columns of the element tables that connect to buses; switches also
+# connect to the bus in their element column when their et is 'b'
+BUS_COLUMNS = {
+    'load': ('bus',),
+    'sgen': ('bus',),
+    'gen': ('bus',),
+    'ext_grid': ('bus',),
+    'shunt': ('bus',),
+    'storage': ('bus',),
+    'ward': ('bus',),
+    'xward': ('bus',),
+    'motor': ('bus',),
+    'asymmetric_load': ('bus',),
+    'asymmetric_sgen': ('bus',),
+    'dcline': ('from_bus', 'to_bus'),
+    'line': ('from_bus', 'to_bus'),
+    'impedance': ('from_bus', 'to_bus'),
+    'trafo': ('hv_bus', 'lv_bus'),
+    'trafo3w': ('hv_bus', 'mv_bus', 'lv_bus'),
+    'switch': ('bus',),
+}
+
+# Tables whose elements join their buses into one AC island
+BRANCH_TABLES = ('line', 'impedance', 'trafo', 'trafo3w')
+
+# Elements that feed or draw power at their buses. DC lines link the AC
+# islands at their ends without joining them, so they count as injections.
+INJECTION_TABLES = tuple(table for table in BUS_COLUMNS if table not in BRANCH_TABLES and table != 'switch')
+
+# Tables the graph is built from
+TOPOLOGY_TABLES = ('bus', 'switch', *BRANCH_TABLES, *INJECTION_TABLES)
+
+# Switch element types that disconnect a branch end when open
+_SWITCHED_BRANCHES = {'l': 'line', 't': 'trafo', 't3': 'trafo3w'}
+
+
+def element_name(table: str, index: Any) -> str:
+    """Name of an element in tool output, e.g. line_3."""
+    return f"{table}_{int(index)}"
+
+
+def position_lookup(bus_index: np.ndarray):
+    """Function mapping bus indices to their positions in `bus_index`, -1 for unknown buses."""
+    lookup = np.full(int(bus_index.max()) + 2 if len(bus_index) else 1, -1, dtype=np.int64)
+    lookup[bus_index] = np.arange(len(bus_index))
+
+    def positions(values: np.ndarray) -> np.ndarray:
+        return lookup[np.clip(values, -1, len(lookup) - 1)]
+    return positions
+
+
+def _read_table(net: pp.pandapowerNet, table: str) -> Dict[str, np.ndarray]:
+    """Columns of a table the graph needs, as arrays."""
+    frame = net[table]
+    in_service = frame['in_service'].to_numpy(dtype=bool) if 'in_service' in frame \
+        else np.ones(len(frame), dtype=bool)
+    if table == 'bus':
+        return {'index': frame.index.to_numpy(dtype=np.int64), 'in_service': in_service}
+    if table == 'switch':
+        return {'bus': frame['bus'].to_numpy(dtype=np.int64),
+                'element': frame['element'].to_numpy(dtype=np.int64),
+                'et': frame['et'].to_numpy(dtype=str),
+                'closed': frame['closed'].to_numpy(dtype=bool)}
+    columns = [column for column in BUS_COLUMNS[table] if column in frame]
+    data = {'index': frame.index.to_numpy(dtype=np.int64),
+            'buses': frame[columns].to_numpy(dtype=np.int64).reshape(len(frame), len(columns)),
+            'in_service': in_service}
+    if table == 'ext_grid':
+        data['slack'] = np.ones(len(frame), dtype=bool)
+    elif table == 'gen' and 'slack' in frame:
+        data['slack'] = frame['slack'].fillna(False).to_numpy(dtype=bool)
+    return data
+
+
+class TopologyGraph:
+    """Connectivity of a network as a sparse bus adjacency, cached between edits.
+
+    Every table the graph depends on is read into plain arrays once and kept
+    with its content digest. `update` rereads only the tables whose digest
+    changed, e.g. bus and line after add_bus or add_line, and the analysis is
+    recomputed from the arrays with vectorized CSR graph routines only when
+    some table changed.
+
+    The analysis reports:
+    - islands: buses joined by in-service branches and closed switches, and
+      the slack elements (ext_grids and slack gens) of each island
+    - parallel branch groups: lines, trafos and impedances between the same
+      two nodes, where buses joined by closed bus-bus switches are one node
+    - series chains: branches joined end to end through nodes with no other
+      branch and no element attached, which therefore carry the same flow
+    """
+
+    def __init__(self):
+        self.digests: Dict[str, str] = {}
+        self._tables: Dict[str, Dict[str, np.ndarray]] = {}
+        self._analysis: Optional[Dict[str, Any]] = None
+
+    def update(self, net: pp.pandapowerNet, digests: Dict[str, str]) -> List[str]:
+        """Reread the tables whose digest changed.
+
+        Args:
+            net: Network of the graph
+            digests: Current digests of the tables in TOPOLOGY_TABLES present in the network
+
+        Returns:
+            Tables that changed since the last update
+        """
+        changed = sorted(table for table in set(digests) | set(self.digests)
+                         if digests.get(table) != self.digests.get(table))
+        for table in changed:
+            if table in digests:
+                self._tables[table] = _read_table(net, table)
+            else:
+                self._tables.pop(table, None)
+        self.digests = dict(digests)
+        if changed:
+            self._analysis = None
+        return changed
+
+    def analysis(self) -> Dict[str, Any]:
+        """Islands, parallel branch groups and series chains of the network."""
+        if self._analysis is None:
+            self._analysis = self._analyze()
+        return self._analysis
+
+    def _edges(self, positions) -> Tuple[np.ndarray, ...]:
+        """In-service branch and closed switch edges as bus positions, with their element."""
+        opened = {}
+        switch = self._tables.get('switch')
+        if switch is not None:
+            for et, table in _SWITCHED_BRANCHES.items():
+                mask = (switch['et'] == et) & ~switch['closed']
+                opened[table] = (switch['element'][mask], switch['bus'][mask])
+
+        u, v, tables, elements = [], [], [], []
+        for code, table in enumerate(BRANCH_TABLES):
+            data = self._tables.get(table)
+            if data is None or not len(data['index']):
+                continue
+            ends = data['buses']
+            pairs = [(0, 1)] if ends.shape[1] == 2 else [(0, 1), (0, 2), (1, 2)]
+            open_elements, open_buses = opened.get(table, (np.zeros(0, np.int64), np.zeros(0, np.int64)))
+            for a, b in pairs:
+                keep = data['in_service'].copy()
+                if len(open_elements):
+                    if ends.shape[1] == 2:
+                        keep &= ~np.isin(data['index'], open_elements)
+                    else:
+                        # An open switch cuts one winding of a three-winding trafo
+                        cut = set(zip(open_elements.tolist(), open_buses.tolist()))
+                        keep &= [(element, end_a) not in cut and (element, end_b) not in cut
+                                 for element, end_a, end_b in zip(data['index'], ends[:, a], ends[:, b])]
+                u.append(positions(ends[keep, a]))
+                v.append(positions(ends[keep, b]))
+                tables.append(np.full(int(keep.sum()), code))
+                elements.append(data['index'][keep])
+        if switch is not None:
+            keep = (switch['et'] == 'b') & switch['closed']
+            u.append(positions(switch['bus'][keep]))
+            v.append(positions(switch['element'][keep]))
+            tables.append(np.full(int(keep.sum()), -1))
+            elements.append(np.full(int(keep.sum()), -1))
+        if not u:
+            return tuple(np.zeros(0, dtype=np.int64) for _ in range(4))
+        return tuple(np.concatenate(parts).astype(np.int64) for parts in (u, v, tables, elements))
+
+    def _analyze(self) -> Dict[str, Any]:
+        bus = self._tables.get('bus', {'index': np.zeros(0, dtype=np.int64), 'in_service': np.zeros(0, dtype=bool)})
+        bus_index, n = bus['index'], len(bus['index'])
+        positions = position_lookup(bus_index)
+
+        u, v, tables, elements = self._edges(positions)
+        active = bus['in_service']
+        live = (u >= 0) & (v >= 0)
+        live[live] &= active[u[live]] & active[v[live]]
+        u, v, tables, elements = u[live], v[live], tables[live], elements[live]
+
+        # Islands of the in-service buses
+        adjacency = csr_matrix((np.ones(len(u), dtype=np.int8), (u, v)), shape=(n, n))
+        _, labels = connected_components(adjacency, directed=False)
+        island = np.full(n, -1, dtype=np.int64)
+        island[active] = np.unique(labels[active], return_inverse=True)[1]
+        n_islands = int(island.max()) + 1 if active.any() else 0
+
+        # Elements attached to in-service buses
+        attached = {}
+        slack: List[List[str]] = [[] for _ in range(n_islands)]
+        for table in INJECTION_TABLES:
+            data = self._tables.get(table)
+            if data is None or not len(data['index']):
+                continue
+            # Elements with several buses, DC lines, are attached to each of them
+            pos = positions(data['buses'].ravel())
+            index = np.repeat(data['index'], data['buses'].shape[1])
+            keep = np.repeat(data['in_service'], data['buses'].shape[1]) & (pos >= 0)
+            keep[keep] &= active[pos[keep]]
+            attached[table] = (index[keep], pos[keep])
+            if 'slack' in data:
+                for element, position in zip(index[keep & data['slack']], pos[keep & data['slack']]):
+                    slack[island[position]].append(element_name(table, element))
+
+        order = np.argsort(island[active], kind='stable')
+        members = np.split(bus_index[active][order], np.cumsum(np.bincount(island[active], minlength=n_islands))[:-1]) \
+            if n_islands else []
+        islands = [{"island": i, "n_buses": len(members[i]), "supplied": bool(slack[i]), "slack": slack[i],
+                    "buses": members[i].tolist()} for i in range(n_islands)]
+        islands.sort(key=lambda item: -item["n_buses"])
+        unsupplied = np.zeros(n_islands + 1, dtype=bool)
+        unsupplied[[item["island"] for item in islands if not item["supplied"]]] = True
+        unsupplied_elements = [element_name(table, index) for table, (indices, pos) in attached.items()
+                               for index in dict.fromkeys(indices[unsupplied[island[pos]]].tolist())]
+        unsupplied_elements += [element_name(BRANCH_TABLES[code], element)
+                                for code, element in sorted(set(zip(tables[(tables >= 0) & unsupplied[island[u]]],
+                                                                    elements[(tables >= 0) & unsupplied[island[u]]])))]
+
+        # Nodes: buses joined by closed bus-bus switches
+        switched = tables < 0
+        _, node = connected_components(csr_matrix((np.ones(int(switched.sum()), dtype=np.int8),
+                                                   (u[switched], v[switched])), shape=(n, n)), directed=False)
+        n_nodes = int(node.max()) + 1 if n else 0
+        node_bus = np.zeros(n_nodes, dtype=np.int64)
+        node_bus[node[::-1]] = bus_index[::-1]
+
+        # Two-terminal branches between different nodes
+        two_terminal = (tables >= 0) & (tables != BRANCH_TABLES.index('trafo3w'))
+        a, b = node[u[two_terminal]], node[v[two_terminal]]
+        distinct = a != b
+        a, b = a[distinct], b[distinct]
+        codes, ids = tables[two_terminal][distinct].tolist(), elements[two_terminal][distinct].tolist()
+
+        def branch_names(edges: List[int]) -> List[str]:
+            return [f"{BRANCH_TABLES[codes[edge]]}_{ids[edge]}" for edge in edges]
+
+        low, high = np.minimum(a, b), np.maximum(a, b)
+        keys, group, counts = np.unique(low * n_nodes + high, return_inverse=True, return_counts=True)
+        by_group = np.argsort(group, kind='stable')
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]]).astype(np.int64)
+        parallel = np.flatnonzero(counts > 1)
+        by_group = by_group.tolist()
+        parallel_groups = [{"buses": [low_bus, high_bus],
+                            "branches": branch_names(by_group[start:start + count])}
+                           for low_bus, high_bus, start, count in zip(node_bus[keys[parallel] // n_nodes].tolist(),
+                                                                      node_bus[keys[parallel] % n_nodes].tolist(),
+                                                                      starts[parallel].tolist(), counts[parallel].tolist())]
+
+        # Series nodes: two branch ends to two different nodes and nothing attached
+        incidence_node = np.concatenate([a, b])
+        incidence_edge = np.tile(np.arange(len(a)), 2)
+        incidence_other = np.concatenate([b, a])
+        degree = np.bincount(incidence_node, minlength=n_nodes)
+        three_winding = tables == BRANCH_TABLES.index('trafo3w')
+        degree += np.bincount(node[np.concatenate([u[three_winding], v[three_winding]])], minlength=n_nodes)
+        load = np.zeros(n_nodes, dtype=np.int64)
+        for _, pos in attached.values():
+            load += np.bincount(node[pos], minlength=n_nodes)
+        by_node = np.argsort(incidence_node, kind='stable')
+        first = np.searchsorted(incidence_node[by_node], np.arange(n_nodes))
+        series = (degree == 2) & (load == 0) & (np.bincount(incidence_node, minlength=n_nodes) == 2)
+        series_nodes = np.flatnonzero(series)
+        edge_a = incidence_edge[by_node][first[series_nodes]]
+        edge_b = incidence_edge[by_node][first[series_nodes] + 1]
+        differ = incidence_other[by_node][first[series_nodes]] != incidence_other[by_node][first[series_nodes] + 1]
+        series[series_nodes[~differ]] = False
+        edge_a, edge_b = edge_a[differ], edge_b[differ]
+
+        # Chains: branches joined through series nodes
+        chain_graph = csr_matrix((np.ones(len(edge_a), dtype=np.int8), (edge_a, edge_b)), shape=(len(a), len(a)))
+        _, chain = connected_components(chain_graph, directed=False)
+        chain_sizes = np.bincount(chain, minlength=1) if len(a) else np.zeros(0, dtype=np.int64)
+        by_chain = np.argsort(chain, kind='stable').tolist()
+        chain_starts = np.concatenate([[0], np.cumsum(chain_sizes)[:-1]]).astype(np.int64)
+        ends_a, ends_b, is_series = a.tolist(), b.tolist(), series.tolist()
+        series_chains = []
+        for start, size in zip(chain_starts[chain_sizes > 1].tolist(), chain_sizes[chain_sizes > 1].tolist()):
+            edges = by_chain[start:start + size]
+            incident: Dict[int, List[int]] = {}
+            for edge in edges:
+                incident.setdefault(ends_a[edge], []).append(edge)
+                incident.setdefault(ends_b[edge], []).append(edge)
+            # Walk from an end of the chain; a ring of series nodes has none
+            current = next((x for x in incident if not is_series[x]), ends_a[edges[0]])
+            path, branches, visited = [current], [], set()
+            while True:
+                edge = next((edge for edge in incident[current] if edge not in visited), None)
+                if edge is None:
+                    break
+                visited.add(edge)
+                branches.append(edge)
+                current = ends_b[edge] if ends_a[edge] == current else ends_a[edge]
+                path.append(current)
+            series_chains.append({"buses": node_bus[path].tolist(), "branches": branch_names(branches)})
+
+        return {
+            "buses": n,
+            "out_of_service_buses": int((~active).sum()),
+            "islands": islands,
+            "unsupplied_elements": unsupplied_elements,
+            "parallel_groups": parallel_groups,
+            "series_chains": series_chains,
+        }
+
+    def report(self, limit: int = 100) -> Dict[str, Any]:
+        """Analysis with every list cut to `limit` items and the full counts alongside."""
+        analysis = self.analysis()
+        islands = [{**item, "buses": item["buses"][:limit], "truncated": item["n_buses"] > limit}
+                   for item in analysis["islands"][:limit]]
+        return {
+            "buses": analysis["buses"],
+            "out_of_service_buses": analysis["out_of_service_buses"],
+            "n_islands": len(analysis["islands"]),
+            "n_unsupplied_islands": sum(not item["supplied"] for item in analysis["islands"]),
+            "islands": islands,
+            "n_unsupplied_elements": len(analysis["unsupplied_elements"]),
+            "unsupplied_elements": analysis["unsupplied_elements"][:limit],
+            "n_parallel_groups": len(analysis["parallel_groups"]),
+            "parallel_groups": analysis["parallel_groups"][:limit],
+            "n_series_chains": len(analysis["series_chains"]),
+            "series_chains": analysis["series_chains"][:limit],
+        }
+
+
+class BusIncidence:
+    """Index from every bus to the elements attached to it, by element table.
+
+    The attachments of all tables are kept sorted by bus in one CSR layout:
+    the elements at the bus in position i of the bus table are
+    `elements[indptr[i]:indptr[i + 1]]`, and `tables` holds the position in
+    BUS_COLUMNS of the table of each. `update` rereads only the tables an edit
+    changed and rebuilds the layout with one sort, so that the index can be
+    kept current after every edit of the network.
+
+    Switches between two buses are attached to both.
+    """
+
+    def __init__(self):
+        self._attachments: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self.bus_index = np.zeros(0, dtype=np.int64)
+        self.indptr = np.zeros(1, dtype=np.int64)
+        self.tables = np.zeros(0, dtype=np.int64)
+        self.elements = np.zeros(0, dtype=np.int64)
+
+    def update(self, net: pp.pandapowerNet, tables: Optional[List[str]] = None) -> None:
+        """Reread the attachments of changed tables and rebuild the index.
+
+        Args:
+            net: Network of the index
+            tables: Tables that changed (default: any table may have changed)
+        """
+        for table in BUS_COLUMNS if tables is None else [table for table in tables if table in BUS_COLUMNS]:
+            if table not in net or not len(net[table]):
+                self._attachments.pop(table, None)
+                continue
+            frame = net[table]
+            columns = [column for column in BUS_COLUMNS[table] if column in frame]
+            index = frame.index.to_numpy(dtype=np.int64)
+            buses = [frame[columns].to_numpy(dtype=np.int64).ravel()]
+            elements = [np.repeat(index, len(columns))]
+            if table == 'switch':
+                bus_bus = frame['et'].to_numpy() == 'b'
+                buses.append(frame['element'].to_numpy(dtype=np.int64)[bus_bus])
+                elements.append(index[bus_bus])
+            self._attachments[table] = (np.concatenate(buses), np.concatenate(elements))
+
+        self.bus_index = net.bus.index.to_numpy(dtype=np.int64)
+        codes = {table: code for code, table in enumerate(BUS_COLUMNS)}
+        empty = np.zeros(0, dtype=np.int64)
+        positions = position_lookup(self.bus_index)(
+            np.concatenate([empty, *(buses for buses, _ in self._attachments.values())]))
+        tables = np.concatenate([empty, *(np.full(len(elements), codes[table])
+                                          for table, (_, elements) in self._attachments.items())])
+        elements = np.concatenate([empty, *(elements for _, elements in self._attachments.values())])
+        known = positions >= 0
+        positions, tables, elements = positions[known], tables[known], elements[known]
+        order = np.lexsort((elements, tables, positions))
+        self.tables, self.elements = tables[order], elements[order]
+        self.indptr = np.concatenate([[0], np.cumsum(np.bincount(positions, minlength=len(self.bus_index)))])
+
+    def counts(self) -> np.ndarray:
+        """Number of attached elements of every bus (rows) and table (columns of BUS_COLUMNS)."""
+        n_tables = len(BUS_COLUMNS)
+        bus_positions = np.repeat(np.arange(len(self.bus_index)), np.diff(self.indptr))
+        return np.bincount(bus_positions * n_tables + self.tables,
+                           minlength=len(self.bus_index) * n_tables).reshape(len(self.bus_index), n_tables)
+
+    def attached(self, buses: List[int]) -> List[Dict[str, List[int]]]:
+        """Elements attached to each of the buses, as {table: [element indices]}.
+
+        Raises:
+            ValueError: If a bus does not exist
+        """
+        positions = position_lookup(self.bus_index)(np.asarray(buses, dtype=np.int64))
+        if (positions < 0).any():
+            missing = np.asarray(buses)[positions < 0]
+            raise ValueError(f"Unknown buses {missing[:10].tolist()}.")
+        names = list(BUS_COLUMNS)
+        attached = []
+        for position in positions.tolist():
+            start, stop = self.indptr[position], self.indptr[position + 1]
+            elements: Dict[str, List[int]] = {}
+            for code, element in zip(self.tables[start:stop].tolist(), self.elements[start:stop].tolist()):
+                elements.setdefault(names[code], []).append(element)
+            attached.append(elements)
+        return attached
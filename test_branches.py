@@ -0,0 +1,71 @@
+import threading
+
+import pandas as pd
+import pandapower as pp
+from pandapower.networks import example_multivoltage
+from pandapower.networks.power_system_test_cases import case9, case14
+
+import panda_mcp
+
+
+def test_branch_changes_stay_out_of_the_network():
+    panda_mcp._put_network(case9(), "branch_parent")
+    assert panda_mcp.fork_network.sync("loads_up", network="branch_parent")["status"] == "success"
+    result = panda_mcp.edit_branch.sync("loads_up", scale={"load": 1.1})
+    assert result["changed_cells"] == 6
+    net = panda_mcp._networks.get("branch_parent")
+    assert panda_mcp._get_branch("loads_up").materialize(net).load.p_mw.equals(net.load.p_mw * 1.1)
+    assert net.load.p_mw.equals(case9().load.p_mw)
+
+
+def test_solving_a_branch_leaves_the_parent_intact(monkeypatch, tmp_path):
+    monkeypatch.setenv("POWER_MCP_RESULT_DIR", str(tmp_path))
+    net = example_multivoltage()
+    # runpp adds a generator at each end of a DC line while it solves
+    pp.create_dcline(net, 20, 25, p_mw=1., loss_percent=1., loss_mw=0.01, vm_from_pu=1., vm_to_pu=1.)
+    pp.runpp(net)
+    tables = {key: value.copy() for key, value in net.items() if isinstance(value, pd.DataFrame)}
+    panda_mcp._put_network(net, "dcline_parent")
+    panda_mcp.fork_network.sync("dcline_branch", network="dcline_parent")
+    panda_mcp.edit_branch.sync("dcline_branch", scale={"load": 1.05})
+
+    assert panda_mcp.solve_branch.sync("dcline_branch")["status"] == "success"
+    for key, value in tables.items():
+        assert net[key].equals(value), key
+
+
+def test_branches_are_dropped_with_their_network():
+    panda_mcp._put_network(case9(), "replaced")
+    panda_mcp._put_network(case9(), "removed")
+    panda_mcp.fork_network.sync("of_replaced", network="replaced")
+    panda_mcp.fork_network.sync("of_removed", network="removed")
+
+    panda_mcp._put_network(case14(), "replaced")
+    assert panda_mcp.remove_network.sync("removed")["status"] == "success"
+    names = [entry["branch"] for entry in panda_mcp.list_branches()["branches"]]
+    assert "of_replaced" not in names and "of_removed" not in names
+    assert panda_mcp.edit_branch.sync("of_replaced", outages=[["line", 0]])["status"] == "error"
+
+
+def test_cross_materialization_does_not_deadlock():
+    panda_mcp._put_network(case9(), "left")
+    panda_mcp._put_network(case9(), "right")
+    errors = []
+
+    def materialize(source, target):
+        for i in range(20):
+            branch = f"{source}_to_{target}_{i}"
+            panda_mcp.fork_network.sync(branch, network=source)
+            result = panda_mcp.materialize_branch.sync(branch, target)
+            if result["status"] != "success":
+                errors.append(result)
+
+    threads = [threading.Thread(target=materialize, args=pair) for pair in (("left", "right"), ("right", "left"))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=60)
+    assert not any(thread.is_alive() for thread in threads)
+    # A branch of a network replaced meanwhile is gone, everything else materialized
+    assert all("No branch named" in error["message"] for error in errors)
+    pp.runpp(panda_mcp._networks.get("left"))
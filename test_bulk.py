@@ -0,0 +1,45 @@
+import pandapower as pp
+from pandapower.networks.power_system_test_cases import case9
+
+from panda_bulk import add_elements, validate_rows
+import panda_mcp
+
+
+def test_invalid_rows_are_reported_per_row_and_nothing_is_created():
+    net = case9()
+    n_lines = len(net.line)
+    lines = [
+        {"from_bus": 0, "to_bus": 3, "length_km": 2., "std_type": "NAYY 4x150 SE"},
+        {"from_bus": 0, "to_bus": 99, "length_km": -1., "std_type": "NAYY 4x150 SE"},
+        {"from_bus": 4, "to_bus": 4, "length_km": 1., "std_type": "no such type"},
+        {"to_bus": 5, "length_km": "long", "std_type": "NAYY 4x150 SE"},
+    ]
+    _, errors = validate_rows(net, "line", lines)
+    assert [error["row"] for error in errors] == [1, 2, 3]
+    assert any("99" in message for message in errors[0]["errors"])
+    assert any("positive" in message for message in errors[0]["errors"])
+    assert any("std_type" in message for message in errors[1]["errors"])
+    assert any("must differ" in message for message in errors[1]["errors"])
+    assert any("'from_bus' is required" in message for message in errors[2]["errors"])
+    assert any("'length_km' must be a number" in message for message in errors[2]["errors"])
+
+    indices, errors = add_elements(net, "line", lines)
+    assert indices == [] and len(errors) == 3
+    assert len(net.line) == n_lines
+
+
+def test_bulk_creation_matches_single_creation():
+    net, expected = case9(), case9()
+    loads = {"bus": [4, 6, 8], "p_mw": [10., 20., 30.], "q_mvar": [1., 2., 3.], "name": ["a", "b", "c"]}
+    panda_mcp._networks.put(net, "bulk")
+    result = panda_mcp.add_loads.sync(loads, network="bulk")
+    assert result["status"] == "success"
+    for bus, p_mw, q_mvar, name in zip(*loads.values()):
+        pp.create_load(expected, bus, p_mw, q_mvar=q_mvar, name=name)
+    assert result["load_indices"] == expected.load.index[-3:].tolist()
+    columns = ["bus", "p_mw", "q_mvar", "name", "in_service", "scaling"]
+    assert net.load[columns].equals(expected.load[columns])
+
+    result = panda_mcp.add_loads.sync({"bus": [4, 404], "p_mw": [1., 1.]}, network="bulk")
+    assert result["status"] == "error"
+    assert [error["row"] for error in result["row_errors"]] == [1]
@@ -0,0 +1,46 @@
+import os
+import stat
+
+import pandapower as pp
+import pytest
+from pandapower.networks.power_system_test_cases import case9
+
+from panda_cache import ParsedNetworkCache, cache_root, private_dir
+
+
+def test_cache_root_is_per_user(monkeypatch, tmp_path):
+    monkeypatch.delenv("POWER_MCP_CACHE_DIR", raising=False)
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    assert cache_root() == str(tmp_path / "power_mcp")
+    monkeypatch.setenv("POWER_MCP_CACHE_DIR", str(tmp_path / "elsewhere"))
+    assert cache_root() == str(tmp_path / "elsewhere")
+
+
+@pytest.mark.skipif(os.name != "posix", reason="permission bits are POSIX only")
+def test_private_dir_rejects_directories_others_can_access(tmp_path):
+    path = private_dir(str(tmp_path / "cache"))
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o700
+    os.chmod(path, 0o777)
+    with pytest.raises(RuntimeError, match="accessible to other users"):
+        private_dir(path)
+
+
+def test_parsed_network_cache_serves_memory_then_disk(tmp_path):
+    path = str(tmp_path / "case9.json")
+    pp.to_json(case9(), path)
+    cache_dir = str(tmp_path / "cache")
+    cache = ParsedNetworkCache(memory_budget=1 << 30, cache_dir=cache_dir)
+    assert cache.load(path, pp.from_json)[1] == "parsed"
+    net, source = cache.load(path, pp.from_json)
+    assert source == "memory" and len(net.bus) == 9
+    assert ParsedNetworkCache(memory_budget=1 << 30, cache_dir=cache_dir).load(path, pp.from_json)[1] == "disk"
+
+    os.chmod(cache_dir, 0o755)
+    with pytest.raises(RuntimeError):
+        ParsedNetworkCache(memory_budget=1 << 30, cache_dir=cache_dir).load(path, pp.from_json)
+
+
+@pytest.mark.skipif(os.name != "posix", reason="permission bits are POSIX only")
+def test_private_dir_creates_missing_parents_private(tmp_path):
+    private_dir(str(tmp_path / "root" / "spill" / "123"))
+    assert private_dir(str(tmp_path / "root")) == str(tmp_path / "root")
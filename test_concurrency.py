@@ -0,0 +1,94 @@
+import asyncio
+import json
+import threading
+import time
+
+import pytest
+from mcp.shared.memory import create_connected_server_and_client_session
+from pandapower.networks.power_system_test_cases import case9, case118
+
+import panda_mcp
+
+
+@pytest.fixture(autouse=True)
+def result_dir(monkeypatch, tmp_path):
+    """Keep the results stored by the tools out of the repository."""
+    monkeypatch.setenv("POWER_MCP_RESULT_DIR", str(tmp_path / "results"))
+
+
+async def _timed(client, tool, arguments=None):
+    """Call a tool and return its latency in seconds and its decoded result."""
+    start = time.perf_counter()
+    if tool == "list_tools":
+        result = await client.list_tools()
+        return time.perf_counter() - start, result
+    result = await client.call_tool(tool, arguments or {})
+    return time.perf_counter() - start, json.loads(result.content[0].text)
+
+
+async def _quick_and_heavy_calls(tmp_path):
+    """Latencies of quick calls made while two contingency analyses run, and the heavy results."""
+    async with create_connected_server_and_client_session(panda_mcp.mcp._mcp_server) as client:
+        heavy = [asyncio.create_task(_timed(client, "run_contingency_analysis", {
+            "save_file": str(tmp_path / f"n1_{i}.json"),
+            "network": "heavy"})) for i in range(2)]
+        await asyncio.sleep(0.2)
+
+        quick = []
+        while not all(task.done() for task in heavy):
+            for tool, arguments in (("list_tools", None),
+                                    ("list_networks", None),
+                                    ("run_power_flow", {"network": "light"})):
+                latency, result = await _timed(client, tool, arguments)
+                if tool != "list_tools":
+                    assert result["status"] == "success"
+                quick.append(latency)
+                await asyncio.sleep(0.05)
+        return quick, await asyncio.gather(*heavy)
+
+
+def test_quick_calls_are_not_blocked_by_heavy_calls(tmp_path):
+    """Quick tool calls keep answering while contingency analyses run on another network."""
+    panda_mcp._networks.put(case118(), "heavy")
+    panda_mcp._networks.put(case9(), "light")
+
+    quick, heavy_results = asyncio.run(_quick_and_heavy_calls(tmp_path))
+
+    heavy_latencies = [latency for latency, _ in heavy_results]
+    assert all(result["status"] == "success" for _, result in heavy_results)
+    assert len(quick) >= 3
+    # Quick calls are served while the heavy calls run instead of queueing behind them
+    assert max(quick) < min(heavy_latencies) / 2
+
+
+async def _concurrent_add_buses():
+    async with create_connected_server_and_client_session(panda_mcp.mcp._mcp_server) as client:
+        return await asyncio.gather(*[_timed(client, "add_buses", {
+            "buses": {"vn_kv": [20.0] * 50, "name": [f"b{i}_{j}" for j in range(50)]},
+            "network": "shared"}) for i in range(8)])
+
+
+def test_calls_on_one_network_are_serialised():
+    """Concurrent mutations of one network do not interleave."""
+    panda_mcp.create_empty_network.sync(network="shared")
+    results = asyncio.run(_concurrent_add_buses())
+
+    indices = [index for _, result in results for index in result["bus_indices"]]
+    assert len(indices) == len(set(indices)) == 400
+    assert len(panda_mcp._get_network("shared").bus) == 400
+
+
+def test_calls_run_on_the_network_they_locked():
+    """A call on the current network stays on it when the current network changes while it waits."""
+    panda_mcp.create_empty_network.sync(network="first")
+    result = {}
+    with panda_mcp._networks.lock("first"):
+        call = threading.Thread(target=lambda: result.update(panda_mcp.add_buses.sync({"vn_kv": [20.0]})))
+        call.start()
+        time.sleep(0.2)
+        panda_mcp.create_empty_network.sync(network="second")
+    call.join(timeout=10)
+
+    assert result["status"] == "success"
+    assert len(panda_mcp._get_network("first").bus) == 1
+    assert len(panda_mcp._get_network("second").bus) == 0
@@ -0,0 +1,87 @@
+import pandapower as pp
+from pandapower.networks.power_system_test_cases import case14
+
+from panda_contingency import (JsonlResultWriter, contingency_name, contingency_outages, copy_savings, double_outages,
+                               iter_outages_parallel, iter_outages_serial, read_jsonl_results, resume_jsonl_results)
+import panda_mcp
+
+
+def test_parallel_outages_match_serial():
+    net = case14()
+    pp.runpp(net)
+    outages = contingency_outages(net, ["line", "trafo"])
+    serial = list(iter_outages_serial(net, outages))
+    assert list(iter_outages_parallel(net, outages, n_workers=2)) == serial
+    assert list(iter_outages_parallel(net, outages, n_workers=2, mode="inplace")) == \
+        list(iter_outages_serial(net, outages, mode="inplace"))
+
+
+def test_inplace_mode_restores_the_network():
+    net = case14()
+    pp.runpp(net)
+    in_service = net.line.in_service.copy()
+    outages = contingency_outages(net, ["line"])
+    results = list(iter_outages_serial(net, outages, mode="inplace"))
+    assert [r["contingency"] for r in results] == [f"line_{i}" for i in net.line.index]
+    assert net.line.in_service.equals(in_service)
+
+
+def test_resume_drops_a_torn_line(tmp_path):
+    net = case14()
+    outages = contingency_outages(net, ["line"])
+    path = str(tmp_path / "n1.jsonl")
+    with JsonlResultWriter(path) as writer:
+        for outage in outages[:3]:
+            writer.write({"contingency": f"line_{outage[0][1]}", "converged": True})
+    with open(path, "a") as f:
+        f.write('{"contingency": "line_')
+    assert resume_jsonl_results(path, outages) == 3
+    assert len(list(read_jsonl_results(path))) == 3
+
+
+def test_inplace_mode_matches_copy_mode():
+    net = case14()
+    pp.runpp(net)
+    outages = contingency_outages(net, ["line", "trafo"])
+    copy_results = list(iter_outages_serial(net, outages))
+    inplace_results = list(iter_outages_serial(net, outages, mode="inplace"))
+    assert [(r["contingency"], r["converged"], r.get("violations")) for r in inplace_results] == \
+        [(r["contingency"], r["converged"], r.get("violations")) for r in copy_results]
+
+
+def test_copy_savings_report_time_and_memory():
+    net = case14()
+    savings = copy_savings(net, 20, 0.5)
+    assert savings["elapsed_s"] == 0.5
+    assert savings["deepcopy_time_saved_s"] > 0
+    assert savings["deepcopy_bytes_avoided"] == 20 * savings["peak_bytes_avoided"] > 0
+
+
+def test_double_outage_screening_only_drops_pairs():
+    net = case14()
+    pp.runpp(net)
+    everything, counts = double_outages(net, ["line", "trafo"], screen_threshold=0.)
+    n = len(net.line) + len(net.trafo)
+    assert counts["pairs"] == n * (n - 1) // 2 == len(everything)
+
+    screened, counts = double_outages(net, ["line", "trafo"], screen_threshold=90.)
+    assert counts["solved"] == len(screened) <= len(everything)
+    assert counts["flagged"] == len(screened) - (counts["pairs"] - counts["screened"])
+    assert set(screened) <= set(everything)
+    assert all(contingency_name(pair).count("+") == 1 for pair in screened)
+
+
+def test_jsonl_run_resumes_after_an_interruption(tmp_path):
+    panda_mcp._networks.put(case14(), "jsonl")
+    full, partial = str(tmp_path / "full.jsonl"), str(tmp_path / "partial.jsonl")
+    result = panda_mcp.run_contingency_analysis.sync(full, output_format="jsonl", flush_every=5, network="jsonl")
+    assert result["contingencies"]["solved"] == result["contingencies"]["total"]
+    with open(full) as f:
+        lines = f.readlines()
+    with open(partial, "w") as f:
+        f.writelines(lines[:7])
+        f.write(lines[7][:10])
+
+    result = panda_mcp.run_contingency_analysis.sync(partial, output_format="jsonl", resume=True, network="jsonl")
+    assert result["contingencies"]["resumed_from"] == 7
+    assert list(read_jsonl_results(partial)) == list(read_jsonl_results(full))
@@ -0,0 +1,41 @@
+import os
+
+import pandapower as pp
+from pandapower.networks.power_system_test_cases import case9, case14
+
+from panda_format import load_bundle, save_bundle
+
+
+def test_bundle_round_trip(tmp_path):
+    net = case14()
+    path = str(tmp_path / "case14.ppnet")
+    save_bundle(net, path)
+    for lazy in (True, False):
+        loaded = load_bundle(path, lazy=lazy)
+        for key, value in net.items():
+            if hasattr(value, "columns") and len(value):
+                assert loaded[key].equals(value), key
+    pp.runpp(load_bundle(path))
+
+
+def test_overwriting_a_bundle_keeps_lazy_networks_intact(tmp_path):
+    path = str(tmp_path / "net.ppnet")
+    original = case14()
+    save_bundle(original, path)
+    lazy = load_bundle(path)
+    assert len(lazy.bus) == 14
+    assert "line" not in lazy.loaded_tables()
+
+    save_bundle(case9(), path)
+    assert lazy.line.equals(original.line)
+    assert len(load_bundle(path).line) == len(case9().line)
+    assert os.listdir(tmp_path) == ["net.ppnet"]
+
+
+def test_saving_a_lazy_network_over_its_own_bundle(tmp_path):
+    path = str(tmp_path / "net.ppnet")
+    save_bundle(case14(), path)
+    lazy = load_bundle(path)
+    lazy.load.loc[:, "p_mw"] *= 2
+    save_bundle(lazy, path)
+    assert load_bundle(path).load.p_mw.equals(case14().load.p_mw * 2)
@@ -0,0 +1,84 @@
+import multiprocessing
+import threading
+import time
+
+import pandapower as pp
+from pandapower.networks.power_system_test_cases import case9, case118
+
+from panda_contingency import contingency_outages, iter_outages_parallel
+from panda_jobs import CANCELLED, FAILED, RUNNING, SUCCEEDED, JobManager, report_progress, track_progress
+import panda_mcp
+
+
+def _count(n, release=None, started=None):
+    total = 0
+    for i in track_progress(range(n), n, "counting"):
+        if started is not None:
+            started.set()
+        if release is not None:
+            release.wait(5)
+        total += i
+    return total
+
+
+def test_jobs_report_progress_and_can_be_cancelled():
+    manager = JobManager(max_workers=1)
+    release = threading.Event()
+    running = manager.submit("count", _count, {"n": 10, "release": release})
+    queued = manager.submit("count", _count, {"n": 3})
+    assert manager.cancel(queued.job_id).status == CANCELLED
+
+    release.set()
+    assert manager.wait(running.job_id, timeout=5).status == SUCCEEDED
+    assert running.result == 45 and running.progress == 100.
+    assert queued.result is None
+
+    blocked, started = threading.Event(), threading.Event()
+    stopped = manager.submit("count", _count, {"n": 10, "release": blocked, "started": started})
+    assert started.wait(5)
+    manager.cancel(stopped.job_id)
+    blocked.set()
+    assert manager.wait(stopped.job_id, timeout=5).status == CANCELLED
+
+    failed = manager.submit("fail", lambda: 1 / 0, {})
+    assert manager.wait(failed.job_id, timeout=5).status == FAILED
+    assert "division" in failed.error
+    # Outside of a job progress reports are ignored
+    report_progress(1, 2)
+
+
+def test_power_flow_job_returns_the_tool_result(monkeypatch, tmp_path):
+    monkeypatch.setenv("POWER_MCP_RESULT_DIR", str(tmp_path))
+    panda_mcp._networks.put(case9(), "job")
+    job = panda_mcp.submit_job("power_flow", {"network": "job"})["job"]
+    panda_mcp._jobs.wait(job["job_id"], timeout=30)
+    result = panda_mcp.job_result(job["job_id"])
+    assert result["status"] == "success"
+    direct = panda_mcp.run_power_flow.sync(network="job")
+    assert direct["cache"]["hit"]
+    assert result["result"]["result_handle"] == direct["result_handle"]
+    assert panda_mcp.job_result("job_missing")["status"] == "error"
+
+
+def test_cancelled_jobs_stop_their_workers(monkeypatch):
+    # Spawned workers are children of this process, forkserver ones are not
+    monkeypatch.setenv("POWER_MCP_START_METHOD", "spawn")
+    net = case118()
+    pp.runpp(net)
+    outages = contingency_outages(net, ["line", "trafo"]) * 10
+
+    def analysis():
+        return sum(1 for _ in track_progress(iter_outages_parallel(net, outages, n_workers=2, chunk_size=5),
+                                             len(outages)))
+
+    manager = JobManager(max_workers=1)
+    job = manager.submit("contingencies", analysis, {})
+    manager.wait(job.job_id, timeout=60, since=0.)
+    assert job.status == RUNNING
+    manager.cancel(job.job_id)
+    assert manager.wait(job.job_id, timeout=30).status == CANCELLED
+
+    deadline = time.monotonic() + 5
+    while multiprocessing.active_children() and time.monotonic() < deadline:
+        time.sleep(0.1)
+    assert not multiprocessing.active_children()
@@ -0,0 +1,72 @@
+import copy
+
+import numpy as np
+import pandapower as pp
+from pandapower.networks.power_system_test_cases import case14
+
+from panda_results import prune_results
+import panda_mcp
+
+
+def test_power_flow_cache_misses_after_a_change(monkeypatch, tmp_path):
+    monkeypatch.setenv("POWER_MCP_RESULT_DIR", str(tmp_path))
+    panda_mcp._networks.put(case14(), "memo")
+    first = panda_mcp.run_power_flow.sync(network="memo")
+    again = panda_mcp.run_power_flow.sync(network="memo")
+    assert not first["cache"]["hit"] and again["cache"]["hit"]
+    assert again["result_handle"] == first["result_handle"]
+
+    panda_mcp.add_loads.sync({"bus": [4], "p_mw": [5.]}, network="memo")
+    added = panda_mcp.run_power_flow.sync(network="memo")
+    assert not added["cache"]["hit"]
+    assert added["cache"]["fingerprint"] != first["cache"]["fingerprint"]
+    assert len(panda_mcp._get_network("memo").res_load) == len(case14().load) + 1
+
+    # Edits made outside of the tools count once they are reported
+    net = panda_mcp._get_network("memo")
+    net.load.loc[:, "p_mw"] *= 1.1
+    panda_mcp._invalidate_network_caches("memo", tables=["load"])
+    scaled = panda_mcp.run_power_flow.sync(network="memo")
+    assert not scaled["cache"]["hit"]
+    expected = copy.deepcopy(net)
+    pp.runpp(expected)
+    assert np.allclose(net.res_bus.vm_pu, expected.res_bus.vm_pu)
+
+
+def test_recycled_solves_match_full_solves(monkeypatch, tmp_path):
+    monkeypatch.setenv("POWER_MCP_RESULT_DIR", str(tmp_path))
+    net = case14()
+    panda_mcp._networks.put(net, "recycle")
+    # Cached results would skip the solves whose structures are recycled
+    assert not panda_mcp.run_power_flow.sync(network="recycle", recycle=True, use_cache=False)["recycled"]
+
+    for scale, tables in ((1.2, ["load"]), (0.8, ["load", "gen"])):
+        for table in tables:
+            net[table].loc[:, "p_mw"] *= scale
+        panda_mcp._invalidate_network_caches("recycle", tables=tables)
+        assert panda_mcp.run_power_flow.sync(network="recycle", recycle=True, use_cache=False)["recycled"]
+        expected = copy.deepcopy(net)
+        pp.runpp(expected)
+        assert np.allclose(net.res_bus[["vm_pu", "va_degree"]], expected.res_bus[["vm_pu", "va_degree"]])
+        assert np.allclose(net.res_line.loading_percent, expected.res_line.loading_percent)
+
+    # A changed line changes the admittance matrix, which is then rebuilt
+    net.line.loc[net.line.index[0], "in_service"] = False
+    panda_mcp._invalidate_network_caches("recycle", tables=["line"])
+    assert not panda_mcp.run_power_flow.sync(network="recycle", recycle=True, use_cache=False)["recycled"]
+    expected = copy.deepcopy(net)
+    pp.runpp(expected)
+    assert np.allclose(net.res_bus.vm_pu, expected.res_bus.vm_pu)
+
+
+def test_pruned_results_are_solved_again(monkeypatch, tmp_path):
+    monkeypatch.setenv("POWER_MCP_RESULT_DIR", str(tmp_path))
+    panda_mcp._networks.put(case14(), "pruned")
+    first = panda_mcp.run_power_flow.sync(network="pruned")
+    monkeypatch.setenv("POWER_MCP_RESULT_MAX_COUNT", "0")
+    assert prune_results() == [first["result_handle"]]
+
+    again = panda_mcp.run_power_flow.sync(network="pruned")
+    assert not again["cache"]["hit"]
+    assert again["result_handle"] != first["result_handle"]
+    assert panda_mcp.query_results.sync(again["result_handle"])["status"] == "success"
@@ -0,0 +1,39 @@
+from concurrent.futures import ThreadPoolExecutor
+import os
+
+import numpy as np
+import pandas as pd
+
+from panda_profiles import ProfileData, convert_profiles, profile_cache_dir
+
+
+def test_profiles_are_converted_once_into_the_private_cache(monkeypatch, tmp_path):
+    monkeypatch.setenv("POWER_MCP_CACHE_DIR", str(tmp_path / "cache"))
+    frame = pd.DataFrame({"time": pd.date_range("2024-01-01", periods=10, freq="15min").astype(str),
+                          "0": np.arange(10.), "1": np.arange(10.) * 2})
+    path = str(tmp_path / "loads.csv")
+    frame.to_csv(path, index=False)
+
+    data_path, meta = convert_profiles(path, time_column="time", chunk_rows=3)
+    assert data_path.startswith(profile_cache_dir())
+    assert meta["rows"] == 10 and meta["columns"] == ["0", "1"] and len(meta["time"]) == 10
+    assert convert_profiles(path, time_column="time") == (data_path, meta)
+
+    data = ProfileData(data_path, meta)
+    assert data.get_time_steps_len() == 10
+    assert np.allclose(data.get_time_step_value(4, ["0", "1"]), [4., 8.])
+
+
+def test_concurrent_conversions_of_one_file(monkeypatch, tmp_path):
+    monkeypatch.setenv("POWER_MCP_CACHE_DIR", str(tmp_path / "cache"))
+    values = np.random.default_rng(0).normal(size=(5000, 4))
+    path = str(tmp_path / "loads.csv")
+    pd.DataFrame(values, columns=["a", "b", "c", "d"]).to_csv(path, index=False)
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        results = list(pool.map(lambda _: convert_profiles(path, chunk_rows=100), range(4)))
+    data_path, meta = results[0]
+    assert all(result == (data_path, meta) for result in results)
+    stored = np.fromfile(data_path, dtype=meta["dtype"]).reshape(meta["rows"], len(meta["columns"]))
+    assert np.allclose(stored, values, atol=1e-6)
+    assert not [name for name in os.listdir(profile_cache_dir()) if name.endswith(".tmp")]
@@ -0,0 +1,44 @@
+import os
+
+import numpy as np
+import pytest
+from pandapower.networks.power_system_test_cases import case9, case14
+
+from panda_registry import NetworkRegistry, network_nbytes
+
+
+def test_evicted_networks_are_reloaded(tmp_path):
+    spill_dir = str(tmp_path / "spill")
+    small = case9()
+    registry = NetworkRegistry(memory_budget=network_nbytes(small) + 1, spill_dir=spill_dir)
+    registry.put(small, "a")
+    registry.put(case14(), "b")
+    assert [entry["resident"] for entry in registry.info()] == [False, True]
+    assert len(registry.get("a").bus) == 9
+    assert [entry["network"] for entry in registry.info() if entry["resident"]] == ["a"]
+
+
+@pytest.mark.skipif(os.name != "posix", reason="permission bits are POSIX only")
+def test_snapshots_are_not_read_from_an_open_directory(tmp_path):
+    spill_dir = str(tmp_path / "spill")
+    registry = NetworkRegistry(memory_budget=1, spill_dir=spill_dir)
+    registry.put(case9(), "a")
+    registry.put(case14(), "b")
+    os.chmod(spill_dir, 0o777)
+    with pytest.raises(RuntimeError, match="accessible to other users"):
+        registry.get("a")
+
+
+def test_cached_data_counts_against_the_budget(tmp_path):
+    a, b = case9(), case14()
+    registry = NetworkRegistry(memory_budget=network_nbytes(a) + network_nbytes(b) + 1000,
+                               spill_dir=str(tmp_path / "spill"))
+    registry.put(a, "a")
+    registry.put(b, "b")
+    assert all(entry["resident"] for entry in registry.info())
+
+    registry.cache("b", "matrix", np.zeros(1000))
+    assert registry.info()[1]["cache_bytes"] == 8000
+    assert [entry["network"] for entry in registry.info() if entry["resident"]] == ["b"]
+    registry.changed("b")
+    assert registry.info()[1]["cache_bytes"] == 0
@@ -0,0 +1,87 @@
+import json
+import os
+
+import numpy as np
+import pandapower as pp
+import pytest
+from pandapower.networks.power_system_test_cases import case9, case14
+
+from panda_results import load_results, prune_results, query_frame, result_frame, store_results
+import panda_mcp
+
+
+def _solved_case9():
+    net = case9()
+    pp.runpp(net)
+    return net
+
+
+def test_stored_results_round_trip(monkeypatch, tmp_path):
+    monkeypatch.setenv("POWER_MCP_RESULT_DIR", str(tmp_path))
+    net = _solved_case9()
+    frames = load_results(store_results(net), ["res_bus"])
+    assert frames["res_bus"].vm_pu.round(9).tolist() == net.res_bus.vm_pu.round(9).tolist()
+
+
+def test_oldest_results_are_pruned(monkeypatch, tmp_path):
+    monkeypatch.setenv("POWER_MCP_RESULT_DIR", str(tmp_path))
+    net = _solved_case9()
+    handles = [store_results(net) for _ in range(3)]
+    monkeypatch.setenv("POWER_MCP_RESULT_MAX_COUNT", "2")
+    for age, handle in enumerate(reversed(handles)):
+        os.utime(tmp_path / handle / "meta.json", (1e9 - age, 1e9 - age))
+    # A run still writing has no meta.json yet and is left alone
+    (tmp_path / "ts_running").mkdir()
+
+    assert prune_results() == [handles[0]]
+    assert sorted(os.listdir(tmp_path)) == sorted(handles[1:] + ["ts_running"])
+
+    monkeypatch.setenv("POWER_MCP_RESULT_MAX_COUNT", "0")
+    assert prune_results(keep=handles[2]) == [handles[1]]
+    assert store_results(net) in os.listdir(tmp_path)
+    assert not (tmp_path / handles[2]).exists()
+
+
+def test_query_frame_filters_sorts_and_groups():
+    net = case14()
+    pp.runpp(net)
+    frame = result_frame(net, "res_bus").rename_axis("index").reset_index()
+
+    low = query_frame(frame, filters=[{"column": "vm_pu", "op": "<", "value": 1.03}], sort_by="vm_pu",
+                      ascending=True, top_k=3)
+    expected = net.res_bus.vm_pu[net.res_bus.vm_pu < 1.03].nsmallest(3)
+    assert low["index"].tolist() == expected.index.tolist()
+
+    grouped = query_frame(frame, group_by=["vn_kv"], aggregates={"vm_pu": ["max", "count"]})
+    by_level = net.res_bus.vm_pu.groupby(net.bus.vn_kv)
+    assert np.allclose(grouped.set_index("vn_kv")["vm_pu_max"].sort_index(), by_level.max().sort_index())
+    assert grouped.set_index("vn_kv")["vm_pu_count"].sort_index().tolist() == by_level.count().sort_index().tolist()
+
+    with pytest.raises(ValueError):
+        query_frame(frame, filters=[{"column": "vm_pu", "op": "~", "value": 1}])
+
+
+def test_page_token_is_rejected_after_the_table_changes():
+    panda_mcp._networks.put(case14(), "paged")
+    first = panda_mcp.get_table.sync("bus", columns=["vn_kv"], limit=5, network="paged")
+    assert [row[0] for row in first["rows"]] == list(range(5))
+    second = panda_mcp.get_table.sync(page_token=first["next_page_token"], limit=5, network="paged")
+    assert [row[0] for row in second["rows"]] == list(range(5, 10))
+
+    panda_mcp.add_buses.sync({"vn_kv": [20.0]}, network="paged")
+    stale = panda_mcp.get_table.sync(page_token=second["next_page_token"], network="paged")
+    assert stale["status"] == "error"
+    assert "changed since the first page" in stale["message"]
+
+
+@pytest.mark.parametrize("max_tokens", [200, 500, 2000])
+def test_summary_fits_the_budget(max_tokens):
+    net = case14()
+    pp.runpp(net)
+    panda_mcp._networks.put(net, "summarized")
+    summary = panda_mcp.summarize_results.sync(max_tokens=max_tokens, network="summarized")
+    assert summary["status"] == "success"
+    assert len(json.dumps(summary)) <= 4 * max_tokens
+    assert summary["omitted"] or max_tokens == 2000
+    if summary["summaries"]:
+        assert "overall" in next(iter(summary["summaries"].values()))
@@ -0,0 +1,51 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+import pandapower as pp
+import pytest
+from pandapower.networks.power_system_test_cases import case14
+
+from panda_scenarios import applied, iter_scenarios_parallel, iter_scenarios_serial, scenario_overlay
+
+SCENARIOS = [{"name": "loads +5%", "scale": {"load": 1.05}},
+             {"name": "line 3 out", "outages": [["line", 3]]},
+             {"name": "gen 0 at 1.02 pu", "setpoints": [{"element": "gen", "index": 0, "column": "vm_pu",
+                                                          "value": 1.02}]},
+             {"name": "loads -10%, trafo 0 out", "scale": {"load": 0.9}, "outages": [["trafo", 0]]}]
+
+
+def _batch(net):
+    return [(scenario["name"], scenario_overlay(net, scenario)) for scenario in SCENARIOS]
+
+
+def test_parallel_scenarios_match_serial():
+    net = case14()
+    pp.runpp(net)
+    serial = list(iter_scenarios_serial(net, _batch(net)))
+    assert [row["scenario"] for row in serial] == ["base"] + [scenario["name"] for scenario in SCENARIOS]
+    assert list(iter_scenarios_parallel(net, _batch(net), n_workers=2)) == serial
+
+
+@pytest.mark.parametrize("change, message", [
+    ({"element": "gen", "index": 0, "column": "vm_pu", "value": "1.02"}, "must be a number"),
+    ({"element": "gen", "index": 0, "column": "vm_pu", "value": None}, "must be a number"),
+    ({"element": "gen", "index": 0, "column": "in_service", "value": 0}, "true or false"),
+    ({"element": "gen", "index": 0, "column": "name", "value": 1.}, "cannot set column"),
+])
+def test_setpoints_must_fit_their_column(change, message):
+    with pytest.raises(ValueError, match=message):
+        scenario_overlay(case14(), {"setpoints": [change]})
+
+
+def test_applied_restores_values_and_dtypes():
+    net = case14()
+    net.load["priority"] = np.arange(len(net.load), dtype=np.int64)
+    before = net.load.copy()
+    overlay = [("load", "priority", np.array([0]), np.array([0.5])),
+               ("load", "p_mw", net.load.index.to_numpy(), net.load.p_mw.to_numpy() * 2)]
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", FutureWarning)
+        with applied(net, overlay):
+            assert net.load.at[0, "priority"] == 0.5
+    pd.testing.assert_frame_equal(net.load, before)
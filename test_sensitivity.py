@@ -0,0 +1,55 @@
+import numpy as np
+import pandapower as pp
+from pandapower.networks.power_system_test_cases import case9, case14
+
+from panda_sensitivity import UNRATED_MVA, build_sensitivity_model, rank_single_outages, screen_double_outages
+
+
+def _dc_flows(net, outages):
+    """DC branch flows of the model rows after re-solving with the outages applied."""
+    net = net.deepcopy()
+    for element_type, index in outages:
+        net[element_type].at[index, "in_service"] = False
+    pp.rundcpp(net)
+    return np.r_[net.res_line.p_from_mw.fillna(0.).to_numpy(), net.res_trafo.p_hv_mw.fillna(0.).to_numpy()]
+
+
+def test_lodf_estimates_match_a_dc_resolve():
+    net = case14()
+    model = build_sensitivity_model(net)
+    for k in np.flatnonzero(model.in_service & ~model.islanding):
+        estimate = model.base_flow_mw + model.lodf[:, k] * model.base_flow_mw[k]
+        estimate[k] = 0.
+        assert np.allclose(estimate, _dc_flows(net, [model.branches[k]]), atol=1e-6)
+
+
+def test_compounded_lodfs_match_a_dc_resolve_of_the_pair():
+    net = case14()
+    model = build_sensitivity_model(net)
+    model.rating_mva[:] = 1.
+    first, second = np.triu_indices(len(model.branches), k=1)
+    screening = screen_double_outages(model, first, second)
+    checked = 0
+    for k, l, loading in zip(first[~screening["islanding"]], second[~screening["islanding"]],
+                             screening["max_loading_percent"][~screening["islanding"]]):
+        flows = np.abs(_dc_flows(net, [model.branches[k], model.branches[l]]))
+        aggravated = flows[flows > np.abs(model.base_flow_mw) + 1e-9]
+        assert np.isclose(loading, aggravated.max(initial=0.) * 100., atol=1e-4)
+        checked += 1
+        if checked == 10:
+            break
+    assert checked == 10
+
+
+def test_placeholder_ratings_are_unrated():
+    rated = build_sensitivity_model(case9())
+    assert not rated.unrated.any()
+
+    net = case14()
+    model = build_sensitivity_model(net)
+    lines = np.array([element_type == "line" for element_type, _ in model.branches])
+    ratings = net.line.max_i_ka * net.bus.vn_kv.loc[net.line.from_bus].to_numpy() * np.sqrt(3)
+    assert (ratings >= UNRATED_MVA).any()
+    assert np.array_equal(model.unrated[lines], (ratings >= UNRATED_MVA).to_numpy())
+    ranking = rank_single_outages(model)
+    assert not (model.unrated[ranking["worst_branch"]] & (ranking["max_loading_percent"] > 0)).any()
@@ -0,0 +1,30 @@
+import multiprocessing
+
+import numpy as np
+import pandapower as pp
+from pandapower.networks.power_system_test_cases import case9
+
+from panda_shared import SharedNetworkSpec, network_handoff, own_columns, pool_context, receive_network
+
+
+def test_pool_context_defaults_to_a_non_fork_start_method(monkeypatch):
+    monkeypatch.delenv("POWER_MCP_START_METHOD", raising=False)
+    assert pool_context().get_start_method() in ("forkserver", "spawn")
+    monkeypatch.setenv("POWER_MCP_START_METHOD", "fork")
+    assert pool_context().get_start_method() == "fork"
+
+
+def test_handoff_publishes_unless_fork_is_chosen():
+    net = case9()
+    pp.runpp(net)
+    with network_handoff(net, multiprocessing.get_context("spawn")) as handoff:
+        assert isinstance(handoff, SharedNetworkSpec)
+        worker_net = receive_network(handoff)
+        assert worker_net is not net
+        assert np.array_equal(worker_net.load.p_mw.to_numpy(), net.load.p_mw.to_numpy())
+        assert not worker_net.load.p_mw.to_numpy().flags.writeable
+        own_columns(worker_net, [("load", "p_mw")])
+        worker_net.load.loc[:, "p_mw"] *= 2
+        assert np.allclose(worker_net.load.p_mw.to_numpy(), 2 * net.load.p_mw.to_numpy())
+    with network_handoff(net, multiprocessing.get_context("fork")) as handoff:
+        assert handoff is net
@@ -0,0 +1,93 @@
+import numpy as np
+import pytest
+import pandas as pd
+from pandapower.control import ConstControl
+from pandapower.networks.power_system_test_cases import case9
+from pandapower.timeseries import DFData, run_timeseries
+
+from panda_timeseries import StreamingQuantile, TimeseriesWriter, load_timeseries, load_timeseries_aggregates, \
+    run_timeseries_parallel
+import panda_mcp
+
+N_STEPS = 24
+
+
+def _profiled_case9():
+    net = case9()
+    rng = np.random.default_rng(0)
+    profiles = pd.DataFrame(rng.normal(1., 0.1, size=(N_STEPS, len(net.load))),
+                            columns=net.load.index) * net.load.p_mw.values
+    ConstControl(net, element="load", element_index=net.load.index, variable="p_mw",
+                 data_source=DFData(profiles), profile_name=net.load.index)
+    return net
+
+
+def _run(parallel, aggregates):
+    net = _profiled_case9()
+    writer = TimeseriesWriter(net, N_STEPS, aggregates=aggregates, downsample=2)
+    if parallel:
+        run_timeseries_parallel(net, writer, n_workers=2)
+    else:
+        run_timeseries(net, time_steps=range(N_STEPS), verbose=False)
+    writer.finish()
+    return writer.handle
+
+
+def test_parallel_timeseries_matches_serial(monkeypatch, tmp_path):
+    monkeypatch.setenv("POWER_MCP_RESULT_DIR", str(tmp_path))
+    serial, parallel = _run(False, None), _run(True, None)
+    for variable in ("res_bus.vm_pu", "res_line.loading_percent"):
+        assert np.allclose(load_timeseries(serial, variable), load_timeseries(parallel, variable), atol=1e-6)
+        assert np.allclose(load_timeseries_aggregates(serial, variable),
+                           load_timeseries_aggregates(parallel, variable), atol=1e-6)
+
+
+def test_percentiles_are_not_run_in_chunks(monkeypatch, tmp_path):
+    monkeypatch.setenv("POWER_MCP_RESULT_DIR", str(tmp_path))
+    net = _profiled_case9()
+    writer = TimeseriesWriter(net, N_STEPS, aggregates=["max", "p90"])
+    with pytest.raises(ValueError, match="Percentile"):
+        run_timeseries_parallel(net, writer, n_workers=2)
+    assert not (tmp_path / writer.handle).exists()
+
+
+def test_streaming_quantile_tracks_the_exact_percentile():
+    rng = np.random.default_rng(1)
+    values = rng.normal(size=(5000, 3))
+    estimator = StreamingQuantile(0.9, 3)
+    for row in values:
+        estimator.update(row)
+    assert np.allclose(estimator.value(), np.percentile(values, 90, axis=0), atol=0.05)
+
+
+def test_downsampled_rows_are_means_of_their_steps(monkeypatch, tmp_path):
+    monkeypatch.setenv("POWER_MCP_RESULT_DIR", str(tmp_path))
+    handles = {}
+    for downsample in (1, 5):
+        net = _profiled_case9()
+        writer = TimeseriesWriter(net, N_STEPS, aggregates=["mean", "max"], downsample=downsample)
+        run_timeseries(net, time_steps=range(N_STEPS), verbose=False)
+        writer.finish()
+        handles[downsample] = writer.handle
+
+    full = load_timeseries(handles[1], "res_bus.vm_pu")
+    coarse = load_timeseries(handles[5], "res_bus.vm_pu")
+    # The last row averages the 4 remaining steps
+    assert coarse.index.tolist() == [0, 5, 10, 15, 20]
+    expected = full.groupby(full.index // 5).mean()
+    assert np.allclose(coarse.to_numpy(), expected.to_numpy(), atol=1e-6)
+    assert np.allclose(load_timeseries_aggregates(handles[5], "res_bus.vm_pu"),
+                       load_timeseries_aggregates(handles[1], "res_bus.vm_pu"))
+
+
+@pytest.mark.parametrize("n_workers", [1, 2])
+def test_timeseries_leaves_the_network_unchanged(monkeypatch, tmp_path, n_workers):
+    monkeypatch.setenv("POWER_MCP_RESULT_DIR", str(tmp_path))
+    net = case9()
+    panda_mcp._networks.put(net, "profiled")
+    result = panda_mcp.timeseries.sync(time_steps=8, network="profiled", n_workers=n_workers)
+    assert result["status"] == "success"
+    assert result["execution"]["mode"] == ("serial" if n_workers == 1 else "parallel")
+    assert net.load.equals(case9().load)
+    assert net.sgen.equals(case9().sgen)
+    assert not len(net.controller)
@@ -0,0 +1,53 @@
+import pandapower.topology as top
+from pandapower.networks import mv_oberrhein
+
+from panda_topology import BUS_COLUMNS
+import panda_mcp
+
+
+def _islands(report):
+    return sorted(sorted(island["buses"]) for island in report["islands"])
+
+
+def test_islands_match_pandapower_topology():
+    net = mv_oberrhein()
+    # Open the feeder switches of a few lines and take a trafo out to split the grid
+    net.switch.loc[net.switch.index[net.switch.et == "l"][:6], "closed"] = False
+    net.trafo.loc[net.trafo.index[0], "in_service"] = False
+    panda_mcp._networks.put(net, "islands")
+
+    report = panda_mcp.analyze_topology.sync(limit=len(net.bus), network="islands")
+    expected = [sorted(area) for area in top.connected_components(top.create_nxgraph(net))]
+    assert report["n_islands"] == len(expected) > 1
+    assert _islands(report) == sorted(expected)
+    assert {bus for island in report["islands"] if not island["supplied"] for bus in island["buses"]} == \
+        set(top.unsupplied_buses(net))
+
+    # Closing the switches again only rereads the switch table
+    net.switch.loc[:, "closed"] = True
+    panda_mcp._invalidate_network_caches("islands", tables=["switch"])
+    report = panda_mcp.analyze_topology.sync(limit=len(net.bus), network="islands")
+    assert report["timing"]["reread_tables"] == ["switch"]
+    assert _islands(report) == sorted(sorted(area) for area in top.connected_components(top.create_nxgraph(net)))
+
+
+def test_bus_elements_match_a_table_scan():
+    net = mv_oberrhein()
+    panda_mcp._networks.put(net, "incidence")
+    assert panda_mcp.add_loads.sync({"bus": [net.bus.index[0]] * 2, "p_mw": [0.1, 0.2]},
+                                    network="incidence")["status"] == "success"
+
+    buses = net.bus.index[:40].tolist()
+    result = panda_mcp.get_bus_elements.sync(buses, network="incidence")
+    for bus, entry in zip(buses, result["buses"]):
+        expected = {}
+        for table, columns in BUS_COLUMNS.items():
+            frame = net[table]
+            if not len(frame):
+                continue
+            hit = frame[list(columns)].eq(bus).any(axis=1)
+            if table == "switch":
+                hit |= (frame.et == "b") & (frame.element == bus)
+            if hit.any():
+                expected[table] = sorted(frame.index[hit].tolist())
+        assert {table: sorted(elements) for table, elements in entry["elements"].items()} == expected